@@ -0,0 +1,327 @@
+import json
+
+from Memory import Memory
+from Trace import INSTRUCTION
+
+
+class Assembler:
+    """
+    Assembles the program into 32-bit RV32-style words, one per instruction at
+    text_base + 4 * PC, and disassembles fetched words back into program text.
+
+    The RV32I/M/A instructions keep their standard encodings: add, sub, slt,
+    mul, div, rem (OP), addi (OP-IMM), lw, sw, beq, bne, jal, jalr, fence,
+    ecall and amoadd.w, amoswap.w, lr.w, sc.w. ble x1 x2 is bge x2 x1, j and
+    jr are jal and jalr with rd x0. The rest use the custom opcodes:
+      li rd imm       LUI opcode, the 20-bit immediate is the value itself
+      la rd label     custom-0 funct3 0, the immediate numbers the data label
+      lw_spm          custom-0 funct3 2, laid out as lw
+      sw_spm          custom-1 funct3 2, laid out as sw
+      dma_in/out      custom-2 funct3 0/1, the scratch-pad register in rd
+      dma_poll rd     custom-2 funct3 2
+      dma_wait, sync  custom-2 funct3 3, 4
+    ecall xN keeps N in rs1. Branch and jump offsets are PC-relative bytes; a
+    target without a label disassembles as the label pc<N>.
+    """
+
+    R_TYPE = {"add": (0, 0x00), "sub": (0, 0x20), "slt": (2, 0x00),
+              "mul": (0, 0x01), "div": (4, 0x01), "rem": (6, 0x01)}
+    BRANCHES = {"beq": 0, "bne": 1, "bge": 5}
+    ATOMICS = {"amoadd.w": 0x00, "amoswap.w": 0x01, "lr.w": 0x02, "sc.w": 0x03}
+    CUSTOM_2 = ("dma_in", "dma_out", "dma_poll", "dma_wait", "sync")
+
+    OP, OP_IMM, LUI, LOAD, STORE, BRANCH = 0x33, 0x13, 0x37, 0x03, 0x23, 0x63
+    JAL, JALR, MISC_MEM, SYSTEM, AMO = 0x6F, 0x67, 0x0F, 0x73, 0x2F
+    CUSTOM_0, CUSTOM_1, CUSTOM_2_OPCODE = 0x0B, 0x2B, 0x5B
+
+    def __init__(self, program, labels, data_labels, text_base=320):
+        """
+        `labels` maps program labels to PCs and gets the pc<N> labels of
+        unlabelled targets; `data_labels` are the .data labels in order.
+        """
+        if text_base < 0 or text_base % 4:
+            raise ValueError(f"The text base must be a non-negative word address: {text_base}")
+        self.program = program
+        self.labels = labels
+        self.names = {pc: label for label, pc in labels.items()}
+        self.data_labels = list(data_labels)
+        self.text_base = text_base
+        self.words = []
+        self.decoded = {}   # (word, pc) -> text
+        self.stats = {"decoded": 0, "changed": 0}   # fetches decoded, of them words not as assembled
+
+    def address(self, pc):
+        return self.text_base + 4 * pc
+
+    def assemble(self):
+        """The words of the whole program."""
+        self.words = []
+        for pc, line in enumerate(self.program):
+            tokens = line.split()
+            if tokens and ":" in tokens[0]:
+                tokens.pop(0)
+            try:
+                self.words.append(self.encode(tokens, pc))
+            except (ValueError, KeyError, IndexError) as error:
+                raise ValueError(f"Cannot assemble PC {pc} '{line}': {error}") from None
+        return self.words
+
+    def load(self, memory):
+        """Write the assembled program into `memory` at the text base."""
+        words = self.words or self.assemble()
+        end = self.address(len(words))
+        if end > len(memory.memory):
+            raise ValueError(f"The program ends at {end}, beyond the {len(memory.memory)}-byte memory")
+        for pc, word in enumerate(words):
+            memory.memory[self.address(pc)] = word
+
+    # --- Encoding ---
+    @staticmethod
+    def register(token):
+        if not token.startswith("x") or not 0 <= int(token[1:]) < 32:
+            raise ValueError(f"Not a register: {token}")
+        return int(token[1:])
+
+    @staticmethod
+    def immediate(value, bits):
+        """`value` as a `bits`-bit two's complement field."""
+        if not -(1 << (bits - 1)) <= value < 1 << (bits - 1):
+            raise ValueError(f"Immediate {value} does not fit in {bits} bits")
+        return value & ((1 << bits) - 1)
+
+    @staticmethod
+    def memory_operand(token):
+        """offset(xN) -> (offset, register); the offset may be left out."""
+        offset, base = token.split("(")
+        return int(offset or 0), Assembler.register(base.rstrip(")"))
+
+    @staticmethod
+    def r_type(opcode, rd, funct3, rs1, rs2, funct7):
+        return funct7 << 25 | rs2 << 20 | rs1 << 15 | funct3 << 12 | rd << 7 | opcode
+
+    @staticmethod
+    def i_type(opcode, rd, funct3, rs1, imm):
+        return Assembler.immediate(imm, 12) << 20 | rs1 << 15 | funct3 << 12 | rd << 7 | opcode
+
+    @staticmethod
+    def s_type(opcode, funct3, rs1, rs2, imm):
+        imm = Assembler.immediate(imm, 12)
+        return (imm >> 5) << 25 | rs2 << 20 | rs1 << 15 | funct3 << 12 | (imm & 0x1F) << 7 | opcode
+
+    @staticmethod
+    def b_type(funct3, rs1, rs2, offset):
+        imm = Assembler.immediate(offset, 13)
+        return ((imm >> 12 & 1) << 31 | (imm >> 5 & 0x3F) << 25 | rs2 << 20 | rs1 << 15 |
+                funct3 << 12 | (imm >> 1 & 0xF) << 8 | (imm >> 11 & 1) << 7 | Assembler.BRANCH)
+
+    @staticmethod
+    def j_type(rd, offset):
+        imm = Assembler.immediate(offset, 21)
+        return ((imm >> 20 & 1) << 31 | (imm >> 1 & 0x3FF) << 21 | (imm >> 11 & 1) << 20 |
+                (imm >> 12 & 0xFF) << 12 | rd << 7 | Assembler.JAL)
+
+    def offset(self, label, pc):
+        return 4 * (self.labels[label] - pc)
+
+    def encode(self, tokens, pc):
+        """The word of the instruction `tokens` at `pc`."""
+        op = tokens[0].lower()
+        reg = Assembler.register
+        if op in Assembler.R_TYPE:
+            funct3, funct7 = Assembler.R_TYPE[op]
+            return Assembler.r_type(Assembler.OP, reg(tokens[1]), funct3, reg(tokens[2]), reg(tokens[3]), funct7)
+        if op == "addi":
+            return Assembler.i_type(Assembler.OP_IMM, reg(tokens[1]), 0, reg(tokens[2]), int(tokens[3]))
+        if op == "li":
+            return Assembler.immediate(int(tokens[2]), 20) << 12 | reg(tokens[1]) << 7 | Assembler.LUI
+        if op == "la":
+            if tokens[2] not in self.data_labels:
+                raise ValueError(f"Unknown data label: {tokens[2]}")
+            return Assembler.i_type(Assembler.CUSTOM_0, reg(tokens[1]), 0, 0, self.data_labels.index(tokens[2]))
+        if op in ("lw", "lw_spm"):
+            offset, base = Assembler.memory_operand(tokens[2])
+            opcode = Assembler.LOAD if op == "lw" else Assembler.CUSTOM_0
+            return Assembler.i_type(opcode, reg(tokens[1]), 2, base, offset)
+        if op in ("sw", "sw_spm"):
+            offset, base = Assembler.memory_operand(tokens[2])
+            opcode = Assembler.STORE if op == "sw" else Assembler.CUSTOM_1
+            return Assembler.s_type(opcode, 2, base, reg(tokens[1]), offset)
+        if op in ("beq", "bne"):
+            return Assembler.b_type(Assembler.BRANCHES[op], reg(tokens[1]), reg(tokens[2]),
+                                    self.offset(tokens[3], pc))
+        if op == "ble":
+            return Assembler.b_type(Assembler.BRANCHES["bge"], reg(tokens[2]), reg(tokens[1]),
+                                    self.offset(tokens[3], pc))
+        if op == "j":
+            return Assembler.j_type(0, self.offset(tokens[1], pc))
+        if op == "jal":
+            return Assembler.j_type(reg(tokens[1]), self.offset(tokens[2], pc))
+        if op == "jr":
+            return Assembler.i_type(Assembler.JALR, 0, 0, reg(tokens[1]), 0)
+        if op in Assembler.ATOMICS:
+            offset, base = Assembler.memory_operand(tokens[-1])
+            if offset:
+                raise ValueError(f"{op} takes no offset")
+            rs2 = reg(tokens[2]) if op != "lr.w" else 0
+            return Assembler.r_type(Assembler.AMO, reg(tokens[1]), 2, base, rs2, Assembler.ATOMICS[op] << 2)
+        if op in ("dma_in", "dma_out"):
+            return Assembler.r_type(Assembler.CUSTOM_2_OPCODE, reg(tokens[1]), Assembler.CUSTOM_2.index(op),
+                                    reg(tokens[2]), reg(tokens[3]), 0)
+        if op in ("dma_poll", "dma_wait", "sync"):
+            rd = reg(tokens[1]) if op == "dma_poll" else 0
+            return Assembler.r_type(Assembler.CUSTOM_2_OPCODE, rd, Assembler.CUSTOM_2.index(op), 0, 0, 0)
+        if op == "fence":
+            return Assembler.MISC_MEM
+        if op == "ecall":
+            return reg(tokens[1]) << 15 | Assembler.SYSTEM
+        raise ValueError(f"Unsupported instruction: {op}")
+
+    # --- Decoding ---
+    @staticmethod
+    def signed(value, bits):
+        return value - (1 << bits) if value >> (bits - 1) & 1 else value
+
+    def target(self, pc, offset):
+        """Label of the instruction `offset` bytes from `pc`."""
+        target = pc + offset // 4
+        if target not in self.names:
+            self.names[target] = f"pc{target}"
+            self.labels[f"pc{target}"] = target
+        return self.names[target]
+
+    def disassemble(self, word, pc):
+        """Program text of `word` fetched at `pc`; raises ValueError if it is no instruction."""
+        key = (word, pc)
+        text = self.decoded.get(key)
+        if text is None:
+            text = self.decoded[key] = self.decode(word & 0xFFFFFFFF, pc)
+        self.stats["decoded"] += 1
+        if pc < len(self.words) and word != self.words[pc]:
+            self.stats["changed"] += 1
+        return text
+
+    def decode(self, word, pc):
+        opcode = word & 0x7F
+        rd = word >> 7 & 0x1F
+        funct3 = word >> 12 & 0x7
+        rs1 = word >> 15 & 0x1F
+        rs2 = word >> 20 & 0x1F
+        funct7 = word >> 25
+        imm = Assembler.signed(word >> 20, 12)
+        store_imm = Assembler.signed(funct7 << 5 | rd, 12)
+
+        if opcode == Assembler.OP:
+            for op, fields in Assembler.R_TYPE.items():
+                if fields == (funct3, funct7):
+                    return f"{op} x{rd} x{rs1} x{rs2}"
+        elif opcode == Assembler.OP_IMM and funct3 == 0:
+            return f"addi x{rd} x{rs1} {imm}"
+        elif opcode == Assembler.LUI:
+            return f"li x{rd} {Assembler.signed(word >> 12, 20)}"
+        elif opcode == Assembler.LOAD and funct3 == 2:
+            return f"lw x{rd} {imm}(x{rs1})"
+        elif opcode == Assembler.STORE and funct3 == 2:
+            return f"sw x{rs2} {store_imm}(x{rs1})"
+        elif opcode == Assembler.BRANCH:
+            offset = Assembler.signed((word >> 31) << 12 | (rd & 1) << 11 | (funct7 & 0x3F) << 5 |
+                                      (rd >> 1) << 1, 13)
+            if funct3 == Assembler.BRANCHES["bge"]:
+                return f"ble x{rs2} x{rs1} {self.target(pc, offset)}"
+            for op in ("beq", "bne"):
+                if funct3 == Assembler.BRANCHES[op]:
+                    return f"{op} x{rs1} x{rs2} {self.target(pc, offset)}"
+        elif opcode == Assembler.JAL:
+            offset = Assembler.signed((word >> 31) << 20 | (word >> 12 & 0xFF) << 12 |
+                                      (word >> 20 & 1) << 11 | (word >> 21 & 0x3FF) << 1, 21)
+            if rd == 0:
+                return f"j {self.target(pc, offset)}"
+            return f"jal x{rd} {self.target(pc, offset)}"
+        elif opcode == Assembler.JALR and rd == 0 and funct3 == 0 and imm == 0:
+            return f"jr x{rs1}"
+        elif opcode == Assembler.AMO and funct3 == 2:
+            for op, funct5 in Assembler.ATOMICS.items():
+                if funct7 >> 2 == funct5:
+                    if op == "lr.w":
+                        return f"lr.w x{rd} (x{rs1})"
+                    return f"{op} x{rd} x{rs2} (x{rs1})"
+        elif opcode == Assembler.CUSTOM_0 and funct3 == 0 and 0 <= imm < len(self.data_labels):
+            return f"la x{rd} {self.data_labels[imm]}"
+        elif opcode == Assembler.CUSTOM_0 and funct3 == 2:
+            return f"lw_spm x{rd} {imm}(x{rs1})"
+        elif opcode == Assembler.CUSTOM_1 and funct3 == 2:
+            return f"sw_spm x{rs2} {store_imm}(x{rs1})"
+        elif opcode == Assembler.CUSTOM_2_OPCODE and funct3 < len(Assembler.CUSTOM_2):
+            op = Assembler.CUSTOM_2[funct3]
+            if op in ("dma_in", "dma_out"):
+                return f"{op} x{rd} x{rs1} x{rs2}"
+            return f"dma_poll x{rd}" if op == "dma_poll" else op
+        elif opcode == Assembler.MISC_MEM:
+            return "fence"
+        elif opcode == Assembler.SYSTEM and word >> 20 == 0:
+            return f"ecall x{rs1}"
+        raise ValueError(f"Illegal instruction word {word:#010x} at PC {pc}")
+
+    def listing(self, memory=None):
+        """Address, word and disassembly of every instruction: from `memory` if given."""
+        words = self.words or self.assemble()
+        lines = []
+        for pc in range(len(self.program)):
+            word = memory.memory[self.address(pc)] if memory is not None else words[pc]
+            try:
+                text = self.decode(word & 0xFFFFFFFF, pc)
+            except ValueError:
+                text = "(illegal)"
+            lines.append(f"{self.address(pc):#06x}: {word & 0xFFFFFFFF:08x}  {text}")
+        return lines
+
+
+    def save_image(self, path, memory):
+        """
+        Write the text words `memory` holds (the code as the run left it), with
+        the program, labels and text base, for disassembling a trace later.
+        """
+        image = {"text_base": self.text_base, "program": self.program, "labels": self.labels,
+                 "data_labels": self.data_labels,
+                 "words": [memory.memory[self.address(pc)] for pc in range(len(self.program))]}
+        with open(path, "w") as file:
+            json.dump(image, file)
+        print(f"Instruction memory image written to {path}")
+        return path
+
+    @staticmethod
+    def load_image(path):
+        """The assembler and a Memory holding the text words of an image written by save_image."""
+        with open(path, "r") as file:
+            image = json.load(file)
+        assembler = Assembler(image["program"], image["labels"], image["data_labels"], image["text_base"])
+        assembler.assemble()
+        memory = Memory()
+        for pc, word in enumerate(image["words"]):
+            memory.memory[assembler.address(pc)] = word
+        return assembler, memory
+
+
+def disassemble_trace(records, assembler, memory):
+    """
+    Lines of the instruction fetches in trace `records` (Trace.TRACE_DTYPE)
+    with the disassembly of the word `memory` holds at each address.
+    """
+    lines = []
+    for record in records:
+        if not record["flags"] & INSTRUCTION:
+            continue
+        address = int(record["address"])
+        pc = (address - assembler.text_base) // 4
+        try:
+            text = assembler.decode(memory.memory[address] & 0xFFFFFFFF, pc)
+        except ValueError:
+            text = "(illegal)"
+        lines.append(f"cycle {int(record['cycle'])} core {int(record['core'])} {address:#06x} PC {pc}: {text}")
+    return lines
+
+
+def make_assembler(config, program, labels, data_labels):
+    """Build the assembler of `program` from `instruction_memory_config`; None unless enabled."""
+    if not config or not config.get("enabled"):
+        return None
+    return Assembler(program, labels, data_labels, int(config.get("text_base", 320)))
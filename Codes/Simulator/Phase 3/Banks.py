@@ -0,0 +1,86 @@
+import bisect
+
+
+class CacheBanks:
+    """
+    Bank and port model for the shared L2.
+    Blocks are interleaved over `num_banks` banks. Each bank has `ports`
+    ports and every access keeps one port busy for `occupancy` cycles, so
+    accesses from different cores to the same bank in the same cycle
+    serialize and the later ones pay the queueing delay.
+    """
+
+    def __init__(self, num_banks=4, ports=1, occupancy=1, block_size=64):
+        self.num_banks = num_banks
+        self.ports = ports
+        self.occupancy = occupancy
+        self.block_size = block_size
+
+        # reservations per port of each bank as sorted [start, arrival] pairs;
+        # an access takes the first gap of `occupancy` cycles after it arrives
+        self.reservations = [[[] for _ in range(ports)] for _ in range(num_banks)]
+
+        self.stats = [{
+            "accesses":        0,
+            "busy_cycles":     0,
+            "wait_cycles":     0,
+            "queue_depth_sum": 0,
+            "max_queue_depth": 0,
+        } for _ in range(num_banks)]
+
+    def bank_of(self, address):
+        return (address // self.block_size) % self.num_banks
+
+    def _first_gap(self, reservations, now):
+        start = now
+        for reserved, _ in reservations:
+            if reserved + self.occupancy <= start:
+                continue
+            if reserved >= start + self.occupancy:
+                break
+            start = reserved + self.occupancy
+        return start
+
+    def access(self, address, now, clock=None):
+        """
+        Reserve a port of the bank holding `address` for an access issued
+        at cycle `now`. Reservations that ended before `clock` are dropped.
+        Returns the cycles the access waits in the bank queue.
+        """
+        bank = self.bank_of(address)
+        ports = self.reservations[bank]
+        if clock is not None:
+            for p in range(self.ports):
+                ports[p] = [r for r in ports[p] if r[0] + self.occupancy > clock]
+
+        starts = [self._first_gap(ports[p], now) for p in range(self.ports)]
+        port = min(range(self.ports), key=lambda p: starts[p])
+        start = starts[port]
+        bisect.insort(ports[port], [start, now])
+
+        # accesses that arrived earlier and are still waiting for a port
+        waiting = sum(1 for reservations in ports for reserved, arrival in reservations
+                      if arrival <= now < reserved)
+
+        stats = self.stats[bank]
+        stats["accesses"] += 1
+        stats["busy_cycles"] += self.occupancy
+        stats["wait_cycles"] += start - now
+        stats["queue_depth_sum"] += waiting
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], waiting)
+
+        return start - now
+
+    def get_stats(self, elapsed):
+        """Per-bank counters plus utilization over `elapsed` cycles."""
+        report = []
+        for stats in self.stats:
+            accesses = stats["accesses"]
+            report.append({
+                "accesses":        accesses,
+                "utilization":     stats["busy_cycles"] / (elapsed * self.ports) if elapsed else 0,
+                "wait_cycles":     stats["wait_cycles"],
+                "avg_queue_depth": stats["queue_depth_sum"] / accesses if accesses else 0,
+                "max_queue_depth": stats["max_queue_depth"],
+            })
+        return report
@@ -0,0 +1,125 @@
+def divide(op, rs1, rs2):
+    """div or rem of two registers: a zero divisor gives RISC-V's quotient -1
+    and remainder rs1, other quotients round towards zero."""
+    if rs2 == 0:
+        return -1 if op == "div" else rs1
+    quotient = abs(rs1) // abs(rs2) * (1 if (rs1 < 0) == (rs2 < 0) else -1)
+    return quotient if op == "div" else rs1 - quotient * rs2
+
+
+class Block:
+    """
+    A basic block compiled into a Python function run(r, load, store) that
+    executes it on the register list `r`, calls load(address, pc) and
+    store(address, value, pc) for its memory accesses and returns the PC
+    after it. `pcs` are its instructions; `branch` is (op, target label PC)
+    of the control instruction ending it, or None.
+    """
+
+    def __init__(self, start, pcs, branch, source, run):
+        self.start = start
+        self.pcs = pcs
+        self.branch = branch
+        self.source = source
+        self.run = run
+
+
+class BlockCache:
+    """
+    Compiles the program into basic blocks on first use and keeps them by
+    start PC. A block runs from its start to the first control instruction
+    (inclusive), the next labelled instruction, or the next instruction it
+    cannot compile (la, sync, atomics, DMA, ecall: the functional model
+    executes those one at a time).
+    """
+
+    COMPILABLE = ("add", "addi", "sub", "slt", "mul", "div", "rem", "li", "lw", "sw",
+                  "bne", "beq", "ble", "j", "jal", "jr")
+    CONTROL = ("bne", "beq", "ble", "j", "jal", "jr")
+    CONDITIONS = {"bne": "!=", "beq": "==", "ble": "<="}
+
+    def __init__(self, program, labels, decode):
+        self.program = program
+        self.labels = labels
+        self.leaders = set(labels.values())
+        self.decode = decode
+        self.blocks = {}
+        self.stats = {"compiled": 0, "instructions": 0}
+
+    def get(self, pc):
+        """The block starting at `pc`, or None if its first instruction cannot compile."""
+        block = self.blocks.get(pc)
+        if block is None and pc not in self.blocks:
+            block = self.blocks[pc] = self.compile(pc)
+        return block
+
+    def opcode(self, pc):
+        tokens = self.decode(self.program[pc])[0]
+        return tokens[0].lower(), tokens
+
+    def compile(self, start):
+        lines = []
+        pcs = []
+        branch = None
+        pc = start
+        while pc < len(self.program):
+            op, tokens = self.opcode(pc)
+            if op not in BlockCache.COMPILABLE or (pcs and pc in self.leaders):
+                break
+            pcs.append(pc)
+            if op in BlockCache.CONTROL:
+                branch = (op, None if op == "jr" else
+                          self.labels[tokens[3] if op in BlockCache.CONDITIONS else tokens[-1]])
+                lines += self.control(op, tokens, pc, branch[1])
+                break
+            lines.append(self.statement(op, tokens, pc))
+            pc += 1
+        if not pcs:
+            return None
+        if branch is None:
+            lines.append(f"return {pcs[-1] + 1}")
+
+        source = "def run(r, load, store):\n" + "".join(f"    {line}\n" for line in lines)
+        namespace = {"divide": divide}
+        exec(compile(source, f"<block {start}>", "exec"), namespace)
+        self.stats["compiled"] += 1
+        self.stats["instructions"] += len(pcs)
+        return Block(start, pcs, branch, source, namespace["run"])
+
+    @staticmethod
+    def register(token):
+        return f"r[{int(token[1:])}]"
+
+    def statement(self, op, tokens, pc):
+        reg = BlockCache.register
+        if op in ("add", "sub", "slt", "mul", "div", "rem"):
+            rd, rs1, rs2 = reg(tokens[1]), reg(tokens[2]), reg(tokens[3])
+            if op == "add":
+                return f"{rd} = {rs1} + {rs2}"
+            if op == "sub":
+                return f"{rd} = {rs1} - {rs2}"
+            if op == "slt":
+                return f"{rd} = 1 if {rs1} < {rs2} else 0"
+            if op == "mul":
+                return f"{rd} = {rs1} * {rs2}"
+            return f"{rd} = divide('{op}', {rs1}, {rs2})"
+        if op == "addi":
+            return f"{reg(tokens[1])} = {reg(tokens[2])} + {int(tokens[3])}"
+        if op == "li":
+            return f"{reg(tokens[1])} = {int(tokens[2])}"
+        offset, base = tokens[2].split('(')
+        address = f"{reg(base[:-1])} + {int(offset)}"
+        if op == "lw":
+            return f"{reg(tokens[1])} = load({address}, {pc})"
+        return f"store({address}, {reg(tokens[1])}, {pc})"
+
+    def control(self, op, tokens, pc, target):
+        reg = BlockCache.register
+        if op in BlockCache.CONDITIONS:
+            condition = f"{reg(tokens[1])} {BlockCache.CONDITIONS[op]} {reg(tokens[2])}"
+            return [f"return {target} if {condition} else {pc + 1}"]
+        if op == "j":
+            return [f"return {target}"]
+        if op == "jal":
+            return [f"{reg(tokens[1])} = {pc + 1}", f"return {target}"]
+        return [f"return {reg(tokens[1])}"]
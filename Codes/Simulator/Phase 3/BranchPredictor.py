@@ -0,0 +1,235 @@
+class StaticPredictor:
+    """
+    Static direction prediction: "not_taken" never predicts taken,
+    "btfn" predicts backward branches taken and forward ones not taken.
+    """
+
+    def __init__(self, mode="not_taken"):
+        self.mode = mode
+
+    def predict(self, pc, target):
+        taken = self.mode == "btfn" and target is not None and target <= pc
+        return taken, None
+
+    def update(self, pc, taken, info):
+        pass
+
+
+class BimodalPredictor:
+    """Table of 2-bit saturating counters indexed by the branch PC."""
+
+    def __init__(self, table_size=512):
+        self.table_size = table_size
+        self.counters = [1] * table_size  # weakly not taken
+
+    def predict(self, pc, target):
+        index = pc % self.table_size
+        return self.counters[index] >= 2, index
+
+    def update(self, pc, taken, index):
+        if taken:
+            self.counters[index] = min(3, self.counters[index] + 1)
+        else:
+            self.counters[index] = max(0, self.counters[index] - 1)
+
+
+class GsharePredictor(BimodalPredictor):
+    """
+    2-bit counters indexed by the branch PC xor the global history.
+    The history is updated when branches resolve, so the index used for
+    the update is the one computed at prediction time.
+    """
+
+    def __init__(self, table_size=512, history_bits=8):
+        super().__init__(table_size)
+        self.history_bits = history_bits
+        self.history = 0
+
+    def predict(self, pc, target):
+        index = (pc ^ self.history) % self.table_size
+        return self.counters[index] >= 2, index
+
+    def update(self, pc, taken, index):
+        super().update(pc, taken, index)
+        self.history = ((self.history << 1) | int(taken)) & ((1 << self.history_bits) - 1)
+
+
+class TournamentPredictor:
+    """
+    Bimodal and gshare components with a PC-indexed table of 2-bit
+    choosers; a chooser moves towards the component that was right.
+    """
+
+    def __init__(self, table_size=512, history_bits=8):
+        self.bimodal = BimodalPredictor(table_size)
+        self.gshare = GsharePredictor(table_size, history_bits)
+        self.table_size = table_size
+        self.choosers = [2] * table_size  # weakly prefer gshare
+
+    def predict(self, pc, target):
+        bimodal_taken, bimodal_info = self.bimodal.predict(pc, target)
+        gshare_taken, gshare_info = self.gshare.predict(pc, target)
+        index = pc % self.table_size
+        taken = gshare_taken if self.choosers[index] >= 2 else bimodal_taken
+        return taken, (bimodal_taken, bimodal_info, gshare_taken, gshare_info)
+
+    def update(self, pc, taken, info):
+        bimodal_taken, bimodal_info, gshare_taken, gshare_info = info
+        index = pc % self.table_size
+        if gshare_taken == taken and bimodal_taken != taken:
+            self.choosers[index] = min(3, self.choosers[index] + 1)
+        elif bimodal_taken == taken and gshare_taken != taken:
+            self.choosers[index] = max(0, self.choosers[index] - 1)
+        self.bimodal.update(pc, taken, bimodal_info)
+        self.gshare.update(pc, taken, gshare_info)
+
+
+class BTB:
+    """Direct-mapped branch target buffer: pc -> (target, kind)."""
+
+    def __init__(self, entries=64):
+        self.entries = entries
+        self.table = [None] * entries
+
+    def lookup(self, pc):
+        entry = self.table[pc % self.entries]
+        if entry is not None and entry[0] == pc:
+            return entry[1], entry[2]
+        return None
+
+    def insert(self, pc, target, kind):
+        self.table[pc % self.entries] = (pc, target, kind)
+
+
+class ReturnAddressStack:
+    """Fixed-depth return address stack; the oldest entry is dropped on overflow."""
+
+    def __init__(self, depth=8):
+        self.depth = depth
+        self.stack = []
+
+    def push(self, address):
+        self.stack.append(address)
+        if len(self.stack) > self.depth:
+            self.stack.pop(0)
+
+    def pop(self):
+        return self.stack.pop() if self.stack else None
+
+
+# kinds of control instructions, by opcode
+BRANCH_KINDS = {
+    "beq": "cond",
+    "bne": "cond",
+    "ble": "cond",
+    "j":   "jump",
+    "jal": "call",
+    "jr":  "return",
+}
+
+
+class BranchUnit:
+    """
+    Fetch-time branch prediction for one core.
+    The BTB identifies control instructions before they are decoded and
+    supplies their targets, the direction predictor decides conditional
+    branches and the return address stack predicts `jr` targets.
+    """
+
+    def __init__(self, direction, btb_entries=64, ras_depth=8):
+        self.direction = direction
+        self.btb = BTB(btb_entries)
+        self.ras = ReturnAddressStack(ras_depth)
+
+        self.stats = {
+            "branches":    0,  # control instructions resolved
+            "correct":     0,
+            "mispredicts": 0,
+            "btb_misses":  0,  # taken control instructions missing from the BTB
+        }
+
+    def predict(self, pc):
+        """Return (predicted next pc, info to hand back to `resolve`)."""
+        ras_snapshot = list(self.ras.stack)
+        entry = self.btb.lookup(pc)
+        if entry is None:
+            return pc + 1, {"ras": ras_snapshot, "direction": None, "kind": None}
+
+        target, kind = entry
+        next_pc, direction_info = target, None
+        if kind == "cond":
+            taken, direction_info = self.direction.predict(pc, target)
+            next_pc = target if taken else pc + 1
+        elif kind == "call":
+            self.ras.push(pc + 1)
+        elif kind == "return":
+            predicted = self.ras.pop()
+            next_pc = predicted if predicted is not None else target
+        return next_pc, {"ras": ras_snapshot, "direction": direction_info, "kind": kind}
+
+    def resolve(self, pc, op, taken, target, predicted_next, info):
+        """
+        Train the predictor with the outcome of the control instruction at `pc`.
+        Returns True if it was mispredicted.
+        """
+        kind = BRANCH_KINDS[op]
+        actual_next = target if taken else pc + 1
+        mispredicted = actual_next != predicted_next
+
+        self.stats["branches"] += 1
+        if mispredicted:
+            self.stats["mispredicts"] += 1
+        else:
+            self.stats["correct"] += 1
+
+        if kind == "cond":
+            direction_info = info["direction"]
+            if info["kind"] != "cond":
+                # not in the BTB at fetch, so the predictor was not consulted
+                direction_info = self.direction.predict(pc, target)[1]
+            self.direction.update(pc, taken, direction_info)
+        if taken:
+            if self.btb.lookup(pc) is None:
+                self.stats["btb_misses"] += 1
+            self.btb.insert(pc, target, kind)
+
+        if mispredicted:
+            # repair the return address stack to its state before this
+            # instruction and redo its own push or pop
+            self.ras.stack = info["ras"]
+            if kind == "call":
+                self.ras.push(pc + 1)
+            elif kind == "return":
+                self.ras.pop()
+        return mispredicted
+
+    def get_stats(self):
+        branches = self.stats["branches"]
+        return {**self.stats, "accuracy": self.stats["correct"] / branches if branches else 0}
+
+
+DIRECTION_PREDICTORS = {
+    "not_taken":  lambda config: StaticPredictor("not_taken"),
+    "btfn":       lambda config: StaticPredictor("btfn"),
+    "bimodal":    lambda config: BimodalPredictor(config.get("table_size", 512)),
+    "gshare":     lambda config: GsharePredictor(config.get("table_size", 512), config.get("history_bits", 8)),
+    "tournament": lambda config: TournamentPredictor(config.get("table_size", 512), config.get("history_bits", 8)),
+}
+
+
+def make_branch_unit(config):
+    """
+    Build a branch unit from `branch_predictor_config`, e.g.
+    {"type": "gshare", "table_size": 512, "history_bits": 8, "btb_entries": 64, "ras_depth": 8}.
+    Returns None when prediction is disabled (fetch always falls through).
+    """
+    if not config:
+        return None
+    kind = config.get("type", "none")
+    if kind in (None, "none"):
+        return None
+    if kind not in DIRECTION_PREDICTORS:
+        raise ValueError(f"Unknown branch predictor type: {kind}")
+    return BranchUnit(DIRECTION_PREDICTORS[kind](config),
+                      btb_entries=config.get("btb_entries", 64),
+                      ras_depth=config.get("ras_depth", 8))
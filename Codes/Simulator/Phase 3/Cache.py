@@ -7,6 +7,8 @@ class CacheWithLRU:
         self.associativity= associativity
         self.num_sets     = cache_size // (block_size * associativity)
         self.timestamp    = 0
+        # precomputed (tag, index, offset) per address, see Replay.py
+        self.split_table  = {}
 
         self.cache = []
         for _ in range(self.num_sets):
@@ -17,11 +19,15 @@ class CacheWithLRU:
                     "tag":       None,
                     "data":      [0] * block_size,
                     "dirty":     False,
-                    "last_used": -1
+                    "last_used": -1,
+                    "prefetched": False,
+                    "ready_at":  0
                 })
             self.cache.append(cache_set)
 
     def _split_address(self, address, address_size=40):
+        if address in self.split_table:
+            return self.split_table[address]
         address_bin  = format(address, f'0{address_size}b')
         offset_bits  = int(math.log2(self.block_size))
         index_bits   = int(math.log2(self.num_sets))
@@ -50,6 +56,7 @@ class CacheWithLRU:
         """
         Load the block containing `address` from main memory into cache.
         If eviction of a dirty block is needed, write it back first.
+        Returns the base address of the evicted block, or None.
         """
         self.timestamp += 1
         tag, index, offset = self._split_address(address, address_size)
@@ -64,10 +71,12 @@ class CacheWithLRU:
                 block.update({
                     "data":      list(block_data),
                     "dirty":     False,
-                    "last_used": self.timestamp
+                    "last_used": self.timestamp,
+                    "prefetched": False,
+                    "ready_at":  0
                 })
                 print(f"Cache UPDATE at set {index}, tag {tag}")
-                return
+                return None
 
         # Look for an invalid slot
         for block in cache_set:
@@ -77,19 +86,21 @@ class CacheWithLRU:
                     "tag":       tag,
                     "data":      list(block_data),
                     "dirty":     False,
-                    "last_used": self.timestamp
+                    "last_used": self.timestamp,
+                    "prefetched": False,
+                    "ready_at":  0
                 })
                 print(f"Cache INSERT (empty) at set {index}, tag {tag}")
-                return
+                return None
 
         # Evict LRU block
         lru_block = min(cache_set, key=lambda b: b["last_used"])
+        # Reconstruct its base address
+        offset_bits = int(math.log2(self.block_size))
+        index_bits  = int(math.log2(self.num_sets))
+        evict_base = (lru_block["tag"] << (index_bits + offset_bits)) | (index << offset_bits)
         if lru_block["dirty"]:
             old_tag = lru_block["tag"]
-            # Reconstruct its base address
-            offset_bits = int(math.log2(self.block_size))
-            index_bits  = int(math.log2(self.num_sets))
-            evict_base = (old_tag << (index_bits + offset_bits)) | (index << offset_bits)
             # Write back
             for i in range(self.block_size):
                 addr = evict_base + i
@@ -107,9 +118,23 @@ class CacheWithLRU:
             "tag":       tag,
             "data":      list(block_data),
             "dirty":     False,
-            "last_used": self.timestamp
+            "last_used": self.timestamp,
+            "prefetched": False,
+            "ready_at":  0
         })
         print(f"Cache REPLACE LRU at set {index}, new tag {tag}")
+        return evict_base
+
+    def findBlock(self, address, address_size=40):
+        """
+        Return the valid block holding `address` without touching
+        replacement state, or None.
+        """
+        tag, index, _ = self._split_address(address, address_size)
+        for block in self.cache[index]:
+            if block["valid"] and block["tag"] == tag:
+                return block
+        return None
 
     def writeToCache(self, address, value, address_size=40):
         """
@@ -137,6 +162,7 @@ class CacheWithSRRIP:
         self.associativity= associativity
         self.num_sets     = cache_size // (block_size * associativity)
         self.max_rrpv     = (1 << rrpv_bits) - 1  # 2-bit RRPV max = 3
+        self.split_table  = {}
 
         self.cache = []
         for _ in range(self.num_sets):
@@ -147,11 +173,15 @@ class CacheWithSRRIP:
                     "tag": None,
                     "data": [0] * block_size,
                     "dirty": False,
-                    "rrpv": self.max_rrpv  # Initially max, so considered least useful
+                    "rrpv": self.max_rrpv,  # Initially max, so considered least useful
+                    "prefetched": False,
+                    "ready_at": 0
                 })
             self.cache.append(cache_set)
 
     def _split_address(self, address, address_size=40):
+        if address in self.split_table:
+            return self.split_table[address]
         address_bin  = format(address, f'0{address_size}b')
         offset_bits  = int(math.log2(self.block_size))
         index_bits   = int(math.log2(self.num_sets))
@@ -188,10 +218,12 @@ class CacheWithSRRIP:
                 block.update({
                     "data": list(block_data),
                     "dirty": False,
-                    "rrpv": 0
+                    "rrpv": 0,
+                    "prefetched": False,
+                    "ready_at": 0
                 })
                 print(f"Cache UPDATE at set {index}, tag {tag}")
-                return
+                return None
 
         # Look for invalid block
         for block in cache_set:
@@ -201,21 +233,23 @@ class CacheWithSRRIP:
                     "tag": tag,
                     "data": list(block_data),
                     "dirty": False,
-                    "rrpv": self.max_rrpv - 1  # Insert with RRPV = 2
+                    "rrpv": self.max_rrpv - 1,  # Insert with RRPV = 2
+                    "prefetched": False,
+                    "ready_at": 0
                 })
                 print(f"Cache INSERT (empty) at set {index}, tag {tag}")
-                return
+                return None
 
         # SRRIP replacement: find block with RRPV = max
         while True:
             for block in cache_set:
                 if block["rrpv"] == self.max_rrpv:
                     # Evict this block
+                    offset_bits = int(math.log2(self.block_size))
+                    index_bits  = int(math.log2(self.num_sets))
+                    evict_base = (block["tag"] << (index_bits + offset_bits)) | (index << offset_bits)
                     if block["dirty"]:
                         old_tag = block["tag"]
-                        offset_bits = int(math.log2(self.block_size))
-                        index_bits  = int(math.log2(self.num_sets))
-                        evict_base = (old_tag << (index_bits + offset_bits)) | (index << offset_bits)
 
                         for i in range(self.block_size):
                             addr = evict_base + i
@@ -230,16 +264,29 @@ class CacheWithSRRIP:
                         "tag": tag,
                         "data": list(block_data),
                         "dirty": False,
-                        "rrpv": self.max_rrpv - 1  # Insert with RRPV = 2
+                        "rrpv": self.max_rrpv - 1,  # Insert with RRPV = 2
+                        "prefetched": False,
+                        "ready_at": 0
                     })
                     print(f"Cache REPLACE at set {index}, tag {tag}")
-                    return
+                    return evict_base
 
             # No block with RRPV == max, increment all RRPVs
             for block in cache_set:
                 if block["rrpv"] < self.max_rrpv:
                     block["rrpv"] += 1
 
+    def findBlock(self, address, address_size=40):
+        """
+        Return the valid block holding `address` without touching
+        replacement state, or None.
+        """
+        tag, index, _ = self._split_address(address, address_size)
+        for block in self.cache[index]:
+            if block["valid"] and block["tag"] == tag:
+                return block
+        return None
+
     def writeToCache(self, address, value, address_size=40):
         tag, index, offset = self._split_address(address, address_size)
         cache_set = self.cache[index]
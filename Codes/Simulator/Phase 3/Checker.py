@@ -0,0 +1,197 @@
+from collections import deque
+
+from Blocks import divide
+
+
+class Mismatch(Exception):
+    """The pipeline and the reference model disagree after a retirement."""
+
+
+class ReferenceCore:
+    """Architectural state of one core in the reference model."""
+
+    def __init__(self, coreid, data_index=4092):
+        self.pc = 0
+        self.registers = [0] * 32
+        self.registers[31] = coreid
+        self.data_index = data_index
+        self.retired = 0
+
+
+class Checker:
+    """
+    Differential checker: a functional reference model of every core executes
+    each instruction when the pipeline retires it (WB in order, commit out of
+    order) and then compares the retired PC and all 32 registers. The first
+    difference raises Mismatch with the registers that differ and the last
+    instructions the core retired.
+
+    The reference cores share one flat memory and have their own scratch pads;
+    a store updates them when it retires, DMA transfers copy when dma_in or
+    dma_out retires. What depends on timing between cores is taken from the
+    pipeline: lw of a word other cores also write (la data included, every
+    core places it), the word lr.w and amo* read, whose order against other
+    cores' stores is the memory system's rather than retirement order, the
+    outcome of sc.w and the count dma_poll reads.
+    """
+
+    HISTORY = 8
+
+    def __init__(self, cores, candm, memory_size=4096):
+        self.candm = candm
+        self.memory = [0] * memory_size
+        self.writers = {}   # address -> cores that stored to it
+        self.scratch_pads = [[0] * len(pad.words) for pad in candm.scratch_pad]
+        self.models = [ReferenceCore(core.coreid) for core in cores]
+        self.history = [deque(maxlen=Checker.HISTORY) for _ in cores]
+        self.stats = {"checked": 0, "adopted": 0}
+
+    def retire(self, core, tokens, pc):
+        """Check the instruction `tokens` at `pc` that `core` has just retired."""
+        model = self.models[core.coreid]
+        if model.pc != pc:
+            raise self.mismatch(core, tokens, pc, [f"retired PC {pc}, reference PC {model.pc}"])
+        self.execute(core, model, tokens, pc)
+        model.retired += 1
+        diff = [f"x{reg}: pipeline {core.registers[reg]}, reference {model.registers[reg]}"
+                for reg in range(32) if core.registers[reg] != model.registers[reg]]
+        if diff:
+            raise self.mismatch(core, tokens, pc, diff)
+        self.history[core.coreid].append((self.candm.clock, pc, " ".join(tokens)))
+        self.stats["checked"] += 1
+
+    def mismatch(self, core, tokens, pc, diff):
+        lines = [f"Core {core.coreid} differs from the reference model at cycle {self.candm.clock}, "
+                 f"retired instruction {self.models[core.coreid].retired + 1}: PC {pc} {' '.join(tokens)}"]
+        lines += [f"  {line}" for line in diff]
+        lines.append("  last retired:")
+        lines += [f"    cycle {clock} PC {at} {text}" for clock, at, text in self.history[core.coreid]]
+        report = "\n".join(lines)
+        print(report)
+        return Mismatch(report)
+
+    # --- Reference execution ---
+    # The model decodes and computes on its own, sharing only the label map
+    # and divide with the pipeline, so that a bug in Core.compute, the
+    # branch logic or the decoder shows up as a mismatch.
+    ALU = {"add": lambda a, b: a + b, "sub": lambda a, b: a - b, "mul": lambda a, b: a * b,
+           "slt": lambda a, b: 1 if a < b else 0,
+           "div": lambda a, b: divide("div", a, b), "rem": lambda a, b: divide("rem", a, b)}
+    BRANCHES = {"beq": lambda a, b: a == b, "bne": lambda a, b: a != b, "ble": lambda a, b: a <= b}
+    WRITES = tuple(ALU) + ("addi", "li", "la", "lw", "lw_spm", "jal", "dma_poll",
+                           "amoadd.w", "amoswap.w", "lr.w", "sc.w")
+
+    @staticmethod
+    def register(token):
+        return int(token[1:])
+
+    @staticmethod
+    def memory_operand(token):
+        """offset(xN) -> (offset, N); the offset may be left out."""
+        offset, base = token.split("(")
+        return int(offset or 0), int(base.rstrip(")")[1:])
+
+    def execute(self, core, model, tokens, pc):
+        op = tokens[0].lower()
+        regs = model.registers
+        reg = Checker.register
+        dest = reg(tokens[1]) if op in Checker.WRITES else None
+        result = None
+        next_pc = pc + 1
+
+        if op in Checker.ALU:
+            result = Checker.ALU[op](regs[reg(tokens[2])], regs[reg(tokens[3])])
+        elif op == "addi":
+            result = regs[reg(tokens[2])] + int(tokens[3])
+        elif op == "li":
+            result = int(tokens[2])
+        elif op in Checker.BRANCHES:
+            if Checker.BRANCHES[op](regs[reg(tokens[1])], regs[reg(tokens[2])]):
+                next_pc = core.program_label_map[tokens[3]]
+        elif op == "j":
+            next_pc = core.program_label_map[tokens[1]]
+        elif op == "jal":
+            result = pc + 1
+            next_pc = core.program_label_map[tokens[2]]
+        elif op == "jr":
+            next_pc = regs[reg(tokens[1])]
+        elif op == "la":
+            result = self.place_data(core, model, core.data_segment[tokens[2]])
+        elif op in ("lw", "sw", "lw_spm", "sw_spm"):
+            offset, base = Checker.memory_operand(tokens[2])
+            result = self.access(core, op, regs[base] + offset, regs[reg(tokens[1])], dest)
+        elif op in ("amoadd.w", "amoswap.w", "lr.w", "sc.w"):
+            offset, base = Checker.memory_operand(tokens[-1])
+            address = regs[base] + offset
+            if op == "sc.w":
+                # whether the reservation held depends on timing
+                if core.registers[dest] == 0:
+                    self.store(core, address, regs[reg(tokens[2])])
+                result = core.registers[dest]
+            else:
+                result = self.load(core, address, dest, shared=True)
+                if op == "amoadd.w":
+                    self.store(core, address, result + regs[reg(tokens[2])])
+                elif op == "amoswap.w":
+                    self.store(core, address, regs[reg(tokens[2])])
+        elif op in ("dma_in", "dma_out"):
+            spm_addr, mem_addr, count = (regs[reg(token)] for token in tokens[1:4])
+            pad = self.scratch_pads[core.coreid]
+            for i in range(count):
+                if op == "dma_in":
+                    pad[(spm_addr + 4 * i) // 4] = self.memory[mem_addr + 4 * i]
+                else:
+                    self.store(core, mem_addr + 4 * i, pad[(spm_addr + 4 * i) // 4])
+        elif op == "dma_poll":
+            result = core.registers[dest]
+        elif op not in ("sync", "fence", "dma_wait", "ecall"):
+            raise self.mismatch(core, tokens, pc, [f"the reference model has no instruction {op}"])
+
+        if dest is not None:
+            regs[dest] = result
+        model.pc = next_pc
+
+    def access(self, core, op, address, value, dest):
+        """lw/sw and their scratch-pad forms; lw and sw reach the pad inside its window."""
+        pad = self.scratch_pads[core.coreid]
+        if op in ("lw", "sw") and self.candm.scratch_pad_offset(address) is not None:
+            op, address = op + "_spm", self.candm.scratch_pad_offset(address)
+        if op == "lw_spm":
+            return pad[address // 4]
+        if op == "sw_spm":
+            pad[address // 4] = value
+        elif op == "lw":
+            return self.load(core, address, dest)
+        else:
+            self.store(core, address, value)
+        return None
+
+    def load(self, core, address, dest, shared=False):
+        """The word at `address`; the pipeline's if it is `shared` or other cores write it too."""
+        value = self.memory[address]
+        shared = shared or any(writer != core.coreid for writer in self.writers.get(address, ()))
+        if shared and core.registers[dest] != value:
+            self.stats["adopted"] += 1
+            return core.registers[dest]
+        return value
+
+    def store(self, core, address, value):
+        self.memory[address] = value
+        self.writers.setdefault(address, set()).add(core.coreid)
+
+    def place_data(self, core, model, values):
+        """la: the words go below the previous ones, as Core.place_data."""
+        for value in values:
+            self.store(core, model.data_index, value)
+            model.data_index -= 4
+        return model.data_index + 4
+
+    def get_stats(self):
+        return self.stats
+
+
+def make_checker(config, cores, candm):
+    """Build the checker of `cores` from `checker_config`; None unless enabled."""
+    if not config or not config.get("enabled"):
+        return None
+    return Checker(cores, candm)
@@ -12,42 +12,68 @@ class If_program:
             if pipeline_reg_if.get("cycles_remaining", 0) > 1:
                 pipeline_reg_if["cycles_remaining"] -= 1
                 core.stall_count += 1
+                fetch_pc = pipeline_reg_if["pc"]
                 print("IF stage stalling, cycles remaining:", pipeline_reg_if["cycles_remaining"],
-                      "for instruction fetch at PC", pc - 1, If_program.program[pc - 1])
+                      "for instruction fetch at PC", fetch_pc, pipeline_reg_if["raw"])
                 
                 if pipeline_reg_if["cycles_remaining"] == 1:
                     if pipeline_reg_if["raw"] == "sync":
-                        print("Core", core.coreid, "sync instruction at PC", pc - 1)
-                        If_program.global_sync_pointer[pc-1][core.coreid] = 1
-                        if If_program.global_sync_pointer[pc-1] != [1,1,1,1]:
+                        print("Core", core.coreid, "sync instruction at PC", fetch_pc)
+                        If_program.global_sync_pointer[fetch_pc][core.coreid] = 1
+                        if If_program.global_sync_pointer[fetch_pc] != [1,1,1,1]:
                             pipeline_reg_if["cycles_remaining"] += 1
-                            print("Core", core.coreid, "waiting for other cores to sync at PC", pc - 1)
+                            print("Core", core.coreid, "waiting for other cores to sync at PC", fetch_pc)
                             print("adding more clock cycles to work")
             # once cycles_remaining==1, let it move to ID next cycle
             return pc, pipeline_reg_if
 
         if pc < len(If_program.program):
+            if core.fetch_stopped:
+                return pc, None
+            if core.loop_accelerator is not None and core.loop_accelerator.hold_fetch(pc, If_program.program):
+                return pc, None
 
-            instr = If_program.program[pc]
-            addr = pc * 4 + 320 #40 is the address offset of the first instruciton in memory
+            addr = core.text_base + 4 * pc
+            stall_cycles = core.fetch(addr)
+            instr = core.instruction(pc)
 
-            fetched, stall_cycles = core.candm.read(core.coreid, addr, True)
+            # fetch continues down the predicted path
+            fetch_pc = pc
+            pred_next, prediction = core.predict_next_pc(fetch_pc)
 
             pipeline_reg_if = {
                 "raw": instr,
+                "pc": fetch_pc,
+                "pred_next": pred_next,
+                "prediction": prediction,
                 "cycles_remaining": max(1, stall_cycles)
             }
-            print(core.coreid, "IF: fetched", instr, "at PC", pc, "with", stall_cycles, "stall cycles")
-            pc += 1
+            print(core.coreid, "IF: fetched", instr, "at PC", fetch_pc, "with", stall_cycles, "stall cycles")
+            pc = pred_next
+
+            if core.width > 1:
+                # A wide core goes on down the predicted path while it stays sequential and in
+                # the same I-cache line; a sync is always fetched alone.
+                group = [{"raw": instr, "pc": fetch_pc, "pred_next": pred_next, "prediction": prediction}]
+                line = addr // core.fetch_line
+                while ("sync" not in instr and len(group) < core.width and pc == group[-1]["pc"] + 1 and
+                       pc < len(If_program.program) and (core.text_base + 4 * pc) // core.fetch_line == line and
+                       "sync" not in core.instruction(pc)):
+                    next_pc, next_prediction = core.predict_next_pc(pc)
+                    group.append({"raw": core.instruction(pc), "pc": pc,
+                                  "pred_next": next_pc, "prediction": next_prediction})
+                    pc = next_pc
+                pipeline_reg_if["group"] = group
+                print(core.coreid, "IF: fetch group", [entry["raw"] for entry in group])
 
             if "sync" in instr:
-                If_program.global_sync_pointer[pc-1][core.coreid] = 1
-                print("Core", core.coreid, "sync instruction at PC", pc - 1)
-                if If_program.global_sync_pointer[pc-1] != [1,1,1,1]:
+                If_program.global_sync_pointer[fetch_pc][core.coreid] = 1
+                print("Core", core.coreid, "sync instruction at PC", fetch_pc)
+                if If_program.global_sync_pointer[fetch_pc] != [1,1,1,1]:
                     if pipeline_reg_if["cycles_remaining"] == 1:
                         pipeline_reg_if["cycles_remaining"] += 1
-                        print("Core", core.coreid, "waiting for other cores to sync at PC", pc - 1)
-                    print("Core", core.coreid, "waiting for other cores to sync at PC", pc - 1)
+                        print("Core", core.coreid, "waiting for other cores to sync at PC", fetch_pc)
+                    print("Core", core.coreid, "waiting for other cores to sync at PC", fetch_pc)
 
         else:
             print(core.coreid, pc,  "pc greater than limits")
@@ -55,8 +81,16 @@ class If_program:
         return pc, pipeline_reg_if
 
 
+import re
+import yaml
 from Storage import CacheAndMemory
 from Memory import Memory
+from BranchPredictor import make_branch_unit
+from Scoreboard import Scoreboard
+from FunctionalUnits import make_functional_units
+from StoreBuffer import make_store_buffer
+from LoopAccelerator import make_loop_accelerator
+from Blocks import divide
 
 class Core:
     latencies = {
@@ -68,8 +102,50 @@ class Core:
     candm = CacheAndMemory(config_path="config.yaml",
                           memory=memory,
                           num_cores=4)
+    with open("config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+    # logical stages in order; IF, EX and MEM may be split into sub-stages
+    logical_stages = ("IF", "ID", "EX", "MEM", "WB")
+    # forwarding paths into EX: (EX -> EX, MEM -> EX)
+    forwarding_paths = {
+        "none": (False, False),
+        "ex_ex": (True, False),
+        "mem_ex": (False, True),
+        "full": (True, True),
+    }
+    hazard_policies = ("interlock", "none")
+    # opcodes that access the data memory in MEM
+    memory_ops = ("la", "lw", "sw", "lw_spm", "sw_spm", "sync",
+                  "amoadd.w", "amoswap.w", "lr.w", "sc.w", "fence",
+                  "dma_in", "dma_out", "dma_wait", "dma_poll")
+    # atomic memory operations, performed at the shared L2: op rd rs2 (rs1), lr.w rd (rs1)
+    atomic_ops = ("amoadd.w", "amoswap.w", "lr.w", "sc.w")
+    # scratch-pad DMA: dma_in/dma_out rs_spm rs_mem rs_count start a transfer into/out of
+    # the scratch pad, dma_wait waits for all of them, dma_poll rd reads how many are left
+    dma_ops = ("dma_in", "dma_out", "dma_wait", "dma_poll")
+    # instructions whose result is the data of their memory access
+    memory_result_ops = ("la", "lw", "lw_spm", "dma_poll") + atomic_ops
 
-    def __init__(self, coreid):
+    @staticmethod
+    def parse_stages(stages):
+        """
+        Sub-stage count of each logical stage from a stage list such as
+        [IF1, IF2, ID, EX1, EX2, MEM, WB]. ID and WB cannot be split.
+        """
+        depth = {stage: 0 for stage in Core.logical_stages}
+        order = []
+        for name in stages:
+            stage = re.sub(r"\d+$", "", str(name).upper())
+            if stage not in depth:
+                raise ValueError(f"Unknown pipeline stage: {name}")
+            if not order or order[-1] != stage:
+                order.append(stage)
+            depth[stage] += 1
+        if tuple(order) != Core.logical_stages or depth["ID"] != 1 or depth["WB"] != 1:
+            raise ValueError(f"Stages must be IF+, ID, EX+, MEM+, WB in order: {stages}")
+        return depth
+
+    def __init__(self, coreid, forwarding=None, hazard_policy=None):
         self.pc = 0
         self.coreid = coreid
         self.program_label_map = {}
@@ -90,11 +166,98 @@ class Core:
             "WB": None,
         }
 
+        self.id_fetch = None  # IF latch (pc, prediction) of the instruction held in ID.
+        self.scoreboard = Scoreboard()  # In-flight register writers and outstanding load misses.
+        self.decoded = {}  # program line -> (tokens, register use), decoded once.
+
         self.stall_count = 0  # Total stall cycles.
         self.pipeline_flush_count = 0
         self.inst_executed = 0
 
+        # Stage list: a split IF or EX keeps its first sub-stage in pipeline_reg and the
+        # later ones in `substages`, each holding its own instruction. A split MEM queues
+        # instructions in its earlier sub-stages and accesses memory in the last one, so
+        # wrong-path instructions never reach memory before an older branch resolves.
+        pipeline_config = Core.config.get("pipeline_config") or {}
+        self.stages = pipeline_config.get("stages") or list(Core.logical_stages)
+        self.depth = Core.parse_stages(self.stages)
+        self.substages = {stage: [None] * (self.depth[stage] - 1) for stage in ("IF", "EX", "MEM")}
+        # Fetch slots squashed by a redirect from each stage: the sub-stages ahead of its first one,
+        # less the one the fetch after the redirect fills.
+        self.branch_penalty = {}
+        position = 0
+        for stage in Core.logical_stages:
+            self.branch_penalty[stage] = position - 1
+            position += self.depth[stage]
+
+        # Branch prediction; None fetches sequentially and redirects on every taken branch.
+        self.branch_unit = make_branch_unit(Core.config.get("branch_predictor_config"))
+        self.flush_cycles_saved = 0
+
+        # Stage in which conditional branches and jr read their operands and redirect;
+        # j and jal always redirect in ID.
+        self.resolve_stage = str(pipeline_config.get("branch_resolve_stage", "WB")).upper()
+        if self.resolve_stage not in ("ID", "EX", "WB"):
+            raise ValueError(f"Unsupported branch resolve stage: {self.resolve_stage}")
+
+        # Forwarding paths and hazard policy; arguments override the config.
+        self.forwarding = forwarding or pipeline_config.get("forwarding", "none")
+        if self.forwarding not in Core.forwarding_paths:
+            raise ValueError(f"Unknown forwarding paths: {self.forwarding}")
+        self.forward_ex, self.forward_mem = Core.forwarding_paths[self.forwarding]
+        self.hazard_policy = hazard_policy or pipeline_config.get("hazard_policy", "interlock")
+        if self.hazard_policy not in Core.hazard_policies:
+            raise ValueError(f"Unknown hazard policy: {self.hazard_policy}")
+
+        # Issue width: a wide core fetches up to `width` consecutive instructions from one
+        # I-cache line and decodes, issues and writes back up to `width` per cycle. It always
+        # executes on functional units and accesses memory once per cycle from a single MEM.
+        self.width = int(pipeline_config.get("issue_width", 1))
+        if self.width < 1:
+            raise ValueError(f"Issue width must be at least 1: {self.width}")
+        if self.width > 1 and self.depth["MEM"] > 1:
+            raise ValueError("An issue width above 1 needs a single MEM stage")
+        self.fetch_line = Core.config["l1i_config"]["block_size"]
+        # Fetch buffer: the last fetch_buffer-byte block read from the I-cache serves the
+        # sequential fetches inside it without another access; 0 accesses it per instruction.
+        self.fetch_block = int(pipeline_config.get("fetch_buffer", 0))
+        if self.fetch_block and (self.fetch_line % self.fetch_block or self.fetch_block % 4):
+            raise ValueError(f"The fetch buffer must be a word multiple dividing the I-cache line: {self.fetch_block}")
+        self.fetch_buffer = None  # block held by the fetch buffer
+        # Instructions start at text_base; with an instruction memory (Assembler) fetch
+        # decodes the words the L1-I holds there instead of taking the program text.
+        self.text_base = int((Core.config.get("instruction_memory_config") or {}).get("text_base", 320))
+        self.assembler = None
+        self.fetch_stats = {"icache_accesses": 0, "buffer_hits": 0}
+        self.active_cycles = 0
+        self.retired_per_cycle = [0] * (self.width + 1)  # cycles retiring 0..width instructions
+
+        # Functional units; None keeps one instruction in EX for its whole latency.
+        # With units, `executing` holds the issued instructions in program order and
+        # the sub-stages of a split EX lengthen every unit instead.
+        units_config = Core.config.get("functional_units_config") or {}
+        if self.width > 1:
+            units_config = {**units_config, "enabled": True}
+        self.units = make_functional_units(units_config, Core.latencies)
+        self.executing = []
+        if self.units is not None:
+            self.substages["EX"] = []
+
+        # Store buffer between MEM and the L1-D; None makes stores write from MEM.
+        self.store_buffer = make_store_buffer(Core.config.get("store_buffer_config"))
+        self.drain_requested = False  # an instruction waits for the buffer to empty
+
+        # Loop extrapolation; None simulates every iteration. The core idles until
+        # skip_until while the iterations it fast-forwarded would have run.
+        self.loop_accelerator = make_loop_accelerator(Core.config.get("loop_accelerator_config"), self)
+        self.skip_until = 0
+        self.fetch_stopped = False  # set while the pipeline drains for the functional model
+        self.checker = None  # reference model checking every retirement, see Checker.py
+
     def get_ipc(self):
+        if self.width > 1:
+            # Stalls overlap with issue on a wide core, so count cycles instead.
+            return self.inst_executed / self.active_cycles if self.active_cycles else 0
         i = self.inst_executed
         s = self.stall_count
         pf = self.pipeline_flush_count
@@ -111,11 +274,50 @@ class Core:
                 self.program_label_map[label] = i
         print("Label Map:", self.program_label_map)
 
+    def fetch(self, addr):
+        """Stall cycles of fetching the instruction at `addr`: from the fetch buffer if it
+        holds its block, else from the I-cache, refilling the buffer."""
+        if self.fetch_block:
+            block = addr // self.fetch_block
+            if block == self.fetch_buffer:
+                self.fetch_stats["buffer_hits"] += 1
+                return Core.candm.latencies["l1_hit"]
+            self.fetch_buffer = block
+        self.fetch_stats["icache_accesses"] += 1
+        return Core.candm.read(self.coreid, addr, True)[1]
+
+    def instruction(self, pc):
+        """Text of the instruction at `pc`: the program line, or the disassembly of the
+        word in the L1-I (memory if the line is gone) with an instruction memory."""
+        if self.assembler is None:
+            return If_program.program[pc]
+        addr = self.text_base + 4 * pc
+        l1 = Core.candm.l1i[self.coreid]
+        block = l1.findBlock(addr)
+        word = block["data"][l1._split_address(addr)[2]] if block is not None else Core.candm.memory.memory[addr]
+        return self.assembler.disassemble(word, pc)
+
     # --- Helper Methods for Hazard Detection ---
+    def decode(self, raw):
+        """
+        Tokens of a program line without its label, and its register use:
+        (destination, source mask, source and destination mask).
+        """
+        entry = self.decoded.get(raw)
+        if entry is None:
+            tokens = raw.split()
+            if tokens and ":" in tokens[0]:
+                tokens.pop(0)
+            dest = self.get_destination_register(tokens)
+            sources = Scoreboard.mask(self.extract_source_registers(tokens))
+            entry = self.decoded[raw] = (tokens, (dest, sources, sources | Scoreboard.mask([dest])))
+        return entry
+
     def get_destination_register(self, tokens):
         """Return the destination register for instructions that write to a register."""
         op = tokens[0].lower()
-        if op in ("add", "addi", "sub", "slt", "li", "lw", "lw_spm", "jal", "la"):
+        if op in ("add", "addi", "sub", "slt", "mul", "div", "rem", "li", "lw", "lw_spm", "jal", "la",
+                  "dma_poll") + Core.atomic_ops:
             try:
                 return int(tokens[1][1:])
             except Exception:
@@ -126,7 +328,7 @@ class Core:
         """Return a list of registers that the instruction reads from."""
         op = tokens[0].lower()
         sources = []
-        if op in ("add", "sub", "slt"):
+        if op in ("add", "sub", "slt", "mul", "div", "rem"):
             sources = [int(tokens[2][1:]), int(tokens[3][1:])]
         elif op in ("addi",):
             sources = [int(tokens[2][1:])]
@@ -149,22 +351,55 @@ class Core:
                 sources = [src1, src2]
             else:
                 sources = [src1]
+        elif op in Core.atomic_ops:
+            # Format: amoadd.w rd rs2 (rs1), lr.w rd (rs1) => sources: rs2 and rs1.
+            sources = [self.atomic_address_register(tokens)]
+            if op != "lr.w":
+                sources.insert(0, int(tokens[2][1:]))
+        elif op in ("dma_in", "dma_out"):
+            sources = [int(token[1:]) for token in tokens[1:4]]
         elif op in ("bne", "beq", "ble"):
             sources = [int(tokens[1][1:]), int(tokens[2][1:])]
         elif op in ("jr",):
             sources = [int(tokens[1][1:])]
         return sources
 
-    def detect_raw_hazard(self, tokens):
-        """Detect a RAW hazard if any source register of the new instruction is the destination
-        of an instruction in EX or MEM."""
-        sources = self.extract_source_registers(tokens)
-        for stage in ["EX", "MEM"]:
-            inst = self.pipeline_reg[stage]
-            if inst is not None:
-                dest = self.get_destination_register(inst["tokens"])
-                if dest is not None and dest in sources:
-                    return True
+    @staticmethod
+    def atomic_address_register(tokens):
+        """Address register of an atomic: the last operand, written (rs1) or 0(rs1)."""
+        return int(tokens[-1].split('(')[-1].rstrip(')')[1:])
+
+    def read_operand(self, reg):
+        """Source operand value: forwarded from the youngest in-flight writer when
+        forwarding is enabled and its result is known, else the register file."""
+        if self.forwarding == "none":
+            return self.registers[reg]
+        return self.scoreboard.forward(reg, self.registers[reg])
+
+    def detect_raw_hazard(self, use, in_id=False):
+        """
+        Detect a RAW hazard if a source register of the new instruction is written by an
+        instruction in EX or MEM whose result no forwarding path can deliver in time.
+        The instruction reads its operands when it enters EX next cycle, or now for a
+        branch resolving in ID (`in_id`), which can only take results that left EX.
+        """
+        scoreboard = self.scoreboard
+        waiting = scoreboard.pending & use[1]
+        if not waiting or self.forwarding == "none":
+            return bool(waiting)
+        needed = Core.candm.clock + (0 if in_id else 1)
+        while waiting:
+            bit = waiting & -waiting
+            waiting ^= bit
+            reg = bit.bit_length() - 1
+            if scoreboard.stage[reg] == "EX":
+                # The writer moves on to MEM as this instruction enters EX.
+                forwarded = (self.forward_ex and not in_id and scoreboard.valued & bit
+                             and scoreboard.ready[reg] <= needed)
+            else:
+                forwarded = (self.forward_mem or in_id) and scoreboard.ready[reg] <= needed
+            if not forwarded:
+                return True
         return False
 
     def detect_war_hazard(self, tokens):
@@ -180,27 +415,157 @@ class Core:
                     return True
         return False
 
-    def detect_data_hazard(self, tokens):
-        """Combine RAW and WAR hazard detection."""
-        return self.detect_raw_hazard(tokens)
+    def detect_pending_load(self, use):
+        """With a non-blocking L1-D, detect a source or destination register that
+        is still waiting for the data of an outstanding load miss."""
+        return self.scoreboard.busy(0, Core.candm.clock, use[2])
 
-    def flush_pipeline(self):
-        """Flush the pipeline registers for control hazards."""
+    def detect_data_hazard(self, use, in_id=False):
+        """Combine RAW and pending load hazard detection."""
+        if self.hazard_policy == "none":
+            return False
+        return self.detect_raw_hazard(use, in_id) or self.detect_pending_load(use)
+
+    def flush_pipeline(self, stage="WB"):
+        """Flush the pipeline registers younger than `stage` for control hazards."""
         self.pipeline_flush_count += 1
-        self.pipeline_reg["IF"] = None
-        self.pipeline_reg["ID"] = None
-        self.pipeline_reg["EX"] = None
-        self.pipeline_reg["MEM"] = None
+        for younger in ("IF", "ID", "EX", "MEM"):
+            if younger == stage:
+                break
+            self.pipeline_reg[younger] = None
+            if younger in self.substages:
+                self.substages[younger] = [None] * len(self.substages[younger])
+            if younger == "EX" and self.units is not None:
+                self.executing = []
+                self.units.flush()
+        if stage == "WB":
+            # Every writer still in flight was younger than the branch.
+            self.scoreboard.flush()
+
+    # --- Branch Prediction ---
+    def predict_next_pc(self, pc):
+        """Next fetch PC after `pc` and the prediction state to resolve it with."""
+        if self.branch_unit is None:
+            return pc + 1, None
+        return self.branch_unit.predict(pc)
+
+    def branch_taken(self, op, tokens, read):
+        rs1 = read(int(tokens[1][1:]))
+        rs2 = read(int(tokens[2][1:]))
+        return (op == "bne" and rs1 != rs2) or \
+               (op == "beq" and rs1 == rs2) or \
+               (op == "ble" and rs1 <= rs2)
+
+    def resolve_in(self, stage, tokens, inst):
+        """Resolve the control instruction `tokens` if `stage` is where it resolves."""
+        op = tokens[0].lower()
+        if op in ("j", "jal"):
+            if stage == "ID":
+                label = tokens[1] if op == "j" else tokens[2]
+                print("Jump redirected in ID for instruction:", tokens)
+                self.resolve_branch(inst, op, True, self.program_label_map[label], stage)
+        elif op in ("bne", "beq", "ble", "jr") and stage == self.resolve_stage:
+            # WB reads the register file; earlier stages may take forwarded results.
+            read = self.registers.__getitem__ if stage == "WB" else self.read_operand
+            if op == "jr":
+                print("Jump-register taken in", stage, "for instruction:", tokens)
+                self.resolve_branch(inst, op, True, read(int(tokens[1][1:])), stage)
+            else:
+                taken = self.branch_taken(op, tokens, read)
+                print("Branch", "taken" if taken else "not taken", "in", stage, "for instruction:", tokens)
+                self.resolve_branch(inst, op, taken, self.program_label_map[tokens[3]], stage)
+
+    def resolve_branch(self, inst, op, taken, target, stage="WB"):
+        """Redirect fetch and squash the wrong path if the fetched successor was wrong."""
+        pc = inst["pc"]
+        actual_next = target if taken else pc + 1
+        if self.branch_unit is not None:
+            self.branch_unit.resolve(pc, op, taken, target, inst["pred_next"], inst["prediction"])
+
+        if actual_next != inst["pred_next"]:
+            if actual_next == pc + 1:
+                # predicted taken but fell through: a flush sequential fetch avoids
+                self.flush_cycles_saved -= self.branch_penalty[stage]
+            print("Core", self.coreid, "redirecting fetch to PC", actual_next)
+            self.pc = actual_next
+            self.fetch_buffer = None
+            self.flush_pipeline(stage)
+        elif actual_next != pc + 1:
+            # correctly predicted redirect: sequential fetch would have flushed here
+            self.flush_cycles_saved += self.branch_penalty[stage]
+
+    # --- Split Stages ---
+    def stage_output(self, stage):
+        """Latch the next stage takes instructions from: the last sub-stage of a split stage,
+        or the oldest executing instruction with functional units."""
+        if stage == "EX" and self.units is not None:
+            return self.executing[0] if self.executing else None
+        slots = self.substages.get(stage)
+        return slots[-1] if slots else self.pipeline_reg[stage]
+
+    def clear_output(self, stage):
+        if stage == "EX" and self.units is not None:
+            self.executing.pop(0)["unit"].release()
+            return
+        slots = self.substages.get(stage)
+        if slots:
+            slots[-1] = None
+        else:
+            self.pipeline_reg[stage] = None
+
+    def memory_input(self):
+        """Instruction waiting for the memory access: last queued MEM sub-stage, else EX output."""
+        slots = self.substages["MEM"]
+        return slots[-1] if slots else self.stage_output("EX")
+
+    def clear_memory_input(self):
+        if self.substages["MEM"]:
+            self.substages["MEM"][-1] = None
+        else:
+            self.clear_output("EX")
+
+    def queue_memory_access(self):
+        """Move instructions through the sub-stages ahead of the memory access of a split MEM."""
+        slots = self.substages["MEM"]
+        if not slots:
+            return
+        for i in range(len(slots) - 1, 0, -1):
+            if slots[i] is None:
+                slots[i], slots[i - 1] = slots[i - 1], None
+        ex_data = self.stage_output("EX")
+        if slots[0] is None and ex_data is not None and ex_data.get("cycles_remaining", 0) <= 1:
+            slots[0] = ex_data
+            self.clear_output("EX")
+            if ex_data["tokens"][0].lower() in Core.memory_result_ops:
+                # Nothing can forward the result before the access has read it.
+                self.scoreboard.wait(ex_data["dest"], ex_data["seq"], "MEM")
+            else:
+                self.scoreboard.advance(ex_data["dest"], ex_data["seq"], "MEM")
+
+    def shift_substages(self, stage):
+        """Move each instruction of a split stage one sub-stage on where the next one is free."""
+        slots = self.substages[stage]
+        if not slots:
+            return
+        for i in range(len(slots) - 1, 0, -1):
+            if slots[i] is None:
+                slots[i], slots[i - 1] = slots[i - 1], None
+        head = self.pipeline_reg[stage]
+        if slots[0] is None and head is not None and head.get("cycles_remaining", 0) <= 1:
+            slots[0] = head
+            self.pipeline_reg[stage] = None
 
     # --- Pipeline Stages ---
     def ID(self):
-        if self.pipeline_reg["IF"] is None or self.pipeline_reg["IF"]["cycles_remaining"] > 1:
+        held = self.pipeline_reg["ID"]
+        if held is not None and held[0].lower() != "nop":
+            # EX could not take the instruction (MEM is stalled): hold it in ID.
+            print("Stalling in ID, EX stage not free for instruction:", held)
+            self.stall_count += 1
+        elif self.stage_output("IF") is None or self.stage_output("IF")["cycles_remaining"] > 1:
             self.pipeline_reg["ID"] = None
         else:
-            tokens = self.pipeline_reg["IF"]["raw"].split()
-            # Remove label if present.
-            if tokens and ":" in tokens[0]:
-                tokens.pop(0)
+            tokens, use = self.decode(self.stage_output("IF")["raw"])
             # Check for a structural hazard: if EX is still busy with an instruction that hasn't
             # finished its multi-cycle execution, stall ID.
             if (self.pipeline_reg["EX"] is not None and
@@ -218,22 +583,40 @@ class Core:
             #     self.stall_count += 1
                 # Do not clear IF so the instruction remains.
             else:
-                # For branch/jump instructions, bypass hazard detection.
-                if tokens[0].lower() in ("bne", "beq", "ble", "j", "jal", "jr"):
+                op = tokens[0].lower()
+                resolves_late = self.resolve_stage == "WB"
+                # Branches resolving in WB read the register file there, but
+                # still wait for an outstanding load miss.
+                if (op in ("bne", "beq", "ble", "jr") and resolves_late and
+                        self.hazard_policy == "interlock" and self.detect_pending_load(use)):
+                    print("Stalling in ID waiting for load miss for instruction:", tokens)
+                    self.pipeline_reg["ID"] = ["NOP"]
+                    self.stall_count += 1
+                # Jumps and late-resolving branches bypass hazard detection.
+                elif op in ("j", "jal") or (op in ("bne", "beq", "ble", "jr") and resolves_late):
                     self.pipeline_reg["ID"] = tokens
-                    self.pipeline_reg["IF"] = None
+                    self.id_fetch = self.stage_output("IF")
+                    self.clear_output("IF")
+                    self.resolve_in("ID", tokens, self.id_fetch)
                 else:
                     # Check for data hazards.
-                    if self.detect_data_hazard(tokens):
+                    in_id = self.resolve_stage == "ID" and op in ("bne", "beq", "ble", "jr")
+                    if self.detect_data_hazard(use, in_id):
                         print("Stalling in ID due to data hazard for instruction:", tokens)
                         self.pipeline_reg["ID"] = ["NOP"]
                         self.stall_count += 1
                     else:
                         # No hazards: move instruction from IF to ID.
                         self.pipeline_reg["ID"] = tokens
-                        self.pipeline_reg["IF"] = None
+                        self.id_fetch = self.stage_output("IF")
+                        self.clear_output("IF")
+                        self.resolve_in("ID", tokens, self.id_fetch)
 
     def EX(self):
+        if self.units is not None:
+            self.issue_to_unit()
+            return
+
         # If an instruction is already in EX, check its remaining cycles.
         if self.pipeline_reg["EX"] is not None:
             ex_inst = self.pipeline_reg["EX"]
@@ -251,7 +634,63 @@ class Core:
             return
 
         tokens = self.pipeline_reg["ID"]
+        # The instruction remains in EX for its latency.
+        self.pipeline_reg["EX"] = self.execute(tokens, Core.latencies.get(tokens[0].lower(), 1))
+        # Clear ID since the instruction moves to EX.
+        self.pipeline_reg["ID"] = None
+        self.resolve_in("EX", tokens, self.pipeline_reg["EX"])
+
+    def issue_to_unit(self):
+        """EX with functional units: issue the instruction in ID to a free unit of its class,
+        while the instructions already issued advance through their units."""
+        for inst in self.executing:
+            if inst["cycles_remaining"] > 1:
+                inst["cycles_remaining"] -= 1
+        if self.width > 1:
+            self.issue_group()
+            return
+
+        tokens = self.pipeline_reg["ID"]
+        if tokens is None or tokens[0].lower() == "nop":
+            return
+        op = tokens[0].lower()
+        issued = self.units.acquire(op, Core.candm.clock, self.depth["EX"] - 1)
+        if issued is None:
+            # ID holds the instruction until a unit is free.
+            print("EX: no free", self.units.unit_class(op), "unit for instruction:", tokens)
+            return
+        unit, latency = issued
+        inst = self.execute(tokens, latency)
+        inst["unit"] = unit
+        self.executing.append(inst)
+        self.pipeline_reg["ID"] = None
+        self.resolve_in("EX", tokens, inst)
+
+    def execute(self, tokens, latency, fetch=None):
+        """Compute the instruction in ID (fetched as `fetch`, by default `id_fetch`) and
+        return its EX latch; it leaves the first EX sub-stage after `latency` cycles."""
+        fetch = fetch or self.id_fetch
         op = tokens[0].lower()
+        result, mem_addr = self.compute(op, tokens, self.read_operand, fetch["pc"])
+        dest = self.decode(fetch["raw"])[1][0]
+        # ALU results can be forwarded from the end of EX; loads and la only from the end of MEM.
+        forwardable = op in ("add", "addi", "sub", "slt", "mul", "div", "rem", "li", "jal")
+        return {
+            "tokens": tokens,
+            "pc": fetch["pc"],
+            "pred_next": fetch["pred_next"],
+            "prediction": fetch["prediction"],
+            "result": result,
+            "mem_addr": mem_addr,
+            "cycles_remaining": latency,
+            "dest": dest,
+            "seq": self.scoreboard.issue(dest, "EX", Core.candm.clock + latency + len(self.substages["EX"]),
+                                         result if forwardable else None),
+        }
+
+    def compute(self, op, tokens, read, pc):
+        """Result and memory address of the instruction `tokens` at `pc`,
+        reading its source registers through `read`."""
         result = None
         mem_addr = None
 
@@ -261,60 +700,66 @@ class Core:
         elif op == "add":
             rs1 = int(tokens[2][1:])
             rs2 = int(tokens[3][1:])
-            result = self.registers[rs1] + self.registers[rs2]
+            result = read(rs1) + read(rs2)
         elif op == "addi":
             rs1 = int(tokens[2][1:])
             imm = int(tokens[3])
-            result = self.registers[rs1] + imm
+            result = read(rs1) + imm
         elif op == "sub":
             rs1 = int(tokens[2][1:])
             rs2 = int(tokens[3][1:])
-            result = self.registers[rs1] - self.registers[rs2]
+            result = read(rs1) - read(rs2)
         elif op == "slt":
             rs1 = int(tokens[2][1:])
             rs2 = int(tokens[3][1:])
-            result = 1 if self.registers[rs1] < self.registers[rs2] else 0
+            result = 1 if read(rs1) < read(rs2) else 0
+        elif op in ("mul", "div", "rem"):
+            rs1 = read(int(tokens[2][1:]))
+            rs2 = read(int(tokens[3][1:]))
+            # RISC-V division by zero, quotients rounding towards zero.
+            result = rs1 * rs2 if op == "mul" else divide(op, rs1, rs2)
         elif op == "li":
             imm = int(tokens[2])
             result = imm
         elif op == "lw" or op == "lw_spm":
             offset, reg = tokens[2].split('(')
             rs = int(reg[:-1][1:])
-            mem_addr = self.registers[rs] + int(offset)
+            mem_addr = read(rs) + int(offset)
         elif op == "sw" or op == "sw_spm":
             offset, reg = tokens[2].split('(')
             rs = int(tokens[1][1:])
             rd = int(reg[:-1][1:])
-            mem_addr = self.registers[rd] + int(offset)
+            mem_addr = read(rd) + int(offset)
+        elif op in Core.atomic_ops:
+            # The word to add, swap or store travels to MEM as the result.
+            offset = tokens[-1].split('(')[0]
+            mem_addr = read(self.atomic_address_register(tokens)) + int(offset or 0)
+            if op != "lr.w":
+                result = read(int(tokens[2][1:]))
+        elif op in ("dma_in", "dma_out"):
+            # scratch-pad address, memory address and word count
+            result = tuple(read(int(token[1:])) for token in tokens[1:4])
+        elif op in ("dma_wait", "dma_poll"):
+            result = 0
         elif op in ("bne", "beq", "ble"):
             result = (int(tokens[1][1:]), int(tokens[2][1:]), tokens[3])
         elif op == "jal":
-            result = self.pc + 1
+            result = pc + 1
         elif op == "jr":
             rs = int(tokens[1][1:])
-            result = self.registers[rs]
+            result = read(rs)
         elif op == "j":
             # For an unconditional jump no result is needed.
             pass
         elif op == "ecall":
             # For ecall, we do no computation in EX.
             result = 0
-        elif op == "sync":
+        elif op == "sync" or op == "fence":
             result = 0
         else:
             print("undefined operation in EX stage:", tokens[0])
 
-        # Set the instruction's specific latency.
-        latency = Core.latencies.get(op, 1)
-        # The instruction remains in EX for 'latency' cycles.
-        self.pipeline_reg["EX"] = {
-            "tokens": tokens,
-            "result": result,
-            "mem_addr": mem_addr,
-            "cycles_remaining": latency
-        }
-        # Clear ID since the instruction moves to EX.
-        self.pipeline_reg["ID"] = None
+        return result, mem_addr
 
     def MEM(self):
         #check if tehre is already an instruction in MEM stage
@@ -329,39 +774,69 @@ class Core:
                 return
 
         # Only move the instruction from EX to MEM if there is one.
-        if self.pipeline_reg["EX"] is None:
+        ex_data = self.memory_input()
+        if ex_data is None:
             self.pipeline_reg["MEM"] = None
             return
 
-        ex_data = self.pipeline_reg["EX"]
         # If the instruction is still in multi-cycle EX, wait.
         if "cycles_remaining" in ex_data and ex_data["cycles_remaining"] > 1:
             print("MEM stage waiting on EX stage stall for instruction:", ex_data["tokens"])
             self.pipeline_reg["MEM"] = None
             return
 
+        if self.store_buffer_blocks(ex_data["tokens"][0].lower()):
+            print("MEM stage waiting on the store buffer for instruction:", ex_data["tokens"])
+            self.stall_count += 1
+            self.pipeline_reg["MEM"] = None
+            return
+
+        self.pipeline_reg["MEM"] = self.access_memory(ex_data)
+        # Clear EX since the instruction moves to MEM.
+        self.clear_memory_input()
+
+    def access_memory(self, ex_data):
+        """Perform the memory access of the instruction leaving EX and return its MEM latch."""
         tokens = ex_data["tokens"]
         op = tokens[0].lower()
         result = ex_data["result"]
         mem_addr = ex_data["mem_addr"]
+        pc = ex_data["pc"]
         mem_result = result
         mem_stalls = 0
 
         if op == "la":
-            data_label = tokens[2]
-            for val in self.data_segment[data_label]:
-                # self.memory.memory[self.memory_data_index] = val
-                mem_stalls += Core.candm.write(self.coreid, self.memory_data_index, val)
-                print("Core", self.coreid, "writing", val, "at memory index", self.memory_data_index)
-                self.memory_data_index -= 4
-            mem_result = self.memory_data_index + 4
+            mem_result, mem_stalls = self.place_data(tokens[2])
+        elif op == "lw" and Core.candm.scratch_pad_offset(mem_addr) is not None:
+            # The scratch pad's window in the global address map.
+            mem_result, mem_stalls = Core.candm.read_scratch_pad(self.coreid, Core.candm.scratch_pad_offset(mem_addr))
         elif op == "lw":
             # mem_result = self.memory.memory[mem_addr]
-            mem_result, mem_stalls = Core.candm.read(self.coreid, mem_addr, False)
+            forwarded = self.store_buffer.forward(mem_addr) if self.store_buffer is not None else None
+            if forwarded is not None:
+                print("Core", self.coreid, "load forwarded from the store buffer:", forwarded)
+                mem_result, mem_stalls = forwarded, 1
+            else:
+                mem_result, mem_stalls = Core.candm.read(self.coreid, mem_addr, False, pc=pc)
+            if Core.candm.non_blocking and mem_stalls > 1:
+                # Hit-under-miss: the load leaves MEM and its destination
+                # stays busy until the MSHR fill arrives.
+                rd = int(tokens[1][1:])
+                self.scoreboard.defer(rd, Core.candm.clock + mem_stalls)
+                print("Core", self.coreid, "load miss outstanding for x{} until cycle".format(rd), Core.candm.clock + mem_stalls)
+                mem_stalls = 1
+        elif op == "sw" and Core.candm.scratch_pad_offset(mem_addr) is not None:
+            rs = int(tokens[1][1:])
+            mem_stalls = Core.candm.write_scratch_pad(self.coreid, Core.candm.scratch_pad_offset(mem_addr),
+                                                      self.registers[rs])
         elif op == "sw":
             rs = int(tokens[1][1:])
             # self.memory.memory[mem_addr] = self.registers[rs]
-            mem_stalls = Core.candm.write(self.coreid, mem_addr, self.registers[rs])
+            if self.store_buffer is not None:
+                self.store_buffer.push(mem_addr, self.registers[rs], pc)
+                mem_stalls = 1
+            else:
+                mem_stalls = Core.candm.write(self.coreid, mem_addr, self.registers[rs], pc=pc)
         elif op == "sw_spm":
             rs = int(tokens[1][1:])
             # self.memory.scratch_pad[self.coreid][mem_addr] = self.registers[rs]
@@ -372,13 +847,67 @@ class Core:
         elif op == "sync":
             print("sync in wb")
             mem_stalls = Core.candm.flush_l1_dirty_to_l2(self.coreid)
-        
+        elif op in Core.atomic_ops:
+            mem_result, mem_stalls = Core.candm.atomic(self.coreid, op, mem_addr, result, pc=pc)
+        elif op == "fence":
+            # Memory accesses leave MEM in order, so a fence only has to wait
+            # for the store buffer to drain before it.
+            mem_stalls = 1
+        elif op in ("dma_in", "dma_out"):
+            spm_addr, mem_addr, count = result
+            Core.candm.dma_start(self.coreid, op == "dma_in", spm_addr, mem_addr, count)
+            mem_stalls = 1
+        elif op == "dma_wait":
+            # MEM holds the wait until the last transfer has copied its words.
+            mem_stalls = Core.candm.dma[self.coreid].free_at - Core.candm.clock
+        elif op == "dma_poll":
+            mem_result = Core.candm.dma[self.coreid].outstanding()
 
-        self.pipeline_reg["MEM"] = {"tokens": tokens, "mem_result": mem_result, "cycles_remaining": max(1, mem_stalls)}
-        # Clear EX since the instruction moves to MEM.
+        if op in Core.memory_result_ops:
+            # The result leaves MEM with the data.
+            self.scoreboard.advance(ex_data["dest"], ex_data["seq"], "MEM",
+                                    Core.candm.clock + max(1, mem_stalls), mem_result)
+        else:
+            self.scoreboard.advance(ex_data["dest"], ex_data["seq"], "MEM")
         self.inst_executed += 1
-        self.pipeline_reg["EX"] = None
         print(mem_stalls)
+        return {"tokens": tokens, "pc": pc, "pred_next": ex_data["pred_next"],
+                "prediction": ex_data["prediction"], "mem_result": mem_result,
+                "cycles_remaining": max(1, mem_stalls),
+                "dest": ex_data["dest"], "seq": ex_data["seq"]}
+
+    def store_buffer_blocks(self, op):
+        """True if the store buffer keeps `op` out of MEM this cycle: a store waits
+        for a free entry, la, sync, fence, atomics and DMA for every buffered store to drain."""
+        buffer = self.store_buffer
+        if buffer is None:
+            return False
+        if op == "sw" and buffer.full():
+            buffer.stats["full_stalls"] += 1
+            return True
+        if op in ("la", "sync", "fence") + Core.atomic_ops + Core.dma_ops and not buffer.empty():
+            self.drain_requested = True
+            return True
+        return False
+
+    def drain_store_buffer(self):
+        """Let the store buffer write into the L1-D; drains are forced once fetch has
+        finished or an instruction waits for the buffer to empty."""
+        if self.store_buffer is not None:
+            force = self.drain_requested or self.pc >= len(If_program.program)
+            self.store_buffer.drain(Core.candm, self.coreid, Core.candm.clock, force)
+            self.drain_requested = False
+
+    def place_data(self, data_label):
+        """Write the words of `data_label` below the previous ones; returns
+        the address of its first word and the cycles the writes took."""
+        mem_stalls = 0
+        for val in self.data_segment[data_label]:
+            # self.memory.memory[self.memory_data_index] = val
+            mem_stalls += Core.candm.write(self.coreid, self.memory_data_index, val, delay=mem_stalls)
+            print("Core", self.coreid, "writing", val, "at memory index", self.memory_data_index)
+            self.memory_data_index -= 4
+        return self.memory_data_index + 4, mem_stalls
 
     def WB(self):
         mem_data = self.pipeline_reg["MEM"]
@@ -386,47 +915,29 @@ class Core:
             self.pipeline_reg["WB"] = None
             return
 
+        self.pipeline_reg["WB"] = self.write_back(mem_data)
+        self.pipeline_reg["MEM"] = None
+
+    def write_back(self, mem_data):
+        """Write back the instruction leaving MEM and return its WB latch."""
         tokens = mem_data["tokens"]
         op = tokens[0].lower()
         mem_result = mem_data["mem_result"]
 
         # For non-control instructions, write the result to the destination register.
-        if op in ("la", "add", "addi", "sub", "slt", "li", "lw", "lw_spm"):
+        if op in ("la", "add", "addi", "sub", "slt", "mul", "div", "rem", "li", "lw", "lw_spm",
+                  "dma_poll") + Core.atomic_ops:
             rd = int(tokens[1][1:])
             self.registers[rd] = mem_result
 
-        # For branch instructions, decide in WB whether to change the PC.
-        elif op in ("bne", "beq", "ble"):
-            rs1 = int(tokens[1][1:])
-            rs2 = int(tokens[2][1:])
-            label = tokens[3]
-            if (op == "bne" and self.registers[rs1] != self.registers[rs2]) or \
-               (op == "beq" and self.registers[rs1] == self.registers[rs2]) or \
-               (op == "ble" and self.registers[rs1] <= self.registers[rs2]):
-                print("Branch taken in WB for instruction:", tokens)
-                self.pc = self.program_label_map[label]
-                self.flush_pipeline()
-            else:
-                print("Branch not taken in WB for instruction:", tokens)
+        # Branches resolving in WB decide here whether to change the PC.
+        elif op in ("bne", "beq", "ble", "jr"):
+            self.resolve_in("WB", tokens, mem_data)
         
-        # For jump-and-link, jump-register, and unconditional jump instructions.
+        # Jumps already redirected fetch in ID; jal still writes its link register.
         elif op == "jal":
             rd = int(tokens[1][1:])
             self.registers[rd] = mem_result  # Return address computed in EX.
-            label = tokens[2]
-            print("Jump-and-link taken in WB for instruction:", tokens)
-            self.pc = self.program_label_map[label]
-            self.flush_pipeline()
-        elif op == "jr":
-            rs = int(tokens[1][1:])
-            print("Jump-register taken in WB for instruction:", tokens)
-            self.pc = self.registers[rs]
-            self.flush_pipeline()
-        elif op == "j":
-            label = tokens[1]
-            print("Jump taken in WB for instruction:", tokens)
-            self.pc = self.program_label_map[label]
-            self.flush_pipeline()
         elif op == "ecall":
             # For ecall, we expect the second token to contain the register to print.
             reg = int(tokens[1][1:])
@@ -435,7 +946,131 @@ class Core:
             # Optionally, you can set the final result to that register value.
             mem_result = self.registers[reg]
 
-        self.pipeline_reg["WB"] = {"tokens": tokens, "final_result": mem_result}
+        self.scoreboard.retire(mem_data["dest"], mem_data["seq"])
+        if self.checker is not None:
+            self.checker.retire(self, tokens, mem_data["pc"])
+        return {"tokens": tokens, "final_result": mem_result}
+
+    # --- Wide Issue ---
+    # On a wide core the ID latch is a list of (tokens, fetch) pairs in program order, the
+    # IF latch carries its fetch group and the MEM and WB latches are lists of instructions.
+
+    def ID_wide(self):
+        """
+        Top the decode group up from the fetch group, in order, until an instruction depends on
+        an earlier one of the group, has to wait for an instruction in flight, or is a control
+        instruction (which ends the group).
+        """
+        group = self.pipeline_reg["ID"] or []
+        fetched = self.stage_output("IF")
+        if fetched is None or fetched["cycles_remaining"] > 1 or len(group) >= self.width:
+            if group:
+                print("Stalling in ID, EX stage not free for group:", [tokens for tokens, _ in group])
+                self.stall_count += 1
+            self.pipeline_reg["ID"] = group or None
+            return
+
+        written = Scoreboard.mask([self.decode(fetch["raw"])[1][0] for _, fetch in group])
+        accepted = 0
+        entries = fetched["group"]
+        while entries and len(group) < self.width:
+            fetch = entries[0]
+            tokens, use = self.decode(fetch["raw"])
+            op = tokens[0].lower()
+            branch = op in ("bne", "beq", "ble", "jr")
+            resolves_late = branch and self.resolve_stage == "WB"
+            if use[1] & written and self.hazard_policy == "interlock":
+                print("ID: intra-group dependency for instruction:", tokens)
+                break
+            if resolves_late:
+                if self.hazard_policy == "interlock" and self.detect_pending_load(use):
+                    print("Stalling in ID waiting for load miss for instruction:", tokens)
+                    break
+            elif op not in ("j", "jal") and self.detect_data_hazard(use, branch and self.resolve_stage == "ID"):
+                print("Stalling in ID due to data hazard for instruction:", tokens)
+                break
+            entries.pop(0)
+            group.append((tokens, fetch))
+            written |= Scoreboard.mask([use[0]])
+            accepted += 1
+            if branch or op in ("j", "jal"):
+                self.pipeline_reg["ID"] = group
+                self.resolve_in("ID", tokens, fetch)
+                break
+
+        if not entries:
+            self.clear_output("IF")
+        if not accepted:
+            self.stall_count += 1
+        self.pipeline_reg["ID"] = group or None
+
+    def issue_group(self):
+        """Issue the decode group in program order, each instruction to a free unit of its
+        class, until one finds none."""
+        group = self.pipeline_reg["ID"]
+        while group:
+            tokens, fetch = group[0]
+            op = tokens[0].lower()
+            issued = self.units.acquire(op, Core.candm.clock, self.depth["EX"] - 1)
+            if issued is None:
+                print("EX: no free", self.units.unit_class(op), "unit for instruction:", tokens)
+                break
+            unit, latency = issued
+            inst = self.execute(tokens, latency, fetch)
+            inst["unit"] = unit
+            self.executing.append(inst)
+            group.pop(0)
+            self.resolve_in("EX", tokens, inst)
+            # A redirect in EX squashes the rest of the group.
+            group = self.pipeline_reg["ID"]
+        if not group:
+            self.pipeline_reg["ID"] = None
+
+    def MEM_wide(self):
+        """
+        Move up to `width` instructions from EX into MEM in program order. The L1-D has one
+        port: at most one memory access starts per cycle, and none while another one stalls.
+        No access starts behind a branch still to resolve in WB, which may squash it.
+        """
+        group = self.pipeline_reg["MEM"] or []
+        accessing = False
+        unresolved = False
+        for mem_inst in group:
+            if mem_inst["cycles_remaining"] > 1:
+                mem_inst["cycles_remaining"] -= 1
+                accessing = accessing or mem_inst["tokens"][0].lower() in Core.memory_ops
+            unresolved = unresolved or self.resolves_in_wb(mem_inst["tokens"])
+        if accessing:
+            self.stall_count += 1
+
+        while len(group) < self.width:
+            ex_data = self.stage_output("EX")
+            if ex_data is None or ex_data["cycles_remaining"] > 1:
+                break
+            memory_op = ex_data["tokens"][0].lower() in Core.memory_ops
+            if memory_op and (accessing or unresolved or self.store_buffer_blocks(ex_data["tokens"][0].lower())):
+                break
+            group.append(self.access_memory(ex_data))
+            self.clear_output("EX")
+            accessing = accessing or memory_op
+            unresolved = unresolved or self.resolves_in_wb(ex_data["tokens"])
+        self.pipeline_reg["MEM"] = group or None
+
+    def resolves_in_wb(self, tokens):
+        return self.resolve_stage == "WB" and tokens[0].lower() in ("bne", "beq", "ble", "jr")
+
+    def WB_wide(self):
+        """Write back up to `width` finished instructions from MEM in program order."""
+        group = self.pipeline_reg["MEM"]
+        retired = []
+        while group and group[0]["cycles_remaining"] <= 1 and len(retired) < self.width:
+            retired.append(self.write_back(group.pop(0)))
+            if self.pipeline_reg["MEM"] is None:
+                # A branch resolving in WB squashed the rest.
+                break
+        if not group:
+            self.pipeline_reg["MEM"] = None
+        self.pipeline_reg["WB"] = retired or None
 
     def pipeline_empty(self):
         """Return True if all pipeline registers are empty."""
@@ -443,17 +1078,40 @@ class Core:
                 self.pipeline_reg["ID"] is None and 
                 self.pipeline_reg["EX"] is None and 
                 self.pipeline_reg["MEM"] is None and 
-                self.pipeline_reg["WB"] is None)
+                self.pipeline_reg["WB"] is None and
+                not self.executing and
+                (self.store_buffer is None or self.store_buffer.empty()) and
+                not Core.candm.dma[self.coreid].outstanding() and
+                not any(any(slots) for slots in self.substages.values()))
 
     def pipeline_cycle(self):
         """
         Execute one full pipeline cycle.
         Stages are processed in reverse order so that outputs from the previous cycle are used.
         """
-        self.WB()
-        self.MEM()
+        if self.skip_until > Core.candm.clock:
+            return
+        active = self.pc < len(If_program.program) or not self.pipeline_empty()
+        self.drain_store_buffer()
+        if self.width > 1:
+            self.WB_wide()
+            self.MEM_wide()
+        else:
+            self.WB()
+            self.MEM()
+            self.queue_memory_access()
+        self.shift_substages("EX")
         self.EX()
-        self.ID()
+        if self.width > 1:
+            self.ID_wide()
+        else:
+            self.ID()
+        self.shift_substages("IF")
         pc, pip_if = If_program.IF(self.pipeline_reg["IF"], self.pc, self)
         self.pc = pc
         self.pipeline_reg["IF"] = pip_if
+
+        if active:
+            self.active_cycles += 1
+            retired = self.pipeline_reg["WB"]
+            self.retired_per_cycle[len(retired) if isinstance(retired, list) else int(retired is not None)] += 1
@@ -0,0 +1,67 @@
+class DMAEngine:
+    """
+    Per-core DMA engine copying words between main memory and the core's
+    scratch pad while the core keeps executing.
+
+    Transfers run one at a time in the order they were started. A transfer of
+    `count` words moves them in bursts of `burst` words; every burst pays the
+    `latency` of one memory transaction and then streams `bandwidth` words per
+    cycle. Word i of a transfer is at mem_addr + 4*i in memory and at
+    spm_addr + 4*i in the scratch pad, the stride lw/sw and lw_spm/sw_spm use.
+    The words are copied when the transfer completes.
+    """
+
+    def __init__(self, latency=10, bandwidth=1, burst=64):
+        if bandwidth < 1 or burst < 1:
+            raise ValueError("DMA bandwidth and burst size must be at least 1")
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.burst = burst
+        self.queue = []        # transfers in flight, oldest first
+        self.free_at = 0       # cycle the last queued transfer completes
+
+        self.stats = {
+            "to_spm":      0,   # transfers memory -> scratch pad
+            "from_spm":    0,   # transfers scratch pad -> memory
+            "words":       0,
+            "busy_cycles": 0,
+        }
+
+    def transfer_cycles(self, count):
+        bursts = -(-count // self.burst)
+        return bursts * self.latency + -(-count // self.bandwidth)
+
+    def start(self, to_spm, spm_addr, mem_addr, count, clock):
+        """Queue a transfer; returns the cycle it completes."""
+        cycles = self.transfer_cycles(count)
+        done_at = max(clock, self.free_at) + cycles
+        self.queue.append({"to_spm": to_spm, "spm": spm_addr, "mem": mem_addr,
+                           "count": count, "done_at": done_at})
+        self.free_at = done_at
+        self.stats["to_spm" if to_spm else "from_spm"] += 1
+        self.stats["words"] += count
+        self.stats["busy_cycles"] += cycles
+        return done_at
+
+    def completed(self, clock):
+        """Pop the transfers that have completed by `clock`."""
+        done = []
+        while self.queue and self.queue[0]["done_at"] <= clock:
+            done.append(self.queue.pop(0))
+        return done
+
+    def outstanding(self):
+        return len(self.queue)
+
+    def get_stats(self):
+        return self.stats
+
+
+def make_dma_engine(config):
+    """
+    Build a DMA engine from `scratch_pad_config`: its block_size is the burst
+    size in words, dma_latency and dma_bandwidth time the bursts.
+    """
+    config = config or {}
+    return DMAEngine(config.get("dma_latency", 10), config.get("dma_bandwidth", 1),
+                     config.get("block_size", 64))
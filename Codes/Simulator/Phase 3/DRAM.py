@@ -0,0 +1,164 @@
+import bisect
+
+
+class DRAM:
+    """
+    Main memory timing model behind the shared L2.
+    Addresses are split into column, channel, bank and row (lowest to
+    highest), each bank has a row buffer and each channel a data bus.
+    An access costs tCAS on a row hit, tRCD + tCAS when the bank has no
+    open row and tRP + tRCD + tCAS when another row has to be closed first,
+    plus tBurst on the channel's data bus.
+
+    page_policy "open" leaves a row open after an access, "closed"
+    precharges the bank right after every access.
+
+    With the "fcfs" scheduler a request is served after every request
+    queued before it. With "fr_fcfs" a row hit is served ahead of queued
+    requests to other rows that have not started yet, at most `hit_cap`
+    times per opened row so they are not starved. The simulator hands out
+    a latency when a request is issued, so the latencies of the bypassed
+    requests are not revised; only the bank is kept busy longer.
+    """
+
+    def __init__(self, channels=1, banks=4, row_size=256, page_policy="open",
+                 scheduler="fr_fcfs", hit_cap=4, tRCD=4, tCAS=4, tRP=4, tBurst=2,
+                 num_cores=4):
+        if page_policy not in ("open", "closed"):
+            raise ValueError(f"Unknown page policy: {page_policy}")
+        if scheduler not in ("fcfs", "fr_fcfs"):
+            raise ValueError(f"Unknown DRAM scheduler: {scheduler}")
+
+        self.channels = channels
+        self.banks = banks
+        self.row_size = row_size
+        self.page_policy = page_policy
+        self.scheduler = scheduler
+        self.hit_cap = hit_cap
+        self.tRCD = tRCD
+        self.tCAS = tCAS
+        self.tRP = tRP
+        self.tBurst = tBurst
+
+        # rows opened in each bank, oldest first:
+        # {"row", "ready" (first column command), "last_col", "close" (precharge or None),
+        #  "bypasses" (row hits served ahead of later rows)}
+        self.rows = [[[] for _ in range(banks)] for _ in range(channels)]
+        # start cycles of the bursts reserved on each channel's data bus
+        self.bus = [[] for _ in range(channels)]
+
+        self.stats = [{
+            "accesses":      0,
+            "row_hits":      0,
+            "row_misses":    0,  # bank had no open row
+            "row_conflicts": 0,  # another row had to be closed
+            "latency":       0,
+        } for _ in range(num_cores + 1)]  # the last entry counts prefetches
+
+    def map_address(self, address):
+        """Return (channel, bank, row) of `address`."""
+        chunk = address // self.row_size
+        channel = chunk % self.channels
+        bank = (chunk // self.channels) % self.banks
+        row = chunk // (self.channels * self.banks)
+        return channel, bank, row
+
+    def access(self, address, now, core_id=None, clock=None):
+        """
+        Schedule a block transfer for `address` issued at cycle `now`.
+        Rows closed before `clock` are forgotten.
+        Returns the latency of the access in cycles.
+        """
+        channel, bank, row = self.map_address(address)
+        rows = self.rows[channel][bank]
+        if clock is not None:
+            while len(rows) > 1 and rows[0]["close"] + self.tRP < clock:
+                rows.pop(0)
+
+        col, outcome = self._schedule(rows, row, now)
+
+        # data bus of the channel
+        burst = self._first_gap(self.bus[channel], col + self.tCAS)
+        bisect.insort(self.bus[channel], burst)
+        if clock is not None:
+            while self.bus[channel] and self.bus[channel][0] + self.tBurst < clock:
+                self.bus[channel].pop(0)
+        latency = burst + self.tBurst - now
+
+        stats = self.stats[core_id if core_id is not None else -1]
+        stats["accesses"] += 1
+        stats[outcome] += 1
+        stats["latency"] += latency
+        return latency
+
+    def _schedule(self, rows, row, now):
+        """Cycle of the column command of a request and whether it hit the row buffer."""
+        if self.scheduler == "fr_fcfs":
+            # serve a row hit before the queued requests close the row
+            for i, open_row in enumerate(rows):
+                if (open_row["row"] != row or open_row["close"] is None
+                        or open_row["close"] <= now or open_row["bypasses"] >= self.hit_cap):
+                    continue
+                col = max(now, open_row["ready"], open_row["last_col"] + self.tBurst)
+                shift = max(0, col + self.tBurst - open_row["close"])
+                open_row["last_col"] = col
+                open_row["close"] += shift
+                open_row["bypasses"] += 1
+                for later in rows[i + 1:]:
+                    later["ready"] += shift
+                    later["last_col"] += shift
+                    if later["close"] is not None:
+                        later["close"] += shift
+                return col, "row_hits"
+
+        last = rows[-1] if rows else None
+        if last is not None and last["close"] is None:
+            if last["row"] == row:
+                col = max(now, last["ready"], last["last_col"] + self.tBurst)
+                last["last_col"] = col
+                return col, "row_hits"
+            # precharge the open row once its last column access is done
+            last["close"] = max(now, last["last_col"] + self.tBurst)
+            activate = last["close"] + self.tRP
+            outcome = "row_conflicts"
+        else:
+            activate = now
+            if last is not None:
+                activate = max(now, last["close"] + self.tRP)
+            outcome = "row_misses"
+
+        col = activate + self.tRCD
+        rows.append({
+            "row":      row,
+            "ready":    col,
+            "last_col": col,
+            "close":    col + self.tBurst if self.page_policy == "closed" else None,
+            "bypasses": 0,
+        })
+        return col, outcome
+
+    def _first_gap(self, bursts, start):
+        for reserved in bursts:
+            if reserved + self.tBurst <= start:
+                continue
+            if reserved >= start + self.tBurst:
+                break
+            start = reserved + self.tBurst
+        return start
+
+    def get_stats(self) -> dict:
+        """Row buffer outcomes and average latency, overall and per core."""
+        def summary(stats):
+            accesses = stats["accesses"]
+            return {
+                **stats,
+                "row_hit_rate": stats["row_hits"] / accesses if accesses else 0,
+                "avg_latency":  stats["latency"] / accesses if accesses else 0,
+            }
+
+        total = {key: sum(stats[key] for stats in self.stats) for key in self.stats[0]}
+        return {
+            "total":      summary(total),
+            "cores":      [ summary(stats) for stats in self.stats[:-1] ],
+            "prefetches": summary(self.stats[-1]),
+        }
@@ -0,0 +1,214 @@
+import numpy as np
+
+
+class Ensemble:
+    """
+    Functional execution of one program for `count` independent instances at
+    once, e.g. the same kernel over many input datasets or core ids.
+
+    Instance i has row i of `registers` (count, 32), of `memory`
+    (count, memory_size), addressed like Memory, and of `scratch_pad`
+    (count, words). Each step takes the lowest PC any running instance is at
+    and executes that instruction for every instance at it as NumPy array
+    operations; instances that branched elsewhere wait, so divergent paths
+    run one after the other and reconverge at the lowest PC.
+
+    Every instance is a core running alone on its own memory: sync and fence
+    do nothing, atomics always succeed, DMA copies at once. Registers are
+    64-bit integers.
+    """
+
+    BRANCHES = {"bne": np.not_equal, "beq": np.equal, "ble": np.less_equal}
+
+    def __init__(self, program, data_segment, count, core_ids=None, datasets=None,
+                 memory_size=4096, scratch_pad_size=400, scratch_pad_base=None):
+        """
+        `program` and `data_segment` as the Simulator holds them. `core_ids`
+        gives each instance its x31 (default 0). `datasets` maps data labels
+        to (count, words) arrays replacing their .word values per instance.
+        """
+        self.program = program
+        self.count = count
+        self.labels = {}
+        self.decoded = []
+        for i, line in enumerate(program):
+            tokens = line.split()
+            if tokens and ":" in tokens[0]:
+                self.labels[tokens.pop(0).split(":")[0]] = i
+            self.decoded.append(tokens)
+
+        # la writes the words of a label downwards from the top of memory, as Core.place_data
+        self.data = {}
+        for label, values in data_segment.items():
+            self.data[label] = np.tile(np.array(values, dtype=np.int64), (count, 1))
+        for label, values in (datasets or {}).items():
+            values = np.asarray(values, dtype=np.int64)
+            if values.ndim != 2 or values.shape[0] != count:
+                raise ValueError(f"Dataset {label} must have one row per instance: {values.shape}")
+            self.data[label] = values[:, ::-1]
+        self.data_index = np.full(count, memory_size - 4, dtype=np.int64)
+
+        self.registers = np.zeros((count, 32), dtype=np.int64)
+        if core_ids is not None:
+            self.registers[:, 31] = core_ids
+        self.memory = np.zeros((count, memory_size), dtype=np.int64)
+        self.scratch_pad = np.zeros((count, scratch_pad_size // 4), dtype=np.int64)
+        self.scratch_pad_base = scratch_pad_base
+        self.pcs = np.zeros(count, dtype=np.int64)
+        self.executed = np.zeros(count, dtype=np.int64)
+        self.ecalls = []   # (pc, register, values of the instances that executed it)
+        self.stats = {"steps": 0, "active": 0}
+
+    def run(self, max_steps=None):
+        """Run until every instance has left the program or `max_steps` steps; returns the steps."""
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            running = self.pcs < len(self.program)
+            if not running.any():
+                break
+            pc = int(self.pcs[running].min())
+            rows = np.nonzero(self.pcs == pc)[0]
+            self.execute(pc, rows)
+            self.executed[rows] += 1
+            self.stats["active"] += len(rows)
+            steps += 1
+        self.stats["steps"] += steps
+        return steps
+
+    def finished(self):
+        return bool((self.pcs >= len(self.program)).all())
+
+    # --- Execution ---
+    def execute(self, pc, rows):
+        tokens = self.decoded[pc]
+        op = tokens[0].lower()
+        regs = self.registers
+
+        def read(token):
+            return regs[rows, int(token[1:])]
+
+        def write(token, values):
+            regs[rows, int(token[1:])] = values
+
+        next_pc = pc + 1
+        if op in ("add", "sub", "slt", "mul", "div", "rem"):
+            rs1, rs2 = read(tokens[2]), read(tokens[3])
+            if op == "add":
+                write(tokens[1], rs1 + rs2)
+            elif op == "sub":
+                write(tokens[1], rs1 - rs2)
+            elif op == "slt":
+                write(tokens[1], (rs1 < rs2).astype(np.int64))
+            elif op == "mul":
+                write(tokens[1], rs1 * rs2)
+            else:
+                write(tokens[1], self.divide(op, rs1, rs2))
+        elif op == "addi":
+            write(tokens[1], read(tokens[2]) + int(tokens[3]))
+        elif op == "li":
+            write(tokens[1], np.full(len(rows), int(tokens[2]), dtype=np.int64))
+        elif op == "la":
+            write(tokens[1], self.place_data(rows, tokens[2]))
+        elif op in ("lw", "sw", "lw_spm", "sw_spm"):
+            offset, base = tokens[2].split('(')
+            address = read(base[:-1]) + int(offset)
+            spm = op.endswith("_spm")
+            if op.startswith("lw"):
+                write(tokens[1], self.load(rows, address, spm))
+            else:
+                self.store(rows, address, read(tokens[1]), spm)
+        elif op in ("amoadd.w", "amoswap.w", "lr.w", "sc.w"):
+            offset, base = tokens[-1].split('(')
+            address = read(base[:-1]) + int(offset or 0)
+            old = self.load(rows, address)
+            if op == "amoadd.w":
+                self.store(rows, address, old + read(tokens[2]))
+            elif op in ("amoswap.w", "sc.w"):
+                self.store(rows, address, read(tokens[2]))
+            write(tokens[1], np.zeros(len(rows), dtype=np.int64) if op == "sc.w" else old)
+        elif op in ("dma_in", "dma_out"):
+            spm_addr, mem_addr, count = read(tokens[1]), read(tokens[2]), read(tokens[3])
+            for row, spm_at, mem_at, words in zip(rows, spm_addr, mem_addr, count):
+                spm_words = self.scratch_pad_words(np.arange(words) * 4 + spm_at)
+                mem_words = np.arange(words) * 4 + mem_at
+                self.check(mem_words, self.memory.shape[1])
+                if op == "dma_in":
+                    self.scratch_pad[row, spm_words] = self.memory[row, mem_words]
+                else:
+                    self.memory[row, mem_words] = self.scratch_pad[row, spm_words]
+        elif op == "dma_poll":
+            write(tokens[1], np.zeros(len(rows), dtype=np.int64))
+        elif op in Ensemble.BRANCHES:
+            taken = Ensemble.BRANCHES[op](read(tokens[1]), read(tokens[2]))
+            next_pc = np.where(taken, self.labels[tokens[3]], pc + 1)
+        elif op == "j":
+            next_pc = self.labels[tokens[1]]
+        elif op == "jal":
+            write(tokens[1], np.full(len(rows), pc + 1, dtype=np.int64))
+            next_pc = self.labels[tokens[2]]
+        elif op == "jr":
+            next_pc = read(tokens[1])
+        elif op == "ecall":
+            self.ecalls.append((pc, int(tokens[1][1:]), read(tokens[1]).copy()))
+        elif op not in ("sync", "fence", "dma_wait"):
+            raise ValueError(f"Unsupported instruction in an ensemble: {tokens}")
+        self.pcs[rows] = next_pc
+
+    @staticmethod
+    def divide(op, rs1, rs2):
+        """Blocks.divide on arrays: a zero divisor gives quotient -1 and remainder rs1."""
+        zero = rs2 == 0
+        divisor = np.where(zero, 1, rs2)
+        quotient = np.abs(rs1) // np.abs(divisor) * np.where((rs1 < 0) == (divisor < 0), 1, -1)
+        if op == "div":
+            return np.where(zero, -1, quotient)
+        return np.where(zero, rs1, rs1 - quotient * divisor)
+
+    # --- Memory ---
+    @staticmethod
+    def check(address, size):
+        if address.size and (address.min() < 0 or address.max() >= size):
+            raise IndexError(f"Ensemble access outside 0..{size - 1}: {address[(address < 0) | (address >= size)]}")
+
+    def scratch_pad_words(self, address):
+        words = self.scratch_pad.shape[1]
+        self.check(address, words * 4)
+        if (address % 4).any():
+            raise ValueError(f"Unaligned scratch pad address: {address[address % 4 != 0]}")
+        return address // 4
+
+    def window(self, address):
+        """Rows of `address` inside the scratch pad's window of the address map."""
+        if self.scratch_pad_base is None:
+            return np.zeros(len(address), dtype=bool)
+        return (address >= self.scratch_pad_base) & (address < self.scratch_pad_base + self.scratch_pad.shape[1] * 4)
+
+    def load(self, rows, address, spm=False):
+        if spm:
+            return self.scratch_pad[rows, self.scratch_pad_words(address)]
+        inside = self.window(address)
+        values = np.empty(len(rows), dtype=np.int64)
+        if inside.any():
+            values[inside] = self.load(rows[inside], address[inside] - self.scratch_pad_base, True)
+        self.check(address[~inside], self.memory.shape[1])
+        values[~inside] = self.memory[rows[~inside], address[~inside]]
+        return values
+
+    def store(self, rows, address, values, spm=False):
+        if spm:
+            self.scratch_pad[rows, self.scratch_pad_words(address)] = values
+            return
+        inside = self.window(address)
+        if inside.any():
+            self.store(rows[inside], address[inside] - self.scratch_pad_base, values[inside], True)
+        self.check(address[~inside], self.memory.shape[1])
+        self.memory[rows[~inside], address[~inside]] = values[~inside]
+
+    def place_data(self, rows, label):
+        """la: write the words of `label` below the previous ones; returns the address of the last."""
+        values = self.data[label][rows]
+        address = self.data_index[rows, None] - 4 * np.arange(values.shape[1])
+        self.check(address, self.memory.shape[1])
+        self.memory[rows[:, None], address] = values
+        self.data_index[rows] -= 4 * values.shape[1]
+        return self.data_index[rows] + 4
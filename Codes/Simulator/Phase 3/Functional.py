@@ -0,0 +1,143 @@
+from Core import Core, If_program
+from Blocks import BlockCache
+
+
+class FunctionalModel:
+    """
+    Functional model of one core: executes the program an instruction at a
+    time on the core's registers and PC, without the pipeline and without
+    timing. Fetches still go through the fetch buffer, I-cache and branch
+    predictor and data accesses through the caches, scratch pad and DMA
+    engine (functional warming), so a detailed interval that follows starts
+    from warm state. The core's pipeline must be empty while it runs.
+
+    run_block executes whole basic blocks compiled by BlockCache and falls
+    back to step for the instructions no block covers.
+    """
+
+    def __init__(self, core):
+        self.core = core
+        self.executed = 0
+        self.blocks = None   # BlockCache of the program being run
+
+    def block_cache(self):
+        if self.blocks is None or self.blocks.program is not If_program.program:
+            self.blocks = BlockCache(If_program.program, self.core.program_label_map, self.core.decode)
+        return self.blocks
+
+    def run_block(self, limit):
+        """
+        Execute the compiled block at the core's PC if it has at most `limit`
+        instructions, else a single instruction; returns how many executed.
+        """
+        core = self.core
+        if core.pc >= len(If_program.program):
+            return 0
+        block = self.block_cache().get(core.pc)
+        if block is None or len(block.pcs) > limit:
+            return int(self.step())
+
+        predictions = []
+        for pc in block.pcs:
+            core.fetch(core.text_base + 4 * pc)
+            predictions.append(core.predict_next_pc(pc))
+        next_pc = block.run(core.registers, self.load, self.store)
+        if block.branch is not None and core.branch_unit is not None:
+            op, target = block.branch
+            if op == "jr":
+                target = next_pc
+            pred_next, prediction = predictions[-1]
+            core.branch_unit.resolve(block.pcs[-1], op, next_pc == target, target, pred_next, prediction)
+        core.pc = next_pc
+        self.executed += len(block.pcs)
+        return len(block.pcs)
+
+    def step(self):
+        """
+        Execute the instruction at the core's PC. Returns False without
+        executing it when it waits for the other cores at a sync or for the
+        DMA engine, or when the program has ended.
+        """
+        core = self.core
+        pc = core.pc
+        if pc >= len(If_program.program):
+            return False
+        tokens, use = core.decode(If_program.program[pc])
+        op = tokens[0].lower()
+        if op == "sync":
+            # the barrier the detailed IF stage enforces
+            barrier = If_program.global_sync_pointer[pc]
+            barrier[core.coreid] = 1
+            if barrier != [1, 1, 1, 1]:
+                return False
+        elif op == "dma_wait" and Core.candm.dma[core.coreid].outstanding():
+            return False
+
+        core.fetch(core.text_base + 4 * pc)
+        pred_next, prediction = core.predict_next_pc(pc)
+        result, address = core.compute(op, tokens, core.registers.__getitem__, pc)
+
+        next_pc = pc + 1
+        if op in ("bne", "beq", "ble", "j", "jal", "jr"):
+            if op == "jr":
+                target, taken = result, True
+            elif op in ("j", "jal"):
+                target, taken = core.program_label_map[tokens[1] if op == "j" else tokens[2]], True
+            else:
+                target = core.program_label_map[tokens[3]]
+                taken = core.branch_taken(op, tokens, core.registers.__getitem__)
+            if core.branch_unit is not None:
+                core.branch_unit.resolve(pc, op, taken, target, pred_next, prediction)
+            if taken:
+                next_pc = target
+        else:
+            result = self.access(op, tokens, result, address, pc)
+
+        if use[0] is not None:
+            core.registers[use[0]] = result
+        if op == "ecall":
+            reg = int(tokens[1][1:])
+            print("ECALL: Register x{} = {}".format(reg, core.registers[reg]))
+        core.pc = next_pc
+        self.executed += 1
+        return True
+
+    def access(self, op, tokens, result, address, pc):
+        """Memory side of the instruction `tokens`; returns the value its destination gets."""
+        core = self.core
+        candm = Core.candm
+        if op == "la":
+            return core.place_data(tokens[2])[0]
+        if op == "lw":
+            return self.load(address, pc)
+        if op == "lw_spm":
+            return candm.read_scratch_pad(core.coreid, address)[0]
+        if op == "sw":
+            self.store(address, core.registers[int(tokens[1][1:])], pc)
+        elif op == "sw_spm":
+            candm.write_scratch_pad(core.coreid, address, core.registers[int(tokens[1][1:])])
+        elif op == "sync":
+            candm.flush_l1_dirty_to_l2(core.coreid)
+        elif op in Core.atomic_ops:
+            return candm.atomic(core.coreid, op, address, result, pc=pc)[0]
+        elif op in ("dma_in", "dma_out"):
+            spm_addr, mem_addr, count = result
+            candm.dma_start(core.coreid, op == "dma_in", spm_addr, mem_addr, count)
+        elif op == "dma_poll":
+            return candm.dma[core.coreid].outstanding()
+        return result
+
+    def load(self, address, pc):
+        """lw: the scratch pad inside its window, else the caches."""
+        candm = Core.candm
+        if candm.scratch_pad_offset(address) is not None:
+            return candm.read_scratch_pad(self.core.coreid, candm.scratch_pad_offset(address))[0]
+        return candm.read(self.core.coreid, address, False, pc=pc)[0]
+
+    def store(self, address, value, pc):
+        """sw: the scratch pad inside its window, else the caches."""
+        candm = Core.candm
+        if candm.scratch_pad_offset(address) is not None:
+            candm.write_scratch_pad(self.core.coreid, candm.scratch_pad_offset(address), value)
+        else:
+            candm.write(self.core.coreid, address, value, pc=pc)
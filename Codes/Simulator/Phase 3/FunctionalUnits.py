@@ -0,0 +1,119 @@
+class FunctionalUnit:
+    """
+    One execution unit. It accepts an instruction every `interval` cycles
+    (interval 1 is fully pipelined, interval = latency is unpipelined) and
+    holds at most latency / interval instructions of the latency being issued,
+    including finished ones that cannot leave EX yet because an older
+    instruction is still executing.
+    """
+
+    def __init__(self, name, latency=1, interval=1):
+        if latency < 1 or interval < 1:
+            raise ValueError(f"Functional unit {name} needs latency and interval >= 1")
+        self.name = name
+        self.latency = latency
+        self.interval = interval
+        self.next_issue = 0
+        self.occupied = 0
+
+    def available(self, clock, latency):
+        return clock >= self.next_issue and self.occupied < max(1, -(-latency // self.interval))
+
+    def issue(self, clock):
+        self.next_issue = clock + self.interval
+        self.occupied += 1
+
+    def release(self):
+        self.occupied -= 1
+
+    def flush(self):
+        self.next_issue = 0
+        self.occupied = 0
+
+
+# unit class of each opcode; anything else executes on an ALU
+UNIT_CLASSES = {
+    "mul":    "muldiv",
+    "div":    "muldiv",
+    "rem":    "muldiv",
+    "la":     "lsu",
+    "lw":     "lsu",
+    "sw":     "lsu",
+    "lw_spm": "lsu",
+    "sw_spm": "lsu",
+    "amoadd.w":  "lsu",
+    "amoswap.w": "lsu",
+    "lr.w":      "lsu",
+    "sc.w":      "lsu",
+    "fence":     "lsu",
+    "dma_in":    "lsu",
+    "dma_out":   "lsu",
+    "dma_wait":  "lsu",
+    "dma_poll":  "lsu",
+}
+
+DEFAULT_UNITS = {
+    "alu":    {"count": 1, "latency": 1, "interval": 1},
+    "muldiv": {"count": 1, "latency": 4, "interval": 1},
+    "lsu":    {"count": 1, "latency": 1, "interval": 1},
+}
+
+
+class FunctionalUnits:
+    """
+    The execution units of one core, by unit class. Each opcode issues to the
+    first free unit of its class; its latency is the per-opcode latency when
+    one is given (Core.latencies, set from the GUI) and the unit latency otherwise.
+    """
+
+    def __init__(self, units, op_latencies=None):
+        self.units = units
+        self.op_latencies = op_latencies if op_latencies is not None else {}
+
+        self.stats = {name: {"issued": 0, "busy": 0} for name in units}
+
+    def unit_class(self, op):
+        return UNIT_CLASSES.get(op, "alu")
+
+    def acquire(self, op, clock, extra=0):
+        """
+        Issue `op` to a free unit of its class. Returns the unit and the
+        latency of `op` on it plus `extra` cycles, or None if all are busy.
+        """
+        name = self.unit_class(op)
+        for unit in self.units[name]:
+            latency = self.op_latencies.get(op, unit.latency) + extra
+            if unit.available(clock, latency):
+                unit.issue(clock)
+                self.stats[name]["issued"] += 1
+                return unit, latency
+        self.stats[name]["busy"] += 1
+        return None
+
+    def flush(self):
+        for units in self.units.values():
+            for unit in units:
+                unit.flush()
+
+    def get_stats(self):
+        return self.stats
+
+
+def make_functional_units(config, op_latencies=None):
+    """
+    Build the units from `functional_units_config`, e.g.
+    {"enabled": True, "alu": {"count": 2, "latency": 1, "interval": 1},
+     "muldiv": {"latency": 4, "interval": 4}, "lsu": {...}}.
+    Missing classes and fields take DEFAULT_UNITS. Returns None when disabled
+    (EX holds one instruction for its whole latency).
+    """
+    if not config or not config.get("enabled", False):
+        return None
+    units = {}
+    for name, defaults in DEFAULT_UNITS.items():
+        settings = {**defaults, **(config.get(name) or {})}
+        if settings["count"] < 1:
+            raise ValueError(f"Functional unit class {name} needs at least one unit")
+        units[name] = [FunctionalUnit(name, settings["latency"], settings["interval"])
+                       for _ in range(settings["count"])]
+    return FunctionalUnits(units, op_latencies)
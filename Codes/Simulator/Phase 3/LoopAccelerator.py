@@ -0,0 +1,295 @@
+class LoopAccelerator:
+    """
+    Steady-state loop extrapolation for one in-order core.
+
+    A loop head is a PC fetched right after a higher one. Every visit of a head
+    takes the timing signature of the iteration that just ended: its cycles,
+    retired instructions, stalls, flushes, I-cache accesses and D-cache stall
+    cycles, and what the pipeline latches and the scoreboard hold. After
+    `warmup` identical signatures in a row the loop is in steady state, one
+    iteration every T cycles plus the D-cache stall cycles it takes beyond the
+    steady ones (a miss every few iterations when a loop streams through memory).
+
+    mode "accelerate" then stops fetch until the pipeline and store buffer
+    drain, executes the following iterations functionally (as long as they
+    take the same path, change some state and stay below max_iterations),
+    replays their memory accesses through the caches iteration by iteration,
+    timing each one from its D-cache stalls, and idles the core for their
+    cycles less the drain. Detailed simulation resumes at the head for the iteration that
+    leaves the loop. Other cores see the skipped stores early, so loops that
+    exchange data with other cores belong in detailed simulation.
+
+    mode "validate" changes nothing: later visits of the head compare the
+    extrapolated cycles (T per iteration plus the extra D-cache stalls) with
+    the simulated ones until an iteration retires a different number of
+    instructions.
+    """
+
+    MODES = ("none", "accelerate", "validate")
+    # opcodes the functional execution of a loop body handles
+    FUNCTIONAL_OPS = ("add", "addi", "sub", "slt", "mul", "div", "rem", "li",
+                      "lw", "sw", "lw_spm", "sw_spm", "bne", "beq", "ble", "j")
+    # longest loop body executed functionally
+    MAX_BODY = 4096
+
+    def __init__(self, core, mode="accelerate", warmup=3, max_iterations=100000):
+        if warmup < 1:
+            raise ValueError(f"Loop warmup must be at least one iteration: {warmup}")
+        self.core = core
+        self.mode = mode
+        self.warmup = warmup
+        self.max_iterations = max_iterations
+        self.program = []
+        self.last_fetch = None   # PC of the previous fetch
+        self.heads = {}          # head PC -> last visit, steady signature, repeats
+        self.draining = None     # (head, signature, clock) while fetch waits for the drain
+        self.sessions = {}       # head PC -> open validation session
+        self.validations = []    # closed validation sessions
+
+        self.stats = {
+            "loops":          0,   # fast-forwards
+            "iterations":     0,   # iterations executed functionally
+            "skipped_cycles": 0,   # cycles the core idled instead of simulating
+            "drain_cycles":   0,
+            "value_mismatches": 0, # replayed loads returning other data than predicted
+        }
+
+    # --- Detection ---
+    def snapshot(self):
+        core = self.core
+        return (core.candm.clock, core.inst_executed, core.stall_count, core.pipeline_flush_count,
+                core.fetch_stats["icache_accesses"], core.candm.dcache_stall_cycles[core.coreid])
+
+    def occupancy(self):
+        """What the pipeline holds when fetch reaches the head."""
+        core = self.core
+        latches = [core.id_fetch if core.pipeline_reg["ID"] is not None else None,
+                   core.pipeline_reg["EX"], core.pipeline_reg["MEM"]]
+        for stage in ("IF", "EX", "MEM"):
+            latches.extend(core.substages[stage])
+        return (tuple((latch.get("pc"), latch.get("cycles_remaining")) if isinstance(latch, dict)
+                      else latch is not None for latch in latches),
+                core.pipeline_reg["WB"] is not None, len(core.executing), core.scoreboard.pending)
+
+    def hold_fetch(self, pc, program):
+        """Called before every fetch of `pc` from `program`; True keeps fetch idle this cycle."""
+        core = self.core
+        self.program = program
+        if self.draining is not None:
+            if not core.pipeline_empty():
+                return True
+            head, deltas, start = self.draining
+            self.draining = None
+            self.last_fetch = None
+            if pc != head:
+                # the head was fetched down a mispredicted path
+                return False
+            self.fast_forward(head, deltas, core.candm.clock - start)
+            return core.skip_until > core.candm.clock
+        if self.last_fetch is not None and pc < self.last_fetch:
+            self.visit(pc)
+        self.last_fetch = pc
+        return self.draining is not None
+
+    def visit(self, head):
+        now = self.snapshot()
+        state = self.heads.setdefault(head, {"last": None, "signature": None, "repeats": 0})
+        if state["last"] is not None:
+            signature = (tuple(n - l for n, l in zip(now, state["last"])), self.occupancy())
+            if signature == state["signature"]:
+                state["repeats"] += 1
+            else:
+                state["signature"] = signature
+                state["repeats"] = 1
+            self.check_session(head, now, signature)
+        state["last"] = now
+
+        if state["repeats"] >= self.warmup and head not in self.sessions:
+            period = state["signature"][0][0]
+            print("Core", self.core.coreid, "loop at PC", head, "steady at", period, "cycles per iteration")
+            if self.mode == "validate":
+                self.sessions[head] = {"core": self.core.coreid, "head": head, "start": now,
+                                       "deltas": state["signature"][0], "iterations": 0,
+                                       "simulated": 0, "predicted": 0}
+            else:
+                self.draining = (head, state["signature"][0], now[0])
+                del self.heads[head]
+
+    # --- Validation ---
+    def check_session(self, head, now, signature):
+        session = self.sessions.get(head)
+        if session is None:
+            return
+        deltas = session["deltas"]
+        if signature[0][1] != deltas[1]:
+            # a different path: the loop was left (and maybe entered again)
+            self.close_session(head)
+            return
+        start = session["start"]
+        session["iterations"] += 1
+        session["simulated"] = now[0] - start[0]
+        session["predicted"] = session["iterations"] * (deltas[0] - deltas[5]) + now[5] - start[5]
+
+    def close_session(self, head):
+        session = self.sessions.pop(head)
+        if session["iterations"]:
+            session["error"] = (session["predicted"] - session["simulated"]) / session["simulated"]
+            self.validations.append(session)
+
+    def finish(self):
+        """Close the validation sessions still open when the program ends."""
+        for head in list(self.sessions):
+            self.close_session(head)
+
+    # --- Fast-forward ---
+    def peek(self, address):
+        """The word a load of `address` reads: the L1-D copy, else memory (L1 fills read memory)."""
+        candm = self.core.candm
+        l1 = candm.l1d[self.core.coreid]
+        block = l1.findBlock(address)
+        if block is not None:
+            return block["data"][l1._split_address(address)[2]]
+        return candm.memory.memory[address]
+
+    def speculate(self, head, registers):
+        """
+        Execute one iteration from `head` on a copy of `registers` without side
+        effects. Returns (registers, PCs executed, memory accesses) if it
+        comes back to the head, else None.
+        """
+        core = self.core
+        candm = core.candm
+        program = self.program
+        scratch_pad = candm.scratch_pad[core.coreid]
+        registers = list(registers)
+        stores = {}
+        spm_stores = {}
+        path = []
+        accesses = []
+        pc = head
+        for _ in range(LoopAccelerator.MAX_BODY):
+            if pc >= len(program):
+                return None
+            tokens, use = core.decode(program[pc])
+            op = tokens[0].lower()
+            if op not in LoopAccelerator.FUNCTIONAL_OPS:
+                return None
+            path.append(pc)
+            read = registers.__getitem__
+            result, address = core.compute(op, tokens, read, pc)
+            next_pc = pc + 1
+            if op in ("bne", "beq", "ble"):
+                if core.branch_taken(op, tokens, read):
+                    next_pc = core.program_label_map[tokens[3]]
+            elif op == "j":
+                next_pc = core.program_label_map[tokens[1]]
+            elif op in ("lw", "sw", "lw_spm", "sw_spm"):
+                if op in ("lw", "sw") and candm.scratch_pad_offset(address) is not None:
+                    address = candm.scratch_pad_offset(address)
+                    op += "_spm"
+                if op.endswith("_spm"):
+                    if not scratch_pad.contains(address):
+                        return None
+                elif not 0 <= address < len(candm.memory.memory):
+                    return None
+                if op.startswith("sw"):
+                    value = registers[int(tokens[1][1:])]
+                    (spm_stores if op == "sw_spm" else stores)[address] = value
+                elif op == "lw_spm":
+                    value = spm_stores[address] if address in spm_stores else scratch_pad.read(address)
+                else:
+                    value = stores[address] if address in stores else self.peek(address)
+                result = value
+                accesses.append((op, address, value))
+            if use[0] is not None:
+                registers[use[0]] = result
+            pc = next_pc
+            if pc == head:
+                return registers, path, accesses
+        return None
+
+    def replay(self, accesses, delay):
+        """Perform the accesses of a fast-forwarded iteration `delay` cycles from now;
+        returns the D-cache stall cycles they took."""
+        core = self.core
+        candm = core.candm
+        stalls = candm.dcache_stall_cycles[core.coreid]
+        for op, address, value in accesses:
+            if op == "lw":
+                data = candm.read(core.coreid, address, False, delay=delay)[0]
+            elif op == "lw_spm":
+                data = candm.read_scratch_pad(core.coreid, address, delay)[0]
+            elif op == "sw":
+                candm.write(core.coreid, address, value, delay=delay)
+                continue
+            else:
+                candm.write_scratch_pad(core.coreid, address, value, delay)
+                continue
+            if data != value:
+                self.stats["value_mismatches"] += 1
+        return candm.dcache_stall_cycles[core.coreid] - stalls
+
+    def fast_forward(self, head, deltas, drain):
+        """
+        Execute the steady iterations of the loop at `head` functionally; `deltas`
+        are the snapshot differences of one steady iteration.
+        """
+        core = self.core
+        path = None
+        done = 0
+        elapsed = 0        # cycles of the iterations executed so far
+        extra_stalls = 0   # their D-cache stalls beyond the steady ones
+        while done < self.max_iterations:
+            iteration = self.speculate(head, core.registers)
+            if iteration is None:
+                break
+            registers, iteration_path, accesses = iteration
+            if path is not None and iteration_path != path:
+                break
+            if registers == core.registers and not any(op.startswith("sw") for op, _, _ in accesses):
+                # a spin loop: only another core can end it
+                break
+            path = iteration_path
+            stalls = self.replay(accesses, elapsed) - deltas[5]
+            elapsed += deltas[0] + stalls
+            extra_stalls += stalls
+            core.registers[:] = registers
+            done += 1
+
+        skipped = max(0, elapsed - drain)
+        core.skip_until = core.candm.clock + skipped
+        core.active_cycles += skipped
+        core.inst_executed += done * len(path or ())
+        core.stall_count += done * deltas[2] + extra_stalls
+        core.pipeline_flush_count += done * deltas[3]
+        core.fetch_stats["icache_accesses"] += done * deltas[4]
+        self.stats["drain_cycles"] += drain
+        if done:
+            self.stats["loops"] += 1
+            self.stats["iterations"] += done
+            self.stats["skipped_cycles"] += skipped
+        print("Core", self.core.coreid, "fast-forwarded", done, "iterations of the loop at PC", head,
+              "resuming at cycle", core.skip_until)
+
+    def get_stats(self):
+        return self.stats
+
+
+def make_loop_accelerator(config, core):
+    """
+    Build the loop accelerator of `core` from `loop_accelerator_config`;
+    None when its mode is none. Only the single-issue in-order core with an
+    interlocked pipeline executes loops the way the functional model does.
+    """
+    config = config or {}
+    mode = str(config.get("mode") or "none").lower()
+    if mode not in LoopAccelerator.MODES:
+        raise ValueError(f"Unknown loop accelerator mode: {mode}")
+    if mode == "none":
+        return None
+    if (core.config.get("ooo_config") or {}).get("enabled") or core.width > 1:
+        raise ValueError("Loop acceleration needs the single-issue in-order core")
+    if core.hazard_policy != "interlock":
+        raise ValueError("Loop acceleration needs hazard_policy interlock")
+    return LoopAccelerator(core, mode, int(config.get("warmup", 3)),
+                           int(config.get("max_iterations", 100000)))
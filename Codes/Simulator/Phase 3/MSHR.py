@@ -0,0 +1,60 @@
+class MSHRFile:
+    """
+    Miss status holding registers of one cache.
+    Each entry tracks an outstanding block fill and the cycle it completes.
+    A miss to a block that already has an entry is merged into it instead
+    of allocating a new one; when all entries are busy a new miss has to
+    wait for the earliest one to finish.
+    """
+
+    def __init__(self, num_entries=4):
+        self.num_entries = num_entries
+        self.entries = []  # [block base address, ready cycle]
+
+        self.stats = {
+            "primary":         0,  # misses that allocated an entry
+            "secondary":       0,  # misses merged into an outstanding entry
+            "full_stalls":     0,  # misses that found every entry busy
+            "full_cycles":     0,  # cycles spent waiting for a free entry
+            "max_outstanding": 0,
+        }
+
+    def _retire(self, now):
+        self.entries = [entry for entry in self.entries if entry[1] > now]
+
+    def outstanding(self, now):
+        self._retire(now)
+        return len(self.entries)
+
+    def lookup(self, block, now):
+        """Return the ready cycle of an outstanding fill for `block`, or None."""
+        self._retire(now)
+        for entry_block, ready_at in self.entries:
+            if entry_block == block:
+                return ready_at
+        return None
+
+    def free_at(self, now):
+        """Cycle at which an entry is available for a new miss issued at `now`."""
+        self._retire(now)
+        if len(self.entries) < self.num_entries:
+            return now
+        ready = sorted(entry[1] for entry in self.entries)
+        return ready[len(ready) - self.num_entries]
+
+    def wait(self, now):
+        """Structural stall of a new primary miss issued at `now`."""
+        wait_cycles = self.free_at(now) - now
+        if wait_cycles > 0:
+            self.stats["full_stalls"] += 1
+            self.stats["full_cycles"] += wait_cycles
+        return wait_cycles
+
+    def allocate(self, block, ready_at, now):
+        self._retire(now)
+        self.entries.append([block, ready_at])
+        self.stats["primary"] += 1
+        self.stats["max_outstanding"] = max(self.stats["max_outstanding"], len(self.entries))
+
+    def merge(self):
+        self.stats["secondary"] += 1
@@ -0,0 +1,415 @@
+from Core import Core, If_program
+from FunctionalUnits import make_functional_units
+
+BRANCHES = ("bne", "beq", "ble", "jr")
+LOADS = ("lw", "lw_spm")
+STORES = ("sw", "sw_spm")
+# opcodes that run alone: the ROB drains before them and nothing dispatches after them
+# until they commit, where they access memory with the architectural registers
+SERIALIZING = ("sync", "fence") + Core.atomic_ops + Core.dma_ops
+# opcodes that finish when dispatched or when they commit, without executing
+NO_EXECUTE = ("j", "jal", "ecall", "la") + SERIALIZING
+
+
+class OoOCore(Core):
+    """
+    Out-of-order core: Tomasulo with a reorder buffer. It runs the same decoded
+    program, branch unit, functional units and CacheAndMemory as the in-order Core.
+
+    Each cycle, in reverse pipeline order:
+      commit    retire up to `width` finished instructions from the ROB head in program
+                order; stores, la, sync, atomics and DMA access memory only here
+      complete  instructions whose latency has elapsed make their result available; a
+                mispredicted branch squashes every younger instruction
+      issue     the oldest ready reservation-station entries start on free functional
+                units; a load waits until every older store has its address and takes
+                the data of the youngest older store to the same word
+      dispatch  rename up to `width` fetched instructions onto ROB entries and place them
+                in the reservation stations and the load/store queue; j and jal redirect
+      fetch     as the in-order core, up to `width` instructions from one I-cache line
+
+    Registers are renamed onto the ROB entry of their youngest in-flight writer, so a
+    squash restores the map by walking the surviving entries.
+    """
+
+    def __init__(self, coreid, forwarding=None, hazard_policy=None):
+        super().__init__(coreid, forwarding, hazard_policy)
+        config = Core.config.get("ooo_config") or {}
+        self.width = int(config.get("width", 2))
+        self.rob_size = config.get("rob_size", 32)
+        self.rs_size = config.get("rs_size", 16)
+        self.lsq_size = config.get("lsq_size", 16)
+        self.retired_per_cycle = [0] * (self.width + 1)
+        if self.units is None:
+            units_config = {**(Core.config.get("functional_units_config") or {}), "enabled": True}
+            self.units = make_functional_units(units_config, Core.latencies)
+
+        self.rob = []            # entries in program order
+        self.rs = []             # entries waiting to issue, in program order
+        self.lsq = []            # loads and stores in program order
+        self.executing = []      # (completion cycle, entry)
+        self.releases = []       # (cycle, unit): load units free once the address is generated
+        self.rename = {}         # register -> ROB entry of its youngest in-flight writer
+        self.sequence = 0
+        self.squash_after = None  # branch whose misprediction is being repaired
+        self.commit_ready = 0     # first cycle commit continues after a memory write
+        self.memory_ready = 0     # first cycle a load may access a blocking L1-D
+
+        self.ooo_stats = {
+            "rob_occupancy": 0,   # summed over active cycles
+            "rob_max": 0,
+            "rob_full": 0,        # dispatch stall cycles by cause
+            "rs_full": 0,
+            "lsq_full": 0,
+            "serialize": 0,
+            "unit_busy": 0,       # ready instructions that found no free unit
+            "forwarded_loads": 0,
+            "squashed": 0,
+            "mlp_sum": 0,         # outstanding load misses summed over cycles with any
+            "mlp_cycles": 0,
+        }
+
+    def get_ipc(self):
+        return self.inst_executed / self.active_cycles if self.active_cycles else 0
+
+    def get_ooo_stats(self):
+        stats = self.ooo_stats
+        cycles = self.active_cycles or 1
+        return {
+            "rob_occupancy": stats["rob_occupancy"] / cycles,
+            "rob_max": stats["rob_max"],
+            "dispatch_stalls": {cause: stats[cause] for cause in ("rob_full", "rs_full", "lsq_full", "serialize")},
+            "issue_stalls": stats["unit_busy"],
+            "forwarded_loads": stats["forwarded_loads"],
+            "squashed": stats["squashed"],
+            "mlp": stats["mlp_sum"] / stats["mlp_cycles"] if stats["mlp_cycles"] else 0,
+        }
+
+    # --- Dispatch ---
+    def dispatch(self):
+        """Rename fetched instructions into the ROB, reservation stations and load/store queue."""
+        fetched = self.stage_output("IF")
+        if fetched is None or fetched["cycles_remaining"] > 1:
+            return
+        entries = fetched.setdefault("group", [dict(fetched)])
+        dispatched = 0
+        while entries and dispatched < self.width:
+            tokens, use = self.decode(entries[0]["raw"])
+            op = tokens[0].lower()
+            cause = None
+            if len(self.rob) >= self.rob_size:
+                cause = "rob_full"
+            elif op not in NO_EXECUTE and len(self.rs) >= self.rs_size:
+                cause = "rs_full"
+            elif op in LOADS + STORES and len(self.lsq) >= self.lsq_size:
+                cause = "lsq_full"
+            elif any(entry["op"] in SERIALIZING for entry in self.rob) or (op in SERIALIZING and self.rob):
+                cause = "serialize"
+            if cause is not None:
+                print("Core", self.coreid, "dispatch stalled:", cause, "for instruction:", tokens)
+                self.ooo_stats[cause] += 1
+                break
+
+            fetch = entries.pop(0)
+            entry = self.rename_entry(tokens, use, fetch)
+            dispatched += 1
+            if op in ("j", "jal"):
+                label = tokens[1] if op == "j" else tokens[2]
+                print("Jump redirected at dispatch for instruction:", tokens)
+                self.resolve_branch(fetch, op, True, self.program_label_map[label], "ID")
+                break
+
+        if not entries:
+            self.clear_output("IF")
+
+    def rename_entry(self, tokens, use, fetch):
+        """Allocate the ROB entry of a fetched instruction and rename its registers."""
+        op = tokens[0].lower()
+        sources = {}
+        mask = use[1]
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            reg = bit.bit_length() - 1
+            sources[reg] = self.rename.get(reg)
+
+        self.sequence += 1
+        entry = {
+            "seq": self.sequence,
+            "tokens": tokens,
+            "op": op,
+            "pc": fetch["pc"],
+            "pred_next": fetch["pred_next"],
+            "prediction": fetch["prediction"],
+            "dest": use[0],
+            "sources": sources,
+            "value": None,
+            "addr": None,
+            "data": None,
+            "done": op in ("j", "jal", "ecall") + SERIALIZING,
+            "fault": False,
+        }
+        if op == "jal":
+            entry["value"] = fetch["pc"] + 1
+
+        if use[0] is not None:
+            self.rename[use[0]] = entry
+        self.rob.append(entry)
+        if op not in NO_EXECUTE:
+            self.rs.append(entry)
+        if op in LOADS + STORES:
+            self.lsq.append(entry)
+        return entry
+
+    # --- Issue ---
+    def operand(self, entry, reg):
+        """Value of source `reg` of `entry`: its producer's result, else the register file."""
+        producer = entry["sources"].get(reg)
+        return producer["value"] if producer is not None else self.registers[reg]
+
+    def sources_ready(self, entry):
+        return all(producer is None or producer["done"] for producer in entry["sources"].values())
+
+    def older_store(self, entry):
+        """
+        For a load: (True, store) where store is the youngest older store to the same
+        word, or None; (False, None) while an older store has no address yet.
+        """
+        match = None
+        for other in self.lsq:
+            if other is entry:
+                break
+            if other["op"] in STORES:
+                if other["addr"] is None:
+                    return False, None
+                if self.location(other) == self.location(entry):
+                    match = other
+        return True, match
+
+    def location(self, entry):
+        """(scratch pad?, address) a load or store accesses: _spm opcodes and lw/sw
+        inside the scratch pad's window of the address map reach the scratch pad."""
+        if entry["op"] in ("lw_spm", "sw_spm"):
+            return True, entry["addr"]
+        offset = Core.candm.scratch_pad_offset(entry["addr"])
+        return (False, entry["addr"]) if offset is None else (True, offset)
+
+    def issue(self):
+        """Start the oldest ready reservation-station entries on free functional units."""
+        clock = Core.candm.clock
+        issued = 0
+        for entry in list(self.rs):
+            if issued >= self.width:
+                break
+            if not self.sources_ready(entry):
+                continue
+            op = entry["op"]
+            tokens = entry["tokens"]
+            read = lambda reg, entry=entry: self.operand(entry, reg)
+            if op in LOADS:
+                # The address is needed to check older stores before the load takes a unit.
+                entry["addr"] = self.compute(op, tokens, read, entry["pc"])[1]
+                resolved, store = self.older_store(entry)
+                if not resolved or (store is None and not Core.candm.non_blocking and clock < self.memory_ready):
+                    continue
+            acquired = self.units.acquire(op, clock)
+            if acquired is None:
+                self.ooo_stats["unit_busy"] += 1
+                continue
+            unit, latency = acquired
+            entry["unit"] = unit
+            result, mem_addr = self.compute(op, tokens, read, entry["pc"])
+
+            if op in BRANCHES:
+                if op == "jr":
+                    entry["outcome"] = (True, result)
+                else:
+                    entry["outcome"] = (self.branch_taken(op, tokens, read), self.program_label_map[tokens[3]])
+            elif op in LOADS:
+                # The unit only generates the address; a miss waits in the memory system.
+                self.releases.append((clock + latency, unit))
+                entry["unit"] = None
+                latency += self.load(entry, store, clock + latency)
+            elif op in STORES:
+                entry["addr"] = mem_addr
+                entry["data"] = read(int(tokens[1][1:]))
+            else:
+                entry["value"] = result
+
+            entry["sources"] = {}  # operands read; drop the links to older entries
+            print("Core", self.coreid, "issued", tokens, "completing at cycle", clock + latency)
+            self.executing.append((clock + latency, entry))
+            self.rs.remove(entry)
+            issued += 1
+
+    def load(self, entry, store, start):
+        """Read the data of a load whose address is known; returns the cycles it takes."""
+        if store is not None:
+            print("Core", self.coreid, "store-to-load forwarding for", entry["tokens"])
+            self.ooo_stats["forwarded_loads"] += 1
+            entry["value"] = store["data"]
+            return 1
+
+        in_spm, addr = self.location(entry)
+        if in_spm:
+            if not Core.candm.scratch_pad[self.coreid].contains(addr):
+                entry["fault"], entry["value"] = True, 0
+                return 1
+            entry["value"], stalls = Core.candm.read_scratch_pad(self.coreid, addr, delay=start - Core.candm.clock)
+            return max(1, stalls)
+
+        if not 0 <= addr < len(Core.candm.memory.memory):
+            # Only a wrong-path load can get here; commit raises if it is not squashed.
+            entry["fault"], entry["value"] = True, 0
+            return 1
+        if self.store_buffer is not None:
+            forwarded = self.store_buffer.forward(addr)
+            if forwarded is not None:
+                print("Core", self.coreid, "load forwarded from the store buffer:", forwarded)
+                entry["value"] = forwarded
+                return 1
+        entry["value"], stalls = Core.candm.read(self.coreid, addr, False, pc=entry["pc"])
+        stalls = max(1, stalls)
+        entry["miss"] = stalls > Core.candm.latencies["l1_hit"]
+        if not Core.candm.non_blocking:
+            self.memory_ready = start + stalls
+        return stalls
+
+    # --- Complete ---
+    def complete(self):
+        """Finish the instructions whose latency has elapsed, oldest first, and resolve branches."""
+        clock = Core.candm.clock
+        finished = sorted((entry for cycle, entry in self.executing if cycle <= clock), key=lambda entry: entry["seq"])
+        self.executing = [item for item in self.executing if item[0] > clock]
+        for cycle, unit in self.releases:
+            if cycle <= clock:
+                unit.release()
+        self.releases = [item for item in self.releases if item[0] > clock]
+        for entry in finished:
+            if entry["unit"] is not None:
+                entry["unit"].release()
+        for entry in finished:
+            if entry.get("squashed"):
+                continue  # squashed by an older branch this cycle
+            entry["done"] = True
+            if entry["op"] in BRANCHES:
+                taken, target = entry["outcome"]
+                self.squash_after = entry
+                self.resolve_branch(entry, entry["op"], taken, target, "EX")
+
+    def flush_pipeline(self, stage="WB"):
+        """Drop the fetched instructions and, after a branch resolved in execution,
+        every instruction younger than it."""
+        self.pipeline_flush_count += 1
+        self.pipeline_reg["IF"] = None
+        self.substages["IF"] = [None] * len(self.substages["IF"])
+        if stage == "ID":
+            return  # redirected at dispatch: nothing younger was dispatched
+
+        seq = self.squash_after["seq"]
+        squashed = [entry for entry in self.rob if entry["seq"] > seq]
+        for entry in squashed:
+            entry["squashed"] = True
+        self.ooo_stats["squashed"] += len(squashed)
+        self.rob = self.rob[:len(self.rob) - len(squashed)]
+        self.rs = [entry for entry in self.rs if entry["seq"] <= seq]
+        self.lsq = [entry for entry in self.lsq if entry["seq"] <= seq]
+        for cycle, entry in self.executing:
+            if entry["seq"] > seq and entry["unit"] is not None:
+                entry["unit"].release()
+        self.executing = [item for item in self.executing if item[1]["seq"] <= seq]
+        self.rename = {}
+        for entry in self.rob:
+            if entry["dest"] is not None:
+                self.rename[entry["dest"]] = entry
+
+    # --- Commit ---
+    def commit(self):
+        """Retire finished instructions from the ROB head; returns how many retired."""
+        clock = Core.candm.clock
+        retired = 0
+        while self.rob and retired < self.width and clock >= self.commit_ready:
+            entry = self.rob[0]
+            op = entry["op"]
+            if not entry["done"] and op != "la":
+                break
+            if entry["fault"]:
+                raise IndexError(f"Core {self.coreid}: {entry['tokens']} accessed address {entry['addr']}")
+            if self.store_buffer_blocks(op):
+                break
+            if op == "dma_wait" and Core.candm.dma[self.coreid].outstanding():
+                break
+
+            stalls = 0
+            if op == "la":
+                entry["value"], stalls = self.place_data(entry["tokens"][2])
+            elif op in STORES and self.location(entry)[0]:
+                stalls = Core.candm.write_scratch_pad(self.coreid, self.location(entry)[1], entry["data"])
+            elif op == "sw" and self.store_buffer is not None:
+                self.store_buffer.push(entry["addr"], entry["data"], entry["pc"])
+            elif op == "sw":
+                stalls = Core.candm.write(self.coreid, entry["addr"], entry["data"], pc=entry["pc"])
+            elif op == "sync":
+                stalls = Core.candm.flush_l1_dirty_to_l2(self.coreid)
+            elif op in Core.atomic_ops:
+                value, entry["addr"] = self.compute(op, entry["tokens"], self.registers.__getitem__, entry["pc"])
+                entry["value"], stalls = Core.candm.atomic(self.coreid, op, entry["addr"], value, pc=entry["pc"])
+            elif op in ("dma_in", "dma_out"):
+                spm_addr, mem_addr, count = self.compute(op, entry["tokens"], self.registers.__getitem__, entry["pc"])[0]
+                Core.candm.dma_start(self.coreid, op == "dma_in", spm_addr, mem_addr, count)
+            elif op == "dma_poll":
+                entry["value"] = Core.candm.dma[self.coreid].outstanding()
+            elif op == "ecall":
+                reg = int(entry["tokens"][1][1:])
+                print("ECALL: Register x{} = {}".format(reg, self.registers[reg]))
+
+            dest = entry["dest"]
+            if dest is not None:
+                self.registers[dest] = entry["value"]
+                if self.rename.get(dest) is entry:
+                    del self.rename[dest]
+            if self.checker is not None:
+                self.checker.retire(self, entry["tokens"], entry["pc"])
+            entry["done"] = True
+            self.rob.pop(0)
+            if self.lsq and self.lsq[0] is entry:
+                self.lsq.pop(0)
+            self.inst_executed += 1
+            retired += 1
+            print("Core", self.coreid, "committed", entry["tokens"])
+            if stalls > 1:
+                # The write occupies commit until it finishes.
+                self.commit_ready = clock + stalls
+        return retired
+
+    def pipeline_empty(self):
+        return (not self.rob and self.pipeline_reg["IF"] is None and
+                not any(self.substages["IF"]) and
+                (self.store_buffer is None or self.store_buffer.empty()) and
+                not Core.candm.dma[self.coreid].outstanding())
+
+    def pipeline_cycle(self):
+        """One cycle of the out-of-order core, stages in reverse order."""
+        active = self.pc < len(If_program.program) or not self.pipeline_empty()
+        self.drain_store_buffer()
+        retired = self.commit()
+        self.complete()
+        self.issue()
+        self.dispatch()
+        self.shift_substages("IF")
+        pc, pip_if = If_program.IF(self.pipeline_reg["IF"], self.pc, self)
+        self.pc = pc
+        self.pipeline_reg["IF"] = pip_if
+
+        if active:
+            self.active_cycles += 1
+            self.retired_per_cycle[retired] += 1
+            if not retired:
+                self.stall_count += 1
+            stats = self.ooo_stats
+            stats["rob_occupancy"] += len(self.rob)
+            stats["rob_max"] = max(stats["rob_max"], len(self.rob))
+            misses = sum(1 for _, entry in self.executing if entry.get("miss"))
+            if misses:
+                stats["mlp_sum"] += misses
+                stats["mlp_cycles"] += 1
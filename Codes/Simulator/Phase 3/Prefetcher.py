@@ -0,0 +1,215 @@
+class Prefetcher:
+    """
+    Base class for hardware prefetchers attached to one cache.
+    `observe` is called on every demand access to that cache and returns
+    the base addresses of the blocks that should be prefetched.
+    """
+
+    def __init__(self, block_size=64, degree=1, pollution_window=64):
+        self.block_size = block_size
+        self.degree = degree
+        self.pollution_window = pollution_window
+
+        # victims of prefetch fills, used to detect cache pollution
+        self.evicted_by_prefetch = {}
+
+        self.stats = {
+            "issued":    0,
+            "useful":    0,
+            "late":      0,
+            "polluting": 0,
+        }
+
+    def block_address(self, address):
+        return address - (address % self.block_size)
+
+    def observe(self, address, pc=None, hit=False, first_use=False):
+        return []
+
+    def record_eviction(self, evict_base):
+        """Remember a block that was thrown out to make room for a prefetch."""
+        if evict_base is None:
+            return
+        self.evicted_by_prefetch[evict_base] = True
+        if len(self.evicted_by_prefetch) > self.pollution_window:
+            oldest = next(iter(self.evicted_by_prefetch))
+            del self.evicted_by_prefetch[oldest]
+
+    def check_pollution(self, address):
+        """A demand miss on a block evicted by a prefetch counts as pollution."""
+        base = self.block_address(address)
+        if base in self.evicted_by_prefetch:
+            del self.evicted_by_prefetch[base]
+            self.stats["polluting"] += 1
+
+
+class NextLinePrefetcher(Prefetcher):
+    """
+    Tagged next-line prefetcher: on a miss, or on the first use of a
+    prefetched block, fetch the next `degree` sequential blocks.
+    """
+
+    def observe(self, address, pc=None, hit=False, first_use=False):
+        if hit and not first_use:
+            return []
+        base = self.block_address(address)
+        return [base + i * self.block_size for i in range(1, self.degree + 1)]
+
+
+class StridePrefetcher(Prefetcher):
+    """
+    PC-indexed reference prediction table (Chen & Baer).
+    Each entry tracks the last address and stride of one load/store and
+    only prefetches once the stride has been seen twice in a row.
+    """
+
+    def __init__(self, block_size=64, degree=1, table_size=64, pollution_window=64):
+        super().__init__(block_size, degree, pollution_window)
+        self.table_size = table_size
+        self.table = [None] * table_size
+
+    def observe(self, address, pc=None, hit=False, first_use=False):
+        if pc is None:
+            return []
+
+        slot = pc % self.table_size
+        entry = self.table[slot]
+
+        if entry is None or entry["pc"] != pc:
+            self.table[slot] = {
+                "pc":        pc,
+                "last_addr": address,
+                "stride":    0,
+                "state":     "initial",
+            }
+            return []
+
+        new_stride = address - entry["last_addr"]
+        correct = new_stride == entry["stride"]
+        state = entry["state"]
+
+        if state == "initial":
+            if correct:
+                entry["state"] = "steady"
+            else:
+                entry["state"] = "transient"
+                entry["stride"] = new_stride
+        elif state == "transient":
+            if correct:
+                entry["state"] = "steady"
+            else:
+                entry["state"] = "no_pred"
+                entry["stride"] = new_stride
+        elif state == "steady":
+            if not correct:
+                entry["state"] = "initial"
+        else:  # no_pred
+            if correct:
+                entry["state"] = "transient"
+            else:
+                entry["stride"] = new_stride
+
+        entry["last_addr"] = address
+
+        if entry["state"] != "steady" or entry["stride"] == 0:
+            return []
+
+        current = self.block_address(address)
+        targets = []
+        for i in range(1, self.degree + 1):
+            block = self.block_address(address + i * entry["stride"])
+            if block != current and block not in targets:
+                targets.append(block)
+        return targets
+
+
+class StreamPrefetcher(Prefetcher):
+    """
+    Stream prefetcher: a stream is allocated on a miss, its direction is
+    confirmed by a second miss within `window` blocks, after which it keeps
+    up to `distance` blocks ahead of the demand accesses.
+    """
+
+    def __init__(self, block_size=64, degree=2, num_streams=4, distance=4,
+                 window=2, pollution_window=64):
+        super().__init__(block_size, degree, pollution_window)
+        self.num_streams = num_streams
+        self.distance = distance
+        self.window = window
+        self.streams = []
+        self.timestamp = 0
+
+    def observe(self, address, pc=None, hit=False, first_use=False):
+        if hit and not first_use:
+            return []
+
+        self.timestamp += 1
+        block = address // self.block_size
+
+        for stream in self.streams:
+            if stream["direction"] == 0:
+                delta = block - stream["last_block"]
+                if 0 < abs(delta) <= self.window:
+                    stream["direction"] = 1 if delta > 0 else -1
+                    stream["next_block"] = block + stream["direction"]
+                    stream["last_block"] = block
+                    stream["last_used"] = self.timestamp
+                    return self._advance(stream, block)
+            else:
+                delta = (block - stream["last_block"]) * stream["direction"]
+                if 0 <= delta <= self.distance:
+                    stream["last_block"] = block
+                    stream["last_used"] = self.timestamp
+                    return self._advance(stream, block)
+
+        new_stream = {
+            "last_block": block,
+            "direction":  0,
+            "next_block": None,
+            "last_used":  self.timestamp,
+        }
+        if len(self.streams) < self.num_streams:
+            self.streams.append(new_stream)
+        else:
+            lru = min(range(len(self.streams)), key=lambda i: self.streams[i]["last_used"])
+            self.streams[lru] = new_stream
+        return []
+
+    def _advance(self, stream, block):
+        direction = stream["direction"]
+        limit = block + direction * self.distance
+        next_block = stream["next_block"]
+        if (next_block - block) * direction <= 0:
+            next_block = block + direction
+
+        targets = []
+        while len(targets) < self.degree and (limit - next_block) * direction >= 0:
+            if next_block >= 0:
+                targets.append(next_block * self.block_size)
+            next_block += direction
+        stream["next_block"] = next_block
+        return targets
+
+
+PREFETCHERS = {
+    "next_line": NextLinePrefetcher,
+    "stride":    StridePrefetcher,
+    "stream":    StreamPrefetcher,
+}
+
+
+def make_prefetcher(config, block_size):
+    """
+    Build a prefetcher from a `prefetch_config` entry, e.g.
+    {"type": "stride", "degree": 2, "table_size": 64}.
+    Returns None when no prefetcher is configured.
+    """
+    if not config:
+        return None
+    config = dict(config)
+    kind = config.pop("type", "none")
+    if kind in (None, "none"):
+        return None
+    if kind not in PREFETCHERS:
+        raise ValueError(f"Unknown prefetcher type: {kind}")
+    return PREFETCHERS[kind](block_size=block_size, **config)
@@ -0,0 +1,154 @@
+"""
+Trace-driven cache simulation.
+
+Replays a trace recorded with `trace_config` (see Trace.py) through
+CacheAndMemory, without running the pipeline, and reports hit rates and
+latency totals. Accesses keep the cycles they were recorded at, so the
+timing of the cores does not react to the cache configuration.
+
+    python Replay.py trace.bin config.yaml [other.yaml ...]
+    python Replay.py trace.bin config.yaml --sweep l1d_config.cache_size=200,400,800
+    python Replay.py trace.bin --disassemble trace.bin.text
+
+--disassemble lists the instruction fetches of the trace with the code at
+their addresses, from the image a run with instruction_memory_config
+writes next to the trace.
+"""
+import argparse
+import contextlib
+import copy
+import os
+import time
+
+import numpy as np
+import yaml
+
+from Memory import Memory
+from Storage import CacheAndMemory
+from Trace import load_trace, decompose, WRITE, INSTRUCTION, FLUSH
+from Assembler import Assembler, disassemble_trace
+
+
+def preload_splits(cache, addresses):
+    """Fill the cache's address split table with one vectorized pass."""
+    tags, indices, offsets = decompose(addresses, cache.block_size, cache.num_sets)
+    cache.split_table.update(zip(addresses.tolist(),
+                                 zip(tags.tolist(), indices.tolist(), offsets.tolist())))
+
+
+def replay(records, config, latencies=None):
+    """
+    Replay `records` (a TRACE_DTYPE array) through a fresh CacheAndMemory
+    built from `config` (a dict or a path). Returns the per-core counters.
+    """
+    if not isinstance(config, dict):
+        with open(config, "r") as file:
+            config = yaml.safe_load(file)
+    # the replay itself is not traced
+    config = {**config, "trace_config": None}
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        num_cores = int(records["core"].max()) + 1 if len(records) else 1
+        candm = CacheAndMemory(config, Memory(), latencies, num_cores=max(4, num_cores))
+
+        addresses = np.unique(records["address"]).astype(np.int64)
+        for cache in candm.l1i + candm.l1d + [candm.l2]:
+            preload_splits(cache, addresses)
+
+        stats = [{
+            "accesses":  0,
+            "l1i_hits":  0, "l1i_misses": 0,
+            "l1d_hits":  0, "l1d_misses": 0,
+            "l2_hits":   0, "l2_misses":  0,
+            "cycles":    0,
+        } for _ in range(candm.num_cores)]
+
+        for core_id, flags, cycle, address in zip(records["core"].tolist(), records["flags"].tolist(),
+                                                 records["cycle"].tolist(), records["address"].tolist()):
+            candm.tick(cycle)
+            core = stats[core_id]
+            if flags & FLUSH:
+                core["cycles"] += candm.flush_l1_dirty_to_l2(core_id)
+                continue
+
+            is_instruction = bool(flags & INSTRUCTION)
+            level = "l1i" if is_instruction else "l1d"
+            l1 = candm.l1i[core_id] if is_instruction else candm.l1d[core_id]
+            core["accesses"] += 1
+            if l1.findBlock(address) is not None:
+                core[level + "_hits"] += 1
+            else:
+                core[level + "_misses"] += 1
+                if candm.l2.findBlock(address) is not None:
+                    core["l2_hits"] += 1
+                else:
+                    core["l2_misses"] += 1
+
+            if flags & WRITE:
+                core["cycles"] += candm.write(core_id, address, 0)
+            else:
+                core["cycles"] += candm.read(core_id, address, is_instruction)[1]
+
+    return stats
+
+
+def summarize(stats):
+    """Merge per-core counters and add hit rates."""
+    total = {key: sum(core[key] for core in stats) for key in stats[0]}
+    for level in ("l1i", "l1d", "l2"):
+        accesses = total[level + "_hits"] + total[level + "_misses"]
+        total[level + "_hit_rate"] = total[level + "_hits"] / accesses if accesses else 0
+    return total
+
+
+def sweep(records, config, key, values):
+    """Replay once per value of a dotted config `key`, e.g. "l2_config.associativity"."""
+    results = []
+    for value in values:
+        swept = copy.deepcopy(config)
+        section = swept
+        *path, name = key.split(".")
+        for part in path:
+            section = section.setdefault(part, {})
+        section[name] = value
+        results.append((value, summarize(replay(records, swept))))
+    return results
+
+
+def print_table(rows):
+    print(f"{'config':>24} {'L1-I hit':>9} {'L1-D hit':>9} {'L2 hit':>8} {'cycles':>10}")
+    for label, total in rows:
+        print(f"{str(label):>24} {total['l1i_hit_rate']:>9.3f} {total['l1d_hit_rate']:>9.3f} "
+              f"{total['l2_hit_rate']:>8.3f} {total['cycles']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a memory access trace through the caches.")
+    parser.add_argument("trace")
+    parser.add_argument("configs", nargs="*", default=["config.yaml"])
+    parser.add_argument("--sweep", help="dotted config key and values, e.g. l2_config.cache_size=1024,2048")
+    parser.add_argument("--disassemble", metavar="IMAGE",
+                        help="list the instruction fetches with the code of this instruction memory image")
+    args = parser.parse_args()
+
+    records = load_trace(args.trace)
+    print(f"Loaded {len(records)} accesses from {args.trace}")
+    if args.disassemble:
+        assembler, memory = Assembler.load_image(args.disassemble)
+        for line in disassemble_trace(records, assembler, memory):
+            print(line)
+        raise SystemExit
+
+    start = time.time()
+    rows = []
+    for path in args.configs:
+        with open(path, "r") as file:
+            config = yaml.safe_load(file)
+        if args.sweep:
+            key, values = args.sweep.split("=")
+            for value, total in sweep(records, config, key, [int(v) for v in values.split(",")]):
+                rows.append((f"{path} {key.split('.')[-1]}={value}", total))
+        else:
+            rows.append((path, summarize(replay(records, config))))
+    print_table(rows)
+    print(f"Replayed {len(rows)} configurations in {time.time() - start:.2f}s")
@@ -0,0 +1,157 @@
+import math
+from statistics import NormalDist, mean, stdev
+
+from Core import If_program
+from Functional import FunctionalModel
+
+
+class Sampler:
+    """
+    SMARTS-style sampled simulation of a Simulator.
+
+    The run alternates detailed and functional intervals. A detailed interval
+    runs the cores' pipelines until each has retired `warmup` instructions,
+    which are not measured, and then `unit` more, whose cycles per instruction
+    form one sample; fetch then stops and the pipelines drain so that the
+    architectural state is exact again. The functional interval executes the
+    next instructions of every core on the FunctionalModel, a basic block per
+    core and cycle, so that every core starts a new sample each `interval` instructions.
+
+    Each core's total is the cycles it spent in detailed intervals (warmup
+    and drain included, so one-off costs there such as the la of a large
+    array count in full) plus its functionally executed instructions times
+    the mean sample CPI. The confidence interval, z * s / sqrt(n) on the
+    CPI, covers only that extrapolated part: it is the sampling error of the
+    steady-state CPI, not a bound on the total cycles.
+    """
+
+    def __init__(self, sim, interval=1000, warmup=50, unit=100, confidence=0.95):
+        if unit < 1 or warmup < 0 or interval < warmup + unit:
+            raise ValueError(f"Sampling needs unit >= 1 and interval >= warmup + unit: "
+                             f"{interval}, {warmup}, {unit}")
+        if not 0 < confidence < 1:
+            raise ValueError(f"Confidence must be between 0 and 1: {confidence}")
+        self.sim = sim
+        self.interval = interval
+        self.warmup = warmup
+        self.unit = unit
+        self.confidence = confidence
+        self.models = [FunctionalModel(core) for core in sim.cores]
+        self.samples = [[] for _ in sim.cores]   # CPI of every measured unit
+        self.detailed_cycles = [0] * len(sim.cores)   # cycles each core ran in detailed intervals
+        self.estimates = []
+
+    def finished(self, core):
+        return core.pc >= len(self.sim.program) and core.pipeline_empty()
+
+    def run(self):
+        sim = self.sim
+        while not all(self.finished(core) for core in sim.cores):
+            self.detailed()
+            self.fast_forward(self.interval - self.warmup - self.unit)
+        self.estimate()
+
+    def detailed(self):
+        """One detailed interval: warm up, measure a unit, then drain."""
+        sim = self.sim
+        start = [core.inst_executed for core in sim.cores]
+        marks = [[None, None] for _ in sim.cores]   # (clock, retired) after warmup and unit
+        targets = (self.warmup, self.warmup + self.unit)
+
+        def pending():
+            return [i for i, core in enumerate(sim.cores)
+                    if marks[i][1] is None and not self.finished(core)]
+
+        while pending():
+            self.cycle()
+            for i, core in enumerate(sim.cores):
+                retired = core.inst_executed - start[i]
+                for k, target in enumerate(targets):
+                    if marks[i][k] is None and retired >= target:
+                        marks[i][k] = (sim.clock, retired)
+
+        for i, (warm, done) in enumerate(marks):
+            if warm is not None and done is not None and done[1] > warm[1]:
+                self.samples[i].append((done[0] - warm[0]) / (done[1] - warm[1]))
+        self.drain()
+
+    def drain(self):
+        """Stop fetch and run the cores until their pipelines are empty."""
+        sim = self.sim
+        for core in sim.cores:
+            latch = core.pipeline_reg["IF"]
+            if latch is not None and "sync" in latch["raw"]:
+                # a sync still waiting at the barrier goes back to the functional model
+                barrier = If_program.global_sync_pointer[latch["pc"]]
+                if barrier != [1, 1, 1, 1]:
+                    barrier[core.coreid] = 0
+                    core.pipeline_reg["IF"] = None
+                    core.pc = latch["pc"]
+            core.fetch_stopped = True
+        while not all(core.pipeline_empty() for core in sim.cores):
+            self.cycle()
+        for core in sim.cores:
+            core.fetch_stopped = False
+
+    def cycle(self):
+        """One detailed cycle, charged to every core still running."""
+        sim = self.sim
+        running = [not self.finished(core) for core in sim.cores]
+        clock = sim.clock
+        sim.cycle()
+        for i, active in enumerate(running):
+            if active:
+                self.detailed_cycles[i] += sim.clock - clock
+
+    def fast_forward(self, count):
+        """Execute up to `count` instructions per core functionally."""
+        sim = self.sim
+        candm = sim.cores[0].candm
+        left = [count] * len(sim.cores)
+        while True:
+            progress = False
+            for i, model in enumerate(self.models):
+                executed = model.run_block(left[i]) if left[i] else 0
+                left[i] -= executed
+                progress = progress or executed > 0
+            waiting = any(candm.dma[core.coreid].outstanding() for core in sim.cores)
+            if not progress and not waiting:
+                break
+            sim.clock += 1
+            candm.tick(sim.clock)
+
+    def estimate(self):
+        """Estimated cycles of every core from its samples."""
+        z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+        self.estimates = []
+        for i, (core, model, samples) in enumerate(zip(self.sim.cores, self.models, self.samples)):
+            cpi = mean(samples) if samples else None
+            half_width = z * stdev(samples) / math.sqrt(len(samples)) if len(samples) > 1 else None
+            if model.executed == 0:
+                extrapolated = 0
+            else:
+                extrapolated = round(model.executed * cpi) if cpi is not None else None
+            self.estimates.append({
+                "samples":      len(samples),
+                "instructions": core.inst_executed + model.executed,
+                "functional":   model.executed,
+                "cpi":          cpi,
+                "cpi_interval": half_width,
+                "detailed_cycles": self.detailed_cycles[i],
+                "extrapolated_cycles": extrapolated,
+                "extrapolated_interval": round(model.executed * half_width) if half_width is not None else None,
+                "cycles":       self.detailed_cycles[i] + extrapolated if extrapolated is not None else None,
+            })
+        return self.estimates
+
+    def estimated_cycles(self):
+        """Estimated cycles of the whole run: the cores run in parallel."""
+        return max((estimate["cycles"] or 0) for estimate in self.estimates)
+
+
+def make_sampler(config, sim):
+    """Build the sampler of `sim` from `sampling_config`; None unless enabled."""
+    if not config or not config.get("enabled"):
+        return None
+    return Sampler(sim, int(config.get("interval", 1000)), int(config.get("warmup", 50)),
+                   int(config.get("unit", 100)), float(config.get("confidence", 0.95)))
@@ -0,0 +1,126 @@
+class Scoreboard:
+    """
+    Per-core register scoreboard.
+
+    Bit r of `pending` is set while an instruction writing register r is
+    between EX and WB; `stage`, `ready` and `value` describe the youngest
+    such writer: the stage it is in, the first cycle an instruction entering
+    EX can consume its result, and the result itself (only meaningful while
+    bit r of `valued` is set).
+    Bit r of `late` is set while a load that already left MEM on a miss
+    (hit-under-miss) is still waiting for its data, until cycle `fill[r]`.
+    Instructions carry the sequence number returned by `issue` so that an
+    older writer moving on does not overwrite the state of a younger one.
+    """
+
+    def __init__(self, num_regs=32):
+        self.pending = 0
+        self.valued = 0
+        self.late = 0
+        self.writers = [0] * num_regs     # in-flight writers per register
+        self.youngest = [0] * num_regs    # sequence number of the youngest writer
+        self.stage = [None] * num_regs
+        self.ready = [0] * num_regs
+        self.value = [0] * num_regs
+        self.fill = [0] * num_regs        # arrival cycle of late load data
+        self.sequence = 0
+
+    @staticmethod
+    def mask(registers):
+        """Bitmask of a list of register numbers (None entries are ignored)."""
+        bits = 0
+        for reg in registers:
+            if reg is not None:
+                bits |= 1 << reg
+        return bits
+
+    def issue(self, dest, stage, ready, value=None):
+        """An instruction writing `dest` (or None) enters `stage`; returns its sequence number."""
+        self.sequence += 1
+        if dest is not None:
+            bit = 1 << dest
+            self.pending |= bit
+            self.writers[dest] += 1
+            self.youngest[dest] = self.sequence
+            self.stage[dest] = stage
+            self.ready[dest] = ready
+            self._set_value(dest, bit, value)
+        return self.sequence
+
+    def advance(self, dest, seq, stage, ready=None, value=None):
+        """
+        The writer `seq` of `dest` moves to `stage`; `ready` and `value`
+        update its result when given.
+        """
+        if dest is not None and self.youngest[dest] == seq:
+            self.stage[dest] = stage
+            if ready is not None:
+                self.ready[dest] = ready
+            if value is not None:
+                self._set_value(dest, 1 << dest, value)
+
+    def wait(self, dest, seq, stage):
+        """
+        The writer `seq` of `dest` moves to `stage` before its result is
+        known: nothing can consume it until `advance` gives the ready cycle
+        and value.
+        """
+        if dest is not None and self.youngest[dest] == seq:
+            self.stage[dest] = stage
+            self.ready[dest] = float("inf")
+            self.valued &= ~(1 << dest)
+
+    def retire(self, dest, seq):
+        """The writer `seq` of `dest` has written the register file."""
+        if dest is None or not self.writers[dest]:
+            return
+        self.writers[dest] -= 1
+        if not self.writers[dest]:
+            bit = 1 << dest
+            self.pending &= ~bit
+            self.valued &= ~bit
+            self.stage[dest] = None
+
+    def defer(self, dest, ready):
+        """A retired load of `dest` receives its data at cycle `ready`."""
+        self.late |= 1 << dest
+        self.fill[dest] = ready
+
+    def flush(self):
+        """Drop every in-flight writer; loads waiting on a miss are not affected."""
+        for dest in range(len(self.writers)):
+            if self.pending >> dest & 1:
+                self.writers[dest] = 0
+                self.stage[dest] = None
+        self.pending = 0
+        self.valued = 0
+
+    def busy(self, mask, now, late_mask=None):
+        """
+        True if a register of `mask` has an in-flight writer, or one of
+        `late_mask` (default `mask`) still waits for a load miss at cycle `now`.
+        """
+        if self.pending & mask:
+            return True
+        late = self.late & (mask if late_mask is None else late_mask)
+        while late:
+            bit = late & -late
+            late ^= bit
+            reg = bit.bit_length() - 1
+            if self.fill[reg] > now:
+                return True
+            self.late &= ~bit
+        return False
+
+    def forward(self, reg, default):
+        """Value of the youngest in-flight writer of `reg` if it is known, else `default`."""
+        if self.valued >> reg & 1:
+            return self.value[reg]
+        return default
+
+    def _set_value(self, dest, bit, value):
+        if value is None:
+            self.valued &= ~bit
+        else:
+            self.valued |= bit
+            self.value[dest] = value
@@ -0,0 +1,43 @@
+from Banks import CacheBanks
+
+
+class ScratchPad:
+    """
+    Scratch pad of one core: `size` bytes holding 4-byte words at byte
+    addresses 0, 4, 8, ... Word accesses must be aligned and inside the pad.
+    With `banks`, consecutive words interleave over the banks and each access
+    keeps its bank busy for `occupancy` cycles, so accesses to the same bank
+    in the same cycle serialize.
+    """
+
+    WORD = 4
+
+    def __init__(self, size=400, banks=0, occupancy=1):
+        if size <= 0 or size % ScratchPad.WORD:
+            raise ValueError(f"Scratch pad size must be a positive multiple of {ScratchPad.WORD} bytes: {size}")
+        self.size = size
+        self.words = [0] * (size // ScratchPad.WORD)
+        self.banks = CacheBanks(num_banks=banks, ports=1, occupancy=occupancy,
+                                block_size=ScratchPad.WORD) if banks else None
+
+    def contains(self, address):
+        return 0 <= address < self.size and address % ScratchPad.WORD == 0
+
+    def index(self, address):
+        if not 0 <= address < self.size:
+            raise IndexError(f"Scratch pad address {address} outside 0..{self.size - 1}")
+        if address % ScratchPad.WORD:
+            raise ValueError(f"Unaligned scratch pad address {address}")
+        return address // ScratchPad.WORD
+
+    def read(self, address):
+        return self.words[self.index(address)]
+
+    def write(self, address, value):
+        self.words[self.index(address)] = value
+
+    def bank_wait(self, address, now, clock):
+        """Cycles an access issued at `now` waits for its bank."""
+        if self.banks is None:
+            return 0
+        return self.banks.access(address, now, clock)
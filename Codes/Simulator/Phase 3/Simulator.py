@@ -1,26 +1,54 @@
 from Memory import Memory
 from Core import Core, If_program
-from CoreWithForwarding import CoreWithForwarding
+from OoOCore import OoOCore
+from Sampling import make_sampler
+from Checker import make_checker
+from Assembler import make_assembler
 
 class Simulator:
-    def __init__(self, forwarding=False):
+    def __init__(self, forwarding=None, hazard_policy=None):
+        """
+        `forwarding` is True (all paths), False (none) or one of Core.forwarding_paths;
+        None and `hazard_policy` None use pipeline_config.
+        """
         self.memory = Memory()
         Core.memory = self.memory
+        if forwarding is True:
+            forwarding = "full"
+        elif forwarding is False:
+            forwarding = "none"
         self.forwarding = forwarding
-        if not self.forwarding:
-            self.cores = [Core(i) for i in range(4)]
-        else:
-            self.cores = [CoreWithForwarding(i, self.memory) for i in range(4)]
+        # ooo_config selects the out-of-order core model for every core.
+        core_model = OoOCore if (Core.config.get("ooo_config") or {}).get("enabled") else Core
+        self.cores = [core_model(i, forwarding, hazard_policy) for i in range(4)]
         self.program = []
         self.clock = 0
         self.data_segment = {}
+        self.assembler = None
+        # sampling_config: alternate detailed and functional intervals instead
+        self.sampler = make_sampler(Core.config.get("sampling_config"), self)
+        # checker_config: check every retirement against a functional reference model
+        self.checker = make_checker(Core.config.get("checker_config"), self.cores, Core.candm)
+        if self.checker is not None:
+            if self.sampler is not None or any(core.loop_accelerator for core in self.cores):
+                raise ValueError("The checker needs every instruction to retire in the pipeline: "
+                                 "disable sampling and loop acceleration")
+            for core in self.cores:
+                core.checker = self.checker
 
-    def make_data_segment(self, program_data):
+    @staticmethod
+    def parse_data_segment(program_data):
+        """Label -> words of the .data lines, last word first as la places them."""
+        data_segment = {}
         for data in program_data:
             values_data = data.split(".word")[1].split(" ")
             values_data = [int(value, 16) for value in values_data if value != '']
             values_data.reverse()
-            self.data_segment[data.split(":")[0]] = values_data
+            data_segment[data.split(":")[0]] = values_data
+        return data_segment
+
+    def make_data_segment(self, program_data):
+        self.data_segment.update(Simulator.parse_data_segment(program_data))
 
         for core in self.cores:
             core.data_segment = self.data_segment
@@ -30,6 +58,14 @@ class Simulator:
     def make_labels(self):
         for core in self.cores:
             core.make_labels(self.program)
+        # instruction_memory_config: the cores fetch the assembled program from memory
+        self.assembler = make_assembler(Core.config.get("instruction_memory_config"), self.program,
+                                        self.cores[0].program_label_map, self.data_segment)
+        if self.assembler is not None:
+            self.assembler.load(Core.candm.memory)
+            for core in self.cores:
+                core.program_label_map = self.assembler.labels
+                core.assembler = self.assembler
 
     def run(self):
         for core in self.cores:
@@ -40,13 +76,34 @@ class Simulator:
                 "MEM": None,
                 "WB": None,
             }
-    
-        while not all(core.pc >= len(self.program) and core.pipeline_empty() for core in self.cores):
-            # print(self.program[self.cores[0].pc])
-            for core in self.cores:
-                # print("core", core.coreid, "pc", core.pc)
-                core.pipeline_cycle()
-            self.clock += 1
+
+        if self.sampler is not None:
+            self.sampler.run()
+        else:
+            while not all(core.pc >= len(self.program) and core.pipeline_empty() for core in self.cores):
+                self.cycle()
         self.clock -= 1
+        for core in self.cores:
+            if core.loop_accelerator is not None:
+                core.loop_accelerator.finish()
+
+        print("clock cycles:", self.clock)
+        if self.sampler is not None:
+            print("estimated clock cycles:", self.sampler.estimated_cycles())
+        path = self.cores[0].candm.save_trace()
+        if path is not None and self.assembler is not None:
+            # Replay.py --disassemble reads the trace back with this image
+            self.assembler.save_image(path + ".text", Core.candm.memory)
 
-        print("clock cycles:", self.clock)
\ No newline at end of file
+    def cycle(self):
+        """Simulate one clock cycle of every core."""
+        # print(self.program[self.cores[0].pc])
+        self.cores[0].candm.tick(self.clock)
+        for core in self.cores:
+            # print("core", core.coreid, "pc", core.pc)
+            core.pipeline_cycle()
+        self.clock += 1
+        # Cores idling through fast-forwarded loop iterations need no simulated cycles.
+        running = [core for core in self.cores if not (core.pc >= len(self.program) and core.pipeline_empty())]
+        if running and all(core.skip_until > self.clock for core in running):
+            self.clock = min(core.skip_until for core in running)
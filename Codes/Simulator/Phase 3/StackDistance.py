@@ -0,0 +1,214 @@
+"""
+Mattson stack-distance profiling of LRU caches.
+
+The stack distance of an access is the number of distinct blocks used
+since the previous access to the same block; an LRU cache of C blocks hits
+exactly the accesses with a distance below C. One pass over an access
+stream therefore gives the miss ratio of every fully-associative size, and
+one pass per set count gives every associativity for that set count.
+Distances come from a merge-sort count of repeats done with NumPy, one
+stable sort per merge level, so a pass has no Python loop per access and
+the set counts group their accesses by set instead of scanning per set.
+
+    python StackDistance.py trace.bin [config.yaml] [--csv mrc.csv] [--plot mrc.png]
+
+The streams are the demand accesses of the trace: L1-I and L1-D per core,
+and all accesses merged for the shared L2 (with the L2 block size). The
+L2 curve is therefore the curve of the merged stream, not of the L1 misses.
+"""
+import argparse
+import csv
+
+import numpy as np
+import yaml
+
+from Trace import load_trace, decompose, INSTRUCTION, FLUSH
+
+FULL = "full"
+
+
+def previous_accesses(blocks):
+    """Time of the previous access to the same block for every access, -1 for first references."""
+    order = np.argsort(blocks, kind="stable")
+    previous = np.full(len(blocks), -1, dtype=np.int64)
+    repeat = np.flatnonzero(blocks[order][1:] == blocks[order][:-1]) + 1
+    previous[order[repeat]] = order[repeat - 1]
+    return previous
+
+
+def later_previous_counts(previous):
+    """
+    For every access i the number of earlier accesses j < i with
+    previous[j] > previous[i], by a bottom-up merge sort: when two sorted
+    chunks merge, an access of the right one counts the accesses of the left
+    one that do not come before it in the merged order.
+    """
+    size = len(previous)
+    counts = np.zeros(size, dtype=np.int64)
+    stride = size + 2   # key = chunk * stride + previous + 1 keeps the chunks apart
+    values = previous + 1
+    position = np.arange(size, dtype=np.int64)
+    order = position.copy()   # accesses sorted by value within each chunk of the level
+    width = 1
+    while width < size:
+        chunk = position // (2 * width)
+        # the sorted halves are runs that a stable sort merges in linear time;
+        # equal values keep the left access first
+        order = order[np.argsort(chunk * stride + values[order], kind="stable")]
+        right = (order // width) % 2 == 1
+        start = chunk * 2 * width
+        rights_before = np.cumsum(right) - right
+        rights_before -= rights_before[start]
+        lefts_not_after = position - start - rights_before
+        counts[order[right]] += width - lefts_not_after[right]
+        width *= 2
+    return counts
+
+
+def stack_distances(blocks):
+    """
+    Stack distance of every access in `blocks`, -1 for first references.
+    An access at time i whose block was last used at p sees the i - p - 1
+    accesses in between, less the repeats among them: those whose own
+    previous access also lies after p, i.e. the j < i with previous[j] > p.
+    """
+    blocks = np.asarray(blocks, dtype=np.int64)
+    previous = previous_accesses(blocks)
+    distances = np.arange(len(blocks), dtype=np.int64) - previous - 1 - later_previous_counts(previous)
+    distances[previous < 0] = -1
+    return distances
+
+
+def set_distances(addresses, block_size, num_sets):
+    """
+    Stack distances within each set of a cache with `num_sets` sets: the
+    accesses grouped by set (keeping their order) form one stream whose
+    distances never count a block of another set.
+    """
+    _, indices, _ = decompose(addresses, block_size, num_sets)
+    order = np.argsort(indices, kind="stable")
+    distances = np.empty(len(indices), dtype=np.int64)
+    distances[order] = stack_distances(np.asarray(addresses, dtype=np.int64)[order] // block_size)
+    return distances
+
+
+def miss_ratios(distances, capacities):
+    """Miss ratio of an LRU stack of each capacity (in blocks or ways)."""
+    if len(distances) == 0:
+        return [0.0 for _ in capacities]
+    reuses = np.sort(distances[distances >= 0])
+    cold = len(distances) - len(reuses)
+    return [(cold + len(reuses) - np.searchsorted(reuses, capacity)) / len(distances)
+            for capacity in capacities]
+
+
+def miss_ratio_curve(addresses, block_size, max_ways=16):
+    """
+    Miss ratios for capacities of 1, 2, 4, ... blocks up to the footprint,
+    fully associative and with 1, 2, 4, ... ways (at most `max_ways`).
+    Returns {"block_size", "capacities", "curves": {ways or FULL: [ratio per capacity]}}.
+    """
+    addresses = np.asarray(addresses, dtype=np.int64)
+    footprint = len(np.unique(addresses // block_size))
+    capacities = [1]
+    while capacities[-1] < footprint:
+        capacities.append(capacities[-1] * 2)
+
+    curves = {FULL: miss_ratios(stack_distances(addresses // block_size), capacities)}
+
+    ways = [w for w in (2 ** i for i in range(max_ways.bit_length())) if w <= max_ways]
+    for way in ways:
+        curves[way] = [None] * len(capacities)
+    # one pass per set count covers every associativity with that many sets
+    for num_sets in sorted({c // w for c in capacities for w in ways if c >= w}):
+        distances = set_distances(addresses, block_size, num_sets)
+        for way in ways:
+            capacity = num_sets * way
+            if capacity in capacities:
+                curves[way][capacities.index(capacity)] = miss_ratios(distances, [way])[0]
+
+    return {"block_size": block_size, "capacities": capacities, "curves": curves}
+
+
+def profile_trace(records, config):
+    """
+    Miss ratio curves of every stream of a trace: L1-I and L1-D per core
+    and the merged stream for the shared L2.
+    """
+    records = records[(records["flags"] & FLUSH) == 0]
+    instruction = (records["flags"] & INSTRUCTION) != 0
+    profiles = {}
+    for core_id in np.unique(records["core"]).tolist():
+        core = records["core"] == core_id
+        profiles[f"core{core_id}_l1i"] = miss_ratio_curve(
+            records["address"][core & instruction], config["l1i_config"]["block_size"])
+        profiles[f"core{core_id}_l1d"] = miss_ratio_curve(
+            records["address"][core & ~instruction], config["l1d_config"]["block_size"])
+    profiles["l2"] = miss_ratio_curve(records["address"], config["l2_config"]["block_size"])
+    return profiles
+
+
+def print_profile(name, profile):
+    curves = profile["curves"]
+    columns = [FULL] + [way for way in curves if way != FULL]
+    print(f"{name} (block size {profile['block_size']})")
+    print(f"{'size':>10}" + "".join(f"{(str(c) + '-way') if c != FULL else 'fully':>9}" for c in columns))
+    for i, capacity in enumerate(profile["capacities"]):
+        row = f"{capacity * profile['block_size']:>10}"
+        for column in columns:
+            ratio = curves[column][i]
+            row += f"{ratio:>9.3f}" if ratio is not None else f"{'-':>9}"
+        print(row)
+    print()
+
+
+def write_csv(path, profiles):
+    """Plot data: one row per stream, associativity and cache size."""
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["stream", "associativity", "cache_size", "miss_ratio"])
+        for name, profile in profiles.items():
+            for way, ratios in profile["curves"].items():
+                for capacity, ratio in zip(profile["capacities"], ratios):
+                    if ratio is not None:
+                        writer.writerow([name, way, capacity * profile["block_size"], ratio])
+
+
+def plot(path, profiles):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(len(profiles), 1, figsize=(7, 3 * len(profiles)), squeeze=False)
+    for ax, (name, profile) in zip(axes[:, 0], profiles.items()):
+        sizes = [c * profile["block_size"] for c in profile["capacities"]]
+        for way, ratios in profile["curves"].items():
+            points = [(s, r) for s, r in zip(sizes, ratios) if r is not None]
+            if points:
+                ax.plot(*zip(*points), marker="o", label=way if way == FULL else f"{way}-way")
+        ax.set_xscale("log", base=2)
+        ax.set_title(name)
+        ax.set_xlabel("cache size")
+        ax.set_ylabel("miss ratio")
+        ax.legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Miss ratio curves of LRU caches from a trace.")
+    parser.add_argument("trace")
+    parser.add_argument("config", nargs="?", default="config.yaml")
+    parser.add_argument("--csv", help="write the curves as CSV plot data")
+    parser.add_argument("--plot", help="plot the curves to an image")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as file:
+        config = yaml.safe_load(file)
+    profiles = profile_trace(load_trace(args.trace), config)
+    for name, profile in profiles.items():
+        print_profile(name, profile)
+    if args.csv:
+        write_csv(args.csv, profiles)
+    if args.plot:
+        plot(args.plot, profiles)
@@ -1,6 +1,13 @@
 import yaml
 from Cache import CacheWithLRU
 from Memory import Memory
+from Prefetcher import make_prefetcher
+from MSHR import MSHRFile
+from Banks import CacheBanks
+from DRAM import DRAM
+from Trace import TraceRecorder
+from DMA import make_dma_engine
+from ScratchPad import ScratchPad
 import math
 
 class CacheAndMemory:
@@ -17,10 +24,15 @@ class CacheAndMemory:
         self.num_cores = num_cores
         self.memory = memory
         self.cycles = 0
+        self.clock = 0
+        self.now = 0  # issue cycle of the access in progress
 
-        # Load cache config from YAML
-        with open(config_path, 'r') as file:
-            config = yaml.safe_load(file)
+        # Load cache config from YAML (or take an already loaded dict)
+        if isinstance(config_path, dict):
+            config = config_path
+        else:
+            with open(config_path, 'r') as file:
+                config = yaml.safe_load(file)
 
         l1i_config = config['l1i_config']
         l1d_config = config['l1d_config']
@@ -32,13 +44,71 @@ class CacheAndMemory:
         # per‑core private caches
         self.l1i = [ CacheWithLRU(**l1i_config) for _ in range(num_cores) ]
         self.l1d = [ CacheWithLRU(**l1d_config) for _ in range(num_cores) ]
-        self.scratch_pad = [ [0]*scratch_pad_config["size"] for _ in range(num_cores)]
-        print(f"Scratch pad size: {scratch_pad_config['size']}")
-        print(f"Scratch pad: {self.scratch_pad}")
+        self.scratch_pad = [ ScratchPad(scratch_pad_config['size'], scratch_pad_config.get('banks', 0),
+                                        scratch_pad_config.get('bank_occupancy', 1))
+                             for _ in range(num_cores) ]
+        # global address of the scratch pads: lw/sw to [base, base + size) reach the core's own
+        self.scratch_pad_base = scratch_pad_config.get('base')
+        # DMA engine per core between memory and its scratch pad
+        self.dma = [ make_dma_engine(scratch_pad_config) for _ in range(num_cores) ]
+        print(f"Scratch pad size: {scratch_pad_config['size']} bytes")
 
         # shared
         self.l2 = CacheWithLRU(**l2_config)
 
+        # prefetchers, one per private cache and one for the shared L2
+        prefetch_config = config.get('prefetch_config') or {}
+        self.l1i_prefetchers = [ make_prefetcher(prefetch_config.get('l1i'), l1i_config['block_size'])
+                                 for _ in range(num_cores) ]
+        self.l1d_prefetchers = [ make_prefetcher(prefetch_config.get('l1d'), l1d_config['block_size'])
+                                 for _ in range(num_cores) ]
+        self.l2_prefetcher = make_prefetcher(prefetch_config.get('l2'), l2_config['block_size'])
+
+        # miss status holding registers; 0 entries keeps the cache blocking
+        mshr_config = config.get('mshr_config') or {}
+        def mshrs(level):
+            entries = mshr_config.get(level, 0)
+            return MSHRFile(entries) if entries else None
+        self.l1i_mshrs = [ mshrs('l1i') for _ in range(num_cores) ]
+        self.l1d_mshrs = [ mshrs('l1d') for _ in range(num_cores) ]
+        self.l2_mshrs = mshrs('l2')
+        # with L1-D MSHRs a load miss no longer freezes the MEM stage
+        self.non_blocking = self.l1d_mshrs[0] is not None
+
+        # banks and ports of the shared L2; without banks L2 accesses never conflict
+        bank_config = config.get('l2_bank_config') or {}
+        if bank_config.get('num_banks', 0):
+            self.l2_banks = CacheBanks(block_size=l2_config['block_size'], **bank_config)
+        else:
+            self.l2_banks = None
+        # cycles spent queueing for an L2 bank, per core
+        self.l2_queue_cycles = [0] * num_cores
+
+        # DRAM timing model; without channels every L2 miss costs latencies['mem']
+        dram_config = config.get('dram_config') or {}
+        if dram_config.get('channels', 0):
+            self.dram = DRAM(num_cores=num_cores, **dram_config)
+        else:
+            self.dram = None
+
+        # memory access trace for trace-driven simulation, see Replay.py
+        trace_config = config.get('trace_config') or {}
+        self.trace = TraceRecorder(trace_config['path']) if trace_config.get('path') else None
+
+        # cycles spent beyond an L1 hit on data accesses, per core
+        self.dcache_stall_cycles = [0] * num_cores
+
+        # lr.w reservation of each core (L1-D block base address) and atomic counters
+        self.reservations = [None] * num_cores
+        self.atomic_stats = {
+            'amo': 0,
+            'lr': 0,
+            'sc': 0,
+            'sc_failed': 0,
+            'invalidations': 0,   # L1-D copies dropped by atomic writes
+            'cycles': 0,
+        }
+
         defaults = {
             'l1_hit':  1,
             'l1_miss': 3,
@@ -46,98 +116,431 @@ class CacheAndMemory:
             'l2_miss': 6,
             'mem':     10,
             'scratch_pad': 1,
+            'atomic': 1,
         }
         self.latencies = { **defaults, **(latencies or {}) }
 
         print(f"Cache latencies: {self.latencies}")
 
-    def read_scratch_pad(self, core_id: int, address: int) -> int:
+    def tick(self, clock: int):
+        """Advance the memory system to the simulator's current cycle."""
+        self.clock = clock
+        self.now = clock
+        for core_id, engine in enumerate(self.dma):
+            for transfer in engine.completed(clock):
+                self._finish_dma(core_id, transfer)
+
+    def scratch_pad_offset(self, address: int):
+        """Scratch pad byte address of a global `address`, or None outside the pads' window."""
+        base = self.scratch_pad_base
+        if base is None or not base <= address < base + self.scratch_pad[0].size:
+            return None
+        return address - base
+
+    def read_scratch_pad(self, core_id: int, address: int, delay: int=0) -> int:
         """
-        Read from scratch pad memory.
+        Read the word at byte `address` of the core's scratch pad.
         Returns the word; updates self.cycles.
         """
         self.cycles = 0
-        data = self.scratch_pad[core_id][address]
+        self.now = self.clock + delay
+        spm = self.scratch_pad[core_id]
+        data = spm.read(address)
+        self.cycles += spm.bank_wait(address, self.now, self.clock)
         self.cycles += self.latencies['scratch_pad']
         return data, self.cycles
     
-    def write_scratch_pad(self, core_id: int, address: int, value: int):
+    def write_scratch_pad(self, core_id: int, address: int, value: int, delay: int=0):
         """
-        Write to scratch pad memory.
-        Returns the word; updates self.cycles.
+        Write the word at byte `address` of the core's scratch pad.
+        Returns the cycles; updates self.cycles.
         """
         self.cycles = 0
-        self.scratch_pad[core_id][address] = value
+        self.now = self.clock + delay
+        spm = self.scratch_pad[core_id]
+        spm.write(address, value)
+        self.cycles += spm.bank_wait(address, self.now, self.clock)
         self.cycles += self.latencies['scratch_pad']
         return self.cycles
 
-    def read(self, core_id: int, address: int, is_instruction: bool=False) -> int:
+    def get_scratch_pad_bank_stats(self) -> list:
+        """Per-bank counters of each core's scratch pad, or None without banks."""
+        if self.scratch_pad[0].banks is None:
+            return None
+        return [ spm.banks.get_stats(self.clock + 1) for spm in self.scratch_pad ]
+
+    def read(self, core_id: int, address: int, is_instruction: bool=False, pc: int=None,
+             delay: int=0) -> int:
         """
         Read from L1‑I or L1‑D; on miss go to L2, then memory.
+        `pc` identifies the accessing instruction for PC-indexed prefetchers,
+        `delay` is how many cycles after the current clock the access issues.
         Returns the word; updates self.cycles.
         """
         self.cycles = 0
+        self.now = self.clock + delay
+        if self.trace:
+            self.trace.record(core_id, self.now, address, is_instruction=is_instruction)
         l1 = self.l1i[core_id] if is_instruction else self.l1d[core_id]
+        l1_prefetcher = self.l1i_prefetchers[core_id] if is_instruction else self.l1d_prefetchers[core_id]
+        l1_mshrs = self.l1i_mshrs[core_id] if is_instruction else self.l1d_mshrs[core_id]
+        if pc is None and is_instruction:
+            pc = address
 
         # L1
         data = l1.getFromCache(address)
         if data is not None:
             self.cycles += self.latencies['l1_hit']
+            first_use, fill_wait = self._demand_hit(l1, address, l1_prefetcher, l1_mshrs)
+            self.cycles += fill_wait
+            self._issue_prefetches(l1, l1_prefetcher, l1_mshrs, address, pc, True, first_use)
+            self._count_dcache_stalls(core_id, is_instruction)
             return data, self.cycles
 
         # L1 miss
         self.cycles += self.latencies['l1_miss']
+        self.cycles += self._mshr_wait(l1_mshrs)
+        if l1_prefetcher:
+            l1_prefetcher.check_pollution(address)
 
         # L2
+        self.cycles += self._l2_bank_wait(core_id, address)
         data = self.l2.getFromCache(address)
         if data is not None:
             self.cycles += self.latencies['l2_hit']
+            first_use, fill_wait = self._demand_hit(self.l2, address, self.l2_prefetcher, self.l2_mshrs)
+            self.cycles += fill_wait
             # promote to L1
             l1.getToCache(address, self.memory, self.l2)
+            self._mark_fill(l1, address, l1_mshrs)
+            self._issue_prefetches(self.l2, self.l2_prefetcher, self.l2_mshrs, address, pc, True, first_use)
+            self._issue_prefetches(l1, l1_prefetcher, l1_mshrs, address, pc, False, False)
+            self._count_dcache_stalls(core_id, is_instruction)
             return l1.getFromCache(address), self.cycles
 
         # L2 miss
         self.cycles += self.latencies['l2_miss']
+        self.cycles += self._mshr_wait(self.l2_mshrs)
+        if self.l2_prefetcher:
+            self.l2_prefetcher.check_pollution(address)
         # memory
-        self.cycles += self.latencies['mem']
+        self.cycles += self._memory_access(core_id, address)
 
         # fill L2 then L1
         self.l2.getToCache(address, self.memory)
+        self._mark_fill(self.l2, address, self.l2_mshrs)
 
         l1.getToCache(address, self.memory, self.l2)
+        self._mark_fill(l1, address, l1_mshrs)
 
+        self._issue_prefetches(self.l2, self.l2_prefetcher, self.l2_mshrs, address, pc, False, False)
+        self._issue_prefetches(l1, l1_prefetcher, l1_mshrs, address, pc, False, False)
+        self._count_dcache_stalls(core_id, is_instruction)
         return l1.getFromCache(address), self.cycles
 
-    def write(self, core_id: int, address: int, value: int):
+    def write(self, core_id: int, address: int, value: int, pc: int=None, delay: int=0):
         """
         Write‑back/write‑allocate:
          - allocate in L1‑D & L2 on miss, then write both.
+        Stores block the MEM stage for their whole latency, so they do not
+        allocate MSHRs; they only wait for a fill already in flight.
         """
         self.cycles = 0
+        self.now = self.clock + delay
+        if self.trace:
+            self.trace.record(core_id, self.now, address, is_write=True)
         l1 = self.l1d[core_id]
+        l1_prefetcher = self.l1d_prefetchers[core_id]
 
         # L1‑D write‑allocate
         if l1.getFromCache(address) is None:
+            if l1_prefetcher:
+                l1_prefetcher.check_pollution(address)
             l1.getToCache(address, self.memory, self.l2)
             self.cycles += self.latencies['l1_miss']
+            l1_hit, first_use = False, False
+        else:
+            l1_hit = True
+            first_use, fill_wait = self._demand_hit(l1, address, l1_prefetcher, None)
+            self.cycles += fill_wait
         l1.writeToCache(address, value)
         self.cycles += self.latencies['l1_hit']
+        self._break_reservations(core_id, address)
 
         # L2 write‑allocate
+        self.cycles += self._l2_bank_wait(core_id, address)
         if self.l2.getFromCache(address) is None:
+            if self.l2_prefetcher:
+                self.l2_prefetcher.check_pollution(address)
             self.l2.getToCache(address, self.memory)
             self.cycles += self.latencies['l2_miss']
+            if self.dram:
+                self.cycles += self._memory_access(core_id, address)
+            l2_hit, l2_first_use = False, False
+        else:
+            l2_hit = True
+            l2_first_use, fill_wait = self._demand_hit(self.l2, address, self.l2_prefetcher, None)
+            self.cycles += fill_wait
         self.l2.writeToCache(address, value)
         self.cycles += self.latencies['l2_hit']
 
+        self._issue_prefetches(self.l2, self.l2_prefetcher, self.l2_mshrs, address, pc, l2_hit, l2_first_use)
+        self._issue_prefetches(l1, l1_prefetcher, self.l1d_mshrs[core_id], address, pc, l1_hit, first_use)
+        self._count_dcache_stalls(core_id, False)
         return self.cycles
-    
+
+    def atomic(self, core_id: int, op: str, address: int, value: int=None, pc: int=None):
+        """
+        Atomic access (amoadd.w, amoswap.w, lr.w, sc.w) performed at the shared
+        L2, the point where all cores see the same data:
+         - amoadd.w / amoswap.w return the old word and write old + value / value,
+         - lr.w returns the word and reserves its block for this core,
+         - sc.w writes value if the reservation survived and returns 0, else 1.
+        A write goes through to memory and drops every L1‑D copy of the block
+        (dirty ones are written back first), so later loads of any core miss
+        and see it; it also breaks the other cores' reservations, as stores do.
+        Returns (result, cycles); updates self.cycles.
+        """
+        self.cycles = 0
+        self.now = self.clock
+        writes = op != 'lr.w'
+        if self.trace:
+            self.trace.record(core_id, self.now, address, is_write=writes)
+        block_base = address - (address % self.l1d_config['block_size'])
+
+        # past the private L1‑D to the L2
+        self.cycles += self.latencies['l1_hit']
+        self.cycles += self._l2_bank_wait(core_id, address)
+        if self.l2.findBlock(address) is None:
+            self.l2.getToCache(address, self.memory)
+            self.cycles += self.latencies['l2_miss']
+            self.cycles += self._memory_access(core_id, address)
+        else:
+            self.cycles += self.latencies['l2_hit']
+        old = self.l2.getFromCache(address)
+
+        new = None
+        if op == 'amoadd.w':
+            result, new = old, old + value
+            self.atomic_stats['amo'] += 1
+        elif op == 'amoswap.w':
+            result, new = old, value
+            self.atomic_stats['amo'] += 1
+        elif op == 'lr.w':
+            result = old
+            self.reservations[core_id] = block_base
+            self.atomic_stats['lr'] += 1
+        elif op == 'sc.w':
+            self.atomic_stats['sc'] += 1
+            if self.reservations[core_id] == block_base:
+                result, new = 0, value
+            else:
+                result = 1
+                self.atomic_stats['sc_failed'] += 1
+            self.reservations[core_id] = None
+        else:
+            raise ValueError(f"Unknown atomic operation: {op}")
+
+        if new is not None:
+            invalidated = self._invalidate_l1d(address)
+            self.atomic_stats['invalidations'] += invalidated
+            self.l2.writeToCache(address, new)
+            self.memory.memory[address] = new
+            self._break_reservations(core_id, address)
+            # the read-modify-write at the L2, plus one round to invalidate the L1 copies
+            self.cycles += self.latencies['atomic']
+            if invalidated:
+                self.cycles += self.latencies['l1_hit']
+
+        print(f"Core {core_id} {op} at {address}: read {old}, wrote {new}, {self.cycles} cycles")
+        self.atomic_stats['cycles'] += self.cycles
+        self._count_dcache_stalls(core_id, False)
+        return result, self.cycles
+
+    def _invalidate_l1d(self, address):
+        """
+        Drop every L1‑D copy of the block of `address`, writing dirty ones back
+        to L2 and memory first. Returns how many copies were dropped.
+        """
+        block_base = address - (address % self.l1d_config['block_size'])
+        dropped = 0
+        for l1 in self.l1d:
+            block = l1.findBlock(address)
+            if block is None:
+                continue
+            if block['dirty']:
+                for i, val in enumerate(block['data']):
+                    self.memory.memory[block_base + i] = val
+                    self.l2.writeToCache(block_base + i, val)
+            block['valid'] = False
+            dropped += 1
+        return dropped
+
+    def dma_start(self, core_id: int, to_spm: bool, spm_addr: int, mem_addr: int, count: int) -> int:
+        """
+        Start a DMA transfer of `count` words between memory and the scratch
+        pad of `core_id` (see DMA.py). Returns the cycle it completes.
+        """
+        last = 4 * (count - 1)
+        spm = self.scratch_pad[core_id]
+        if count < 1 or not (spm.contains(spm_addr) and spm.contains(spm_addr + last)
+                             and 0 <= mem_addr and mem_addr + last < len(self.memory.memory)):
+            raise IndexError(f"Core {core_id}: DMA of {count} words between scratch pad "
+                             f"{spm_addr} and memory {mem_addr} is out of range")
+        done_at = self.dma[core_id].start(to_spm, spm_addr, mem_addr, count, self.clock)
+        print(f"Core {core_id} DMA {'to' if to_spm else 'from'} scratch pad: {count} words, "
+              f"spm {spm_addr}, memory {mem_addr}, done at cycle {done_at}")
+        return done_at
+
+    def _finish_dma(self, core_id, transfer):
+        """
+        Copy the words of a completed transfer. Memory is read where all cores
+        see the same data (L2, else memory); writes go to memory and the L2
+        copy and drop the L1‑D copies, as atomic writes do.
+        """
+        spm = self.scratch_pad[core_id]
+        for i in range(transfer['count']):
+            spm_addr = transfer['spm'] + 4 * i
+            mem_addr = transfer['mem'] + 4 * i
+            if transfer['to_spm']:
+                value = self.l2.getFromCache(mem_addr) if self.l2.findBlock(mem_addr) else None
+                spm.write(spm_addr, self.memory.memory[mem_addr] if value is None else value)
+            else:
+                value = spm.read(spm_addr)
+                self._invalidate_l1d(mem_addr)
+                self.memory.memory[mem_addr] = value
+                if self.l2.findBlock(mem_addr) is not None:
+                    self.l2.writeToCache(mem_addr, value)
+                self._break_reservations(None, mem_addr)
+        print(f"Core {core_id} DMA of {transfer['count']} words complete")
+
+    def get_dma_stats(self) -> list:
+        """Transfers, words and busy cycles of each core's DMA engine, or None if unused."""
+        stats = [ engine.get_stats() for engine in self.dma ]
+        if not any(s['to_spm'] or s['from_spm'] for s in stats):
+            return None
+        return [ dict(s) for s in stats ]
+
+    def _break_reservations(self, core_id, address):
+        """A write by `core_id` to `address` cancels other cores' lr.w reservations of its block."""
+        block_base = address - (address % self.l1d_config['block_size'])
+        for other, reserved in enumerate(self.reservations):
+            if other != core_id and reserved == block_base:
+                self.reservations[other] = None
+
+    def _demand_hit(self, cache, address, prefetcher, mshrs):
+        """
+        Account a demand hit on a block whose fill may still be in flight,
+        either from a prefetch or from an earlier miss held in an MSHR.
+        Returns (first use of a prefetched block, cycles left until the fill).
+        """
+        block = cache.findBlock(address)
+        if block is None:
+            return False, 0
+
+        first_use = block["prefetched"]
+        fill_wait = max(0, block["ready_at"] - self.now)
+        if first_use:
+            block["prefetched"] = False
+            if prefetcher:
+                prefetcher.stats["useful"] += 1
+                if fill_wait:
+                    prefetcher.stats["late"] += 1
+        elif fill_wait and mshrs:
+            mshrs.merge()
+        return first_use, fill_wait
+
+    def _mshr_wait(self, mshrs):
+        """Cycles a primary miss waits for a free MSHR (0 for a blocking cache)."""
+        if mshrs is None:
+            return 0
+        return mshrs.wait(self.now)
+
+    def _l2_bank_wait(self, core_id, address):
+        """Queueing delay of an L2 access issued after the cycles spent so far."""
+        if self.l2_banks is None:
+            return 0
+        wait = self.l2_banks.access(address, self.now + self.cycles, self.clock)
+        if core_id is not None:
+            self.l2_queue_cycles[core_id] += wait
+        return wait
+
+    def _memory_access(self, core_id, address, delay=0):
+        """Latency of fetching the block of `address` from main memory."""
+        if self.dram is None:
+            return self.latencies['mem']
+        return self.dram.access(address, self.now + self.cycles + delay, core_id, self.clock)
+
+    def _mark_fill(self, cache, address, mshrs):
+        """Record the fill of a demand miss as outstanding until it completes."""
+        if mshrs is None:
+            return
+        block = cache.findBlock(address)
+        ready_at = self.now + self.cycles
+        block["ready_at"] = ready_at
+        mshrs.allocate(address - (address % cache.block_size), ready_at, self.now)
+
+    def _issue_prefetches(self, cache, prefetcher, mshrs, address, pc, hit, first_use):
+        """Train `prefetcher` on a demand access and fill the blocks it asks for."""
+        if prefetcher is None:
+            return
+
+        for target in prefetcher.observe(address, pc, hit, first_use):
+            if target < 0 or target + cache.block_size > len(self.memory.memory):
+                continue
+            if cache.findBlock(target) is not None:
+                continue
+            # a prefetch needs a free MSHR, otherwise it is dropped
+            if mshrs is not None and mshrs.free_at(self.now) > self.now:
+                continue
+
+            if cache is self.l2:
+                fill_latency = self.latencies['l2_miss'] + self._memory_access(None, target)
+                evicted = self.l2.getToCache(target, self.memory)
+            else:
+                fill_latency = self._l2_bank_wait(None, target)
+                if self.l2.findBlock(target) is not None:
+                    fill_latency += self.latencies['l2_hit']
+                else:
+                    fill_latency += self.latencies['l2_miss']
+                    fill_latency += self._memory_access(None, target, fill_latency)
+                    self.l2.getToCache(target, self.memory)
+                evicted = cache.getToCache(target, self.memory, self.l2)
+
+            block = cache.findBlock(target)
+            block["prefetched"] = True
+            block["ready_at"] = self.now + fill_latency
+            if mshrs is not None:
+                mshrs.allocate(target, block["ready_at"], self.now)
+            prefetcher.stats["issued"] += 1
+            prefetcher.record_eviction(evicted)
+            print(f"Prefetch issued for block {target}, ready at cycle {block['ready_at']}")
+
+    def _count_dcache_stalls(self, core_id, is_instruction):
+        if not is_instruction:
+            self.dcache_stall_cycles[core_id] += max(0, self.cycles - self.latencies['l1_hit'])
+
+    def get_prefetch_stats(self) -> dict:
+        """Prefetch counters per cache level (per core for the private L1s)."""
+        def stats(prefetcher):
+            return dict(prefetcher.stats) if prefetcher else None
+
+        return {
+            'l1i': [ stats(p) for p in self.l1i_prefetchers ],
+            'l1d': [ stats(p) for p in self.l1d_prefetchers ],
+            'l2':  stats(self.l2_prefetcher),
+        }
+
     def flush_l1_dirty_to_l2(self, core_id: int) -> int:
         """
         Write-back all dirty blocks from L1‑D of the given core into shared L2.
         Returns accumulated stall cycles.
         """
         self.cycles = 0
+        self.now = self.clock
+        bank_wait = 0
+        if self.trace:
+            self.trace.record(core_id, self.now, 0, flush=True)
         l1 = self.l1d[core_id]
 
         print("flushing l1 of core ", core_id)
@@ -154,6 +557,9 @@ class CacheAndMemory:
                     # reconstruct base address of this block
                     base_addr = (tag << (index_bits + offset_bits)) | (set_idx << offset_bits)
 
+                    # every block written back occupies one L2 bank
+                    bank_wait = max(bank_wait, self._l2_bank_wait(core_id, base_addr))
+
                     # write-allocate in L2 if missing
                     if self.l2.getFromCache(base_addr) is None:
                         self.l2.getToCache(base_addr, self.memory)
@@ -168,7 +574,43 @@ class CacheAndMemory:
         
         self.l1d = [ CacheWithLRU(**self.l1d_config) for _ in range(self.num_cores) ]
 
-        return self.latencies['l1_hit'] + self.latencies['l2_hit']
+        return self.latencies['l1_hit'] + self.latencies['l2_hit'] + bank_wait
+
+    def get_mshr_stats(self) -> dict:
+        """MSHR counters per cache level (per core for the private L1s)."""
+        def stats(mshrs):
+            return dict(mshrs.stats) if mshrs else None
+
+        return {
+            'l1i': [ stats(m) for m in self.l1i_mshrs ],
+            'l1d': [ stats(m) for m in self.l1d_mshrs ],
+            'l2':  stats(self.l2_mshrs),
+        }
+
+    def get_atomic_stats(self) -> dict:
+        """Atomic operation counters, or None if the program used none."""
+        stats = self.atomic_stats
+        if not (stats['amo'] or stats['lr'] or stats['sc']):
+            return None
+        return dict(stats)
+
+    def get_l2_bank_stats(self) -> list:
+        """Per-bank utilization and queue depth of the shared L2, or None."""
+        if self.l2_banks is None:
+            return None
+        return self.l2_banks.get_stats(self.clock + 1)
+
+    def get_dram_stats(self) -> dict:
+        """Row buffer hit rate and average memory latency per core, or None."""
+        if self.dram is None:
+            return None
+        return self.dram.get_stats()
+
+    def save_trace(self):
+        """Write the recorded access trace, if tracing is enabled."""
+        if self.trace:
+            return self.trace.save()
+        return None
 
     def get_cycles(self) -> int:
         return self.cycles
\ No newline at end of file
@@ -0,0 +1,71 @@
+class StoreBuffer:
+    """
+    Per-core FIFO of stores that left the pipeline and still have to be
+    written into the L1-D. One store drains at a time, taking the cycles
+    CacheAndMemory.write reports; loads to a buffered address take the data
+    of the youngest store to it instead of reading the cache.
+    Drain policy "eager" writes whenever the previous write finished, "lazy"
+    only once `watermark` stores are buffered or a drain is forced.
+    """
+
+    def __init__(self, depth=8, policy="eager", watermark=None):
+        if policy not in ("eager", "lazy"):
+            raise ValueError(f"Unknown store buffer drain policy: {policy}")
+        self.depth = depth
+        self.policy = policy
+        self.watermark = min(depth, watermark or depth)
+        self.entries = []        # [address, value, pc], oldest first
+        self.busy_until = 0      # cycle the write in progress finishes
+
+        self.stats = {
+            "stores":      0,
+            "forwarded":   0,   # loads served from the buffer
+            "full_stalls": 0,   # cycles a store waited for a free entry
+            "drained":     0,
+            "drain_cycles": 0,  # cycles spent writing into the L1-D
+        }
+
+    def full(self):
+        return len(self.entries) >= self.depth
+
+    def empty(self):
+        return not self.entries
+
+    def push(self, address, value, pc=None):
+        self.entries.append([address, value, pc])
+        self.stats["stores"] += 1
+
+    def forward(self, address):
+        """Data of the youngest buffered store to `address`, or None."""
+        for entry in reversed(self.entries):
+            if entry[0] == address:
+                self.stats["forwarded"] += 1
+                return entry[1]
+        return None
+
+    def drain(self, candm, core_id, clock, force=False):
+        """Start writing the oldest store if the previous write finished and the policy allows."""
+        if not self.entries or clock < self.busy_until:
+            return
+        if self.policy == "lazy" and not force and len(self.entries) < self.watermark:
+            return
+        address, value, pc = self.entries.pop(0)
+        cycles = candm.write(core_id, address, value, pc=pc)
+        self.busy_until = clock + max(1, cycles)
+        self.stats["drained"] += 1
+        self.stats["drain_cycles"] += cycles
+        print("Core", core_id, "store buffer drained", value, "to", address, "in", cycles, "cycles")
+
+    def get_stats(self):
+        return self.stats
+
+
+def make_store_buffer(config):
+    """
+    Build a store buffer from `store_buffer_config`, e.g.
+    {"depth": 8, "drain_policy": "lazy", "watermark": 4}.
+    Returns None when the depth is 0 (stores write the L1-D from MEM).
+    """
+    if not config or not config.get("depth"):
+        return None
+    return StoreBuffer(config["depth"], config.get("drain_policy", "eager"), config.get("watermark"))
@@ -0,0 +1,64 @@
+import math
+import numpy as np
+
+# one record per demand access, 10 bytes each
+TRACE_DTYPE = np.dtype([
+    ("core",    "u1"),
+    ("flags",   "u1"),
+    ("cycle",   "<u4"),
+    ("address", "<u4"),
+])
+TRACE_MAGIC = b"RVTRACE1"
+
+WRITE       = 1
+INSTRUCTION = 2
+FLUSH       = 4  # L1-D write-back and invalidate of the core
+
+
+class TraceRecorder:
+    """
+    Collects the memory accesses of a run for trace-driven simulation.
+    Records are kept in memory and written once with `save`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+
+    def record(self, core_id, cycle, address, is_write=False, is_instruction=False, flush=False):
+        flags = (WRITE if is_write else 0) | (INSTRUCTION if is_instruction else 0) | (FLUSH if flush else 0)
+        self.records.append((core_id, flags, cycle, address))
+
+    def save(self, path=None):
+        path = path or self.path
+        save_trace(path, np.array(self.records, dtype=TRACE_DTYPE))
+        print(f"Trace of {len(self.records)} accesses written to {path}")
+        return path
+
+
+def save_trace(path, records):
+    with open(path, "wb") as file:
+        file.write(TRACE_MAGIC)
+        records.astype(TRACE_DTYPE, copy=False).tofile(file)
+
+
+def load_trace(path):
+    """Read a trace file into a structured array of TRACE_DTYPE."""
+    with open(path, "rb") as file:
+        if file.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+        return np.fromfile(file, dtype=TRACE_DTYPE)
+
+
+def decompose(addresses, block_size, num_sets):
+    """
+    Vectorized split of `addresses` into (tags, indices, offsets), using
+    the same field widths as `_split_address` of the caches.
+    """
+    addresses = np.asarray(addresses, dtype=np.int64)
+    offset_bits = int(math.log2(block_size))
+    index_bits = int(math.log2(num_sets))
+    offsets = addresses & ((1 << offset_bits) - 1)
+    indices = (addresses >> offset_bits) & ((1 << index_bits) - 1)
+    tags = addresses >> (offset_bits + index_bits)
+    return tags, indices, offsets
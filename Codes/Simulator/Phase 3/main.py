@@ -7,7 +7,8 @@ from flask_cors import CORS
 from Memory import Memory
 from Core import Core, If_program
 from Simulator import Simulator
-from CoreWithForwarding import CoreWithForwarding
+from OoOCore import OoOCore
+from Ensemble import Ensemble
 
 
 # control hazards
@@ -273,7 +274,7 @@ addi x29 x0 1
 ladd: bne x29 x5 outadd
 sw_spm x29 0(x30)
 addi x29 x29 1
-addi x30 x30 1
+addi x30 x30 4
 j ladd
 outadd: addi x0 x0 0
 
@@ -364,7 +365,7 @@ def preprocess(program):
 
     return programs_text, programs_data
 
-def main(program, forwarding):
+def main(program, forwarding=None):
     programs_text, programs_data = preprocess(program)
     sim = Simulator(forwarding=forwarding)
     sim.program = programs_text
@@ -390,10 +391,142 @@ def main(program, forwarding):
     for i, core in enumerate(sim.cores):
         print(f"IPC for Core {i}: {core.get_ipc()}")
 
+    for i, core in enumerate(sim.cores):
+        if isinstance(core, OoOCore):
+            print(f"Out-of-order Core {i}: {core.get_ooo_stats()}")
+
+    for i, core in enumerate(sim.cores):
+        if core.width > 1:
+            ipc = core.get_ipc()
+            print(f"Issue width {core.width} for Core {i}: IPC {ipc:.3f} ({ipc / core.width:.1%} of peak), "
+                  f"cycles retiring 0..{core.width} instructions: {core.retired_per_cycle}")
+
+    for i, core in enumerate(sim.cores):
+        if core.branch_unit is not None:
+            print(f"Branch prediction for Core {i}: {core.branch_unit.get_stats()}")
+            print(f"Flush cycles saved for Core {i}: {core.flush_cycles_saved}")
+
+    for i, core in enumerate(sim.cores):
+        if core.units is not None:
+            print(f"Functional units for Core {i}: {core.units.get_stats()}")
+
+    for i, core in enumerate(sim.cores):
+        if core.fetch_block:
+            print(f"Fetch buffer for Core {i}: {core.fetch_stats}")
+
+    if sim.assembler is not None:
+        print(f"Instruction memory at {sim.assembler.text_base}:")
+        for line in sim.assembler.listing(Core.candm.memory):
+            print("   ", line)
+        stats = sim.assembler.stats
+        print(f"Instruction memory: {stats['decoded']} fetched words decoded, "
+              f"{stats['changed']} of them changed since assembly")
+
+    if sim.checker is not None:
+        stats = sim.checker.get_stats()
+        print(f"Reference model: {stats['checked']} retirements checked, "
+              f"{stats['adopted']} shared loads taken from the pipeline")
+
+    if sim.sampler is not None:
+        confidence = sim.sampler.confidence
+        for i, estimate in enumerate(sim.sampler.estimates):
+            if estimate["cpi"] is None:
+                print(f"Sampling for Core {i}: no samples, {estimate['detailed_cycles']} detailed cycles")
+                continue
+            samples = estimate["samples"]
+            line = f"Sampling for Core {i}: {samples} sample{'s' if samples > 1 else ''}, CPI {estimate['cpi']:.3f}"
+            if estimate["cpi_interval"] is not None:
+                line += f" +- {estimate['cpi_interval']:.3f} ({confidence:.0%} confidence, steady state)"
+            line += (f", estimated cycles {estimate['cycles']} = {estimate['detailed_cycles']} detailed "
+                     f"+ {estimate['extrapolated_cycles']} extrapolated")
+            if estimate["extrapolated_interval"] is not None:
+                line += f" (+- {estimate['extrapolated_interval']} sampling error of the extrapolation)"
+            print(line)
+
+    for i, core in enumerate(sim.cores):
+        accelerator = core.loop_accelerator
+        if accelerator is not None and accelerator.mode == "accelerate":
+            print(f"Loop fast-forward for Core {i}: {accelerator.get_stats()}")
+        elif accelerator is not None:
+            for session in accelerator.validations:
+                print(f"Loop at PC {session['head']} on Core {i}: {session['iterations']} iterations, "
+                      f"extrapolated {session['predicted']} cycles, simulated {session['simulated']}, "
+                      f"error {session['error']:+.2%}")
+
+    for i, core in enumerate(sim.cores):
+        if core.store_buffer is not None:
+            print(f"Store buffer for Core {i}: {core.store_buffer.get_stats()}")
+
+    candm = sim.cores[0].candm
+    for i in range(len(sim.cores)):
+        print(f"D-cache stall cycles for Core {i}: {candm.dcache_stall_cycles[i]}")
+
+    prefetch_stats = candm.get_prefetch_stats()
+    for level in ("l1i", "l1d"):
+        for i, stats in enumerate(prefetch_stats[level]):
+            if stats:
+                print(f"{level.upper()} prefetcher for Core {i}: {stats}")
+    if prefetch_stats["l2"]:
+        print(f"L2 prefetcher: {prefetch_stats['l2']}")
+
+    bank_stats = candm.get_l2_bank_stats()
+    if bank_stats:
+        for i in range(len(sim.cores)):
+            print(f"L2 bank queueing cycles for Core {i}: {candm.l2_queue_cycles[i]}")
+        for bank, stats in enumerate(bank_stats):
+            print(f"L2 bank {bank}: {stats}")
+
+    dram_stats = candm.get_dram_stats()
+    if dram_stats:
+        for i, stats in enumerate(dram_stats["cores"]):
+            print(f"DRAM row hit rate for Core {i}: {stats['row_hit_rate']:.2f}, "
+                  f"average latency: {stats['avg_latency']:.2f}")
+        print(f"DRAM total: {dram_stats['total']}")
+
+    atomic_stats = candm.get_atomic_stats()
+    if atomic_stats:
+        print(f"Atomic operations: {atomic_stats}")
+
+    spm_bank_stats = candm.get_scratch_pad_bank_stats()
+    if spm_bank_stats:
+        for i, stats in enumerate(spm_bank_stats):
+            print(f"Scratch pad banks for Core {i}: {stats}")
+
+    dma_stats = candm.get_dma_stats()
+    if dma_stats:
+        for i, stats in enumerate(dma_stats):
+            print(f"DMA engine for Core {i}: {stats}")
+
+    mshr_stats = candm.get_mshr_stats()
+    for level in ("l1i", "l1d"):
+        for i, stats in enumerate(mshr_stats[level]):
+            if stats:
+                print(f"{level.upper()} MSHRs for Core {i}: {stats}")
+    if mshr_stats["l2"]:
+        print(f"L2 MSHRs: {mshr_stats['l2']}")
+
     return sim
 
+def ensemble(program, count, core_ids=None, datasets=None):
+    """
+    Run `program` functionally for `count` independent instances at once; see
+    Ensemble.py for `core_ids` and `datasets`.
+    """
+    programs_text, programs_data = preprocess(program)
+    scratch_pad_config = Core.config.get("scratch_pad_config") or {}
+    runs = Ensemble(programs_text, Simulator.parse_data_segment(programs_data), count, core_ids, datasets,
+                    scratch_pad_size=scratch_pad_config.get("size", 400),
+                    scratch_pad_base=scratch_pad_config.get("base"))
+    steps = runs.run()
+    print(f"Ensemble of {count}: {steps} steps, {runs.executed.sum()} instructions, "
+          f"{runs.stats['active'] / max(1, steps) / count:.1%} of the instances active per step")
+    for pc, reg, values in runs.ecalls:
+        print(f"ECALL at PC {pc}: x{reg} = {values}")
+    return runs
+
 ## Local ###
-main(program=algorithm2, forwarding=False)
+main(program=algorithm2)
+# ensemble(program=algorithm2, count=256, core_ids=np.arange(256) % 4)
 
 # with open('./assembly.asm', 'r') as file:
 #     program_file = file.read()
@@ -419,10 +552,6 @@ main(program=algorithm2, forwarding=False)
 #     Core.latencies["addi"] = latencies["addi"]
 #     Core.latencies["sub"] = latencies["sub"]
     
-#     CoreWithForwarding.latencies["add"] = latencies["add"]
-#     CoreWithForwarding.latencies["addi"] = latencies["addi"]
-#     CoreWithForwarding.latencies["sub"] = latencies["sub"]
-    
 #     print(program)
 #     print(forwarding)
 #     sim = main(program, forwarding=forwarding)
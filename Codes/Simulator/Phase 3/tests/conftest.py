@@ -0,0 +1,44 @@
+"""
+Core.candm and Core.config are class-level, so a simulator run leaves state
+behind for the next one. Tests that build cores call `isolated` to run a
+check function of their module in a fresh interpreter.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+PHASE_3 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, PHASE_3)
+
+
+@pytest.fixture
+def isolated(tmp_path):
+    """
+    isolated(module, check, *args, config=None) runs module.check(*args) in a
+    new process from the Phase 3 directory, or with `config` ({section: {key:
+    value}} over config.yaml) from a directory holding the changed copy.
+    """
+    def run(module, check, *args, config=None):
+        cwd = PHASE_3
+        if config:
+            with open(os.path.join(PHASE_3, "config.yaml")) as file:
+                changed = yaml.safe_load(file)
+            for section, values in config.items():
+                changed[section].update(values)
+            cwd = tmp_path / "_".join(f"{key}-{value}" for values in config.values() for key, value in values.items()
+                                      ).translate(str.maketrans("", "", "[]', "))
+            cwd.mkdir()
+            with open(cwd / "config.yaml", "w") as file:
+                yaml.safe_dump(changed, file)
+        code = (f"import sys; sys.path[:0] = [{PHASE_3!r}, {TESTS!r}]; "
+                f"from {module} import {check}; {check}(*{args!r})")
+        result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True,
+                                timeout=900)
+        assert result.returncode == 0, result.stderr[-4000:]
+        return result.stdout
+    return run
@@ -0,0 +1,50 @@
+"""The sample programs of main.py, read without running main.py."""
+import ast
+import contextlib
+import io
+import os
+
+from conftest import PHASE_3
+
+
+def sample_programs():
+    """(name, line, source) of every program string main.py assigns at module level."""
+    with open(os.path.join(PHASE_3, "main.py")) as file:
+        tree = ast.parse(file.read())
+    return [(node.targets[0].id, node.lineno, node.value.value) for node in tree.body
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str) and ".text" in node.value.value]
+
+
+def preprocess(source):
+    """main.preprocess, without its prints."""
+    with open(os.path.join(PHASE_3, "main.py")) as file:
+        tree = ast.parse(file.read())
+    namespace = {}
+    function = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == "preprocess"]
+    exec(compile(ast.Module(function, []), "main.py", "exec"), namespace)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return namespace["preprocess"](source)
+
+
+def labels(text):
+    """Label -> PC, as Core.make_labels builds it."""
+    label_map = {}
+    for pc, line in enumerate(text):
+        tokens = line.split()
+        if tokens and ":" in tokens[0]:
+            label_map[tokens[0].split(":")[0]] = pc
+    return label_map
+
+
+def simulate(source):
+    """Run `source` on the detailed cores with config.yaml, its output kept quiet; returns the Simulator."""
+    from Simulator import Simulator
+    text, data = preprocess(source)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = Simulator()
+        sim.program = text
+        sim.make_data_segment(data)
+        sim.make_labels()
+        sim.run()
+    return sim
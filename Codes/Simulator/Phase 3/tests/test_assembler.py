@@ -0,0 +1,74 @@
+import pytest
+
+from Assembler import Assembler
+from Memory import Memory
+from Simulator import Simulator
+from programs import sample_programs, preprocess, labels
+
+
+def source_tokens(line):
+    """The instruction of a program line, without its label and comment."""
+    tokens = line.split("#")[0].split()
+    if tokens and ":" in tokens[0]:
+        rest = tokens[0].split(":", 1)[1]
+        tokens = ([rest] if rest else []) + tokens[1:]
+    return tokens
+
+
+PROGRAMS = sample_programs()
+
+
+@pytest.mark.parametrize("name, line, source", PROGRAMS, ids=[f"{name}:{line}" for name, line, _ in PROGRAMS])
+def test_disassembly_matches_source(name, line, source):
+    text, data = preprocess(source)
+    assembler = Assembler(text, labels(text), Simulator.parse_data_segment(data))
+    memory = Memory()
+    assembler.load(memory)
+    for pc, program_line in enumerate(text):
+        disassembly = assembler.disassemble(memory.memory[assembler.address(pc)], pc)
+        assert disassembly.split() == source_tokens(program_line), f"{name} (main.py:{line}) PC {pc}"
+
+
+EVERY_INSTRUCTION = """
+start: add x1 x2 x3
+sub x4 x5 x6
+slt x7 x8 x9
+mul x10 x11 x12
+div x13 x14 x15
+rem x16 x17 x18
+addi x19 x20 -2048
+addi x21 x22 2047
+li x23 -524288
+li x24 524287
+la x25 arr
+lw x26 -4(x27)
+sw x28 2044(x29)
+lw_spm x30 8(x31)
+sw_spm x1 -8(x2)
+beq x3 x4 start
+bne x5 x6 end
+ble x7 x8 start
+j end
+jal x1 start
+jr x1
+amoadd.w x9 x10 (x11)
+amoswap.w x12 x13 (x14)
+lr.w x15 (x16)
+sc.w x17 x18 (x19)
+dma_in x20 x21 x22
+dma_out x23 x24 x25
+dma_poll x26
+dma_wait
+sync
+fence
+end: ecall x27
+""".strip().split("\n")
+
+
+def test_encode_decode_round_trip():
+    assembler = Assembler(EVERY_INSTRUCTION, labels(EVERY_INSTRUCTION), {"data": [0], "arr": [1, 2]})
+    words = assembler.assemble()
+    for pc, (word, line) in enumerate(zip(words, EVERY_INSTRUCTION)):
+        text = assembler.decode(word, pc)
+        assert assembler.encode(text.split(), pc) == word, f"PC {pc}: {line} -> {text}"
+        assert text.split() == source_tokens(line), f"PC {pc}: {line} -> {text}"
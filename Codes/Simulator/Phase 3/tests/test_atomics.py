@@ -0,0 +1,55 @@
+from programs import simulate
+
+# every core sums its quarter of 1..100, adds it to word 0 with amoadd.w,
+# counts itself in word 4 with an lr.w/sc.w loop, then waits for all four
+# and reads the total
+PROGRAM = """
+.data
+arr: .word 0x1 0x2 0x3 0x4 0x5 0x6 0x7 0x8 0x9 0xa 0xb 0xc 0xd 0xe 0xf 0x10 0x11 0x12 0x13 0x14 0x15 0x16 0x17 0x18 0x19 0x1a 0x1b 0x1c 0x1d 0x1e 0x1f 0x20 0x21 0x22 0x23 0x24 0x25 0x26 0x27 0x28 0x29 0x2a 0x2b 0x2c 0x2d 0x2e 0x2f 0x30 0x31 0x32 0x33 0x34 0x35 0x36 0x37 0x38 0x39 0x3a 0x3b 0x3c 0x3d 0x3e 0x3f 0x40 0x41 0x42 0x43 0x44 0x45 0x46 0x47 0x48 0x49 0x4a 0x4b 0x4c 0x4d 0x4e 0x4f 0x50 0x51 0x52 0x53 0x54 0x55 0x56 0x57 0x58 0x59 0x5a 0x5b 0x5c 0x5d 0x5e 0x5f 0x60 0x61 0x62 0x63 0x64
+.text
+la x10 arr
+addi x1 x0 100
+mul x1 x1 x31
+add x11 x10 x1
+addi x7 x0 25
+addi x8 x0 0
+loop: beq x7 x0 done
+lw x4 0(x11)
+add x8 x8 x4
+addi x11 x11 4
+addi x7 x7 -1
+j loop
+done: amoadd.w x9 x8 (x0)
+addi x20 x0 4
+addi x21 x0 4
+addi x22 x0 1
+retry: lr.w x5 (x20)
+add x5 x5 x22
+sc.w x6 x5 (x20)
+bne x6 x0 retry
+fence
+wait: lr.w x5 (x20)
+bne x5 x21 wait
+lr.w x16 0(x0)
+ecall x16
+"""
+
+
+def check_results():
+    sim = simulate(PROGRAM)
+    sums = [325, 950, 1575, 2200]
+    for core in sim.cores:
+        assert core.registers[8] == sums[core.coreid], f"Core {core.coreid} sum"
+        assert core.registers[16] == 5050, f"Core {core.coreid} total"
+    memory = sim.cores[0].candm.memory.memory
+    assert memory[0] == 5050 and memory[4] == 4
+    # amoadd.w returns the old word: in the order the cores added, each saw the sum so far
+    added = sorted((core.registers[9], core.registers[8]) for core in sim.cores)
+    total = 0
+    for old, value in added:
+        assert old == total
+        total += value
+
+
+def test_atomic_results(isolated):
+    isolated("test_atomics", "check_results")
@@ -0,0 +1,51 @@
+from programs import simulate
+
+# every core copies its quarter of 1..100 into its scratch pad with dma_in,
+# sums it there and writes the sum back to word 4 * core id with dma_out,
+# polling until the transfer is done
+PROGRAM = """
+.data
+arr: .word 0x1 0x2 0x3 0x4 0x5 0x6 0x7 0x8 0x9 0xa 0xb 0xc 0xd 0xe 0xf 0x10 0x11 0x12 0x13 0x14 0x15 0x16 0x17 0x18 0x19 0x1a 0x1b 0x1c 0x1d 0x1e 0x1f 0x20 0x21 0x22 0x23 0x24 0x25 0x26 0x27 0x28 0x29 0x2a 0x2b 0x2c 0x2d 0x2e 0x2f 0x30 0x31 0x32 0x33 0x34 0x35 0x36 0x37 0x38 0x39 0x3a 0x3b 0x3c 0x3d 0x3e 0x3f 0x40 0x41 0x42 0x43 0x44 0x45 0x46 0x47 0x48 0x49 0x4a 0x4b 0x4c 0x4d 0x4e 0x4f 0x50 0x51 0x52 0x53 0x54 0x55 0x56 0x57 0x58 0x59 0x5a 0x5b 0x5c 0x5d 0x5e 0x5f 0x60 0x61 0x62 0x63 0x64
+.text
+la x10 arr
+addi x1 x0 100
+mul x1 x1 x31
+add x11 x10 x1
+addi x12 x0 0
+addi x13 x0 25
+dma_in x12 x11 x13
+addi x7 x0 25
+addi x8 x0 0
+dma_wait
+loop: beq x7 x0 done
+lw_spm x4 0(x12)
+add x8 x8 x4
+addi x12 x12 4
+addi x7 x7 -1
+j loop
+done: addi x14 x0 200
+sw_spm x8 0(x14)
+addi x15 x0 4
+mul x15 x15 x31
+addi x16 x0 1
+dma_out x14 x15 x16
+poll: dma_poll x17
+bne x17 x0 poll
+lw x18 0(x15)
+ecall x18
+"""
+
+
+def check_results():
+    sim = simulate(PROGRAM)
+    sums = [325, 950, 1575, 2200]
+    memory = sim.cores[0].candm.memory.memory
+    for core in sim.cores:
+        assert core.registers[8] == sums[core.coreid], f"Core {core.coreid} sum"
+        assert core.registers[18] == sums[core.coreid], f"Core {core.coreid} read back"
+        assert core.registers[17] == 0, f"Core {core.coreid} poll"
+        assert memory[4 * core.coreid] == sums[core.coreid]
+
+
+def test_dma_results(isolated):
+    isolated("test_dma", "check_results")
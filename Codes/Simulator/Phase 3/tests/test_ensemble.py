@@ -0,0 +1,31 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from programs import sample_programs, preprocess, simulate
+
+
+def compare_registers(name):
+    from Core import Core
+    from Ensemble import Ensemble
+    from Simulator import Simulator
+
+    source = [source for program, _, source in sample_programs() if program == name][-1]
+    sim = simulate(source)
+    text, data = preprocess(source)
+    scratch_pad_config = Core.config.get("scratch_pad_config") or {}
+    runs = Ensemble(text, Simulator.parse_data_segment(data), len(sim.cores), np.arange(len(sim.cores)),
+                    scratch_pad_size=scratch_pad_config.get("size", 400),
+                    scratch_pad_base=scratch_pad_config.get("base"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        runs.run()
+    assert runs.finished()
+    for core in sim.cores:
+        assert runs.registers[core.coreid].tolist() == core.registers, f"Core {core.coreid}"
+
+
+@pytest.mark.parametrize("name", ["algorithm1", "algorithm2"])
+def test_ensemble_matches_detailed_registers(isolated, name):
+    isolated("test_ensemble", "compare_registers", name)
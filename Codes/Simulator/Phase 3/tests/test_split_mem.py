@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from programs import simulate
+
+# loads whose value the next instructions use at once, in a loop (add and slt)
+# and after it behind a load that misses, so that the load waits in a queued
+# MEM sub-stage
+PROGRAM = """
+.data
+arr: .word 0x1b 0x4 0x9 0xc 0x2
+.text
+la x10 arr
+addi x11 x0 5
+addi x13 x0 0
+addi x15 x0 0
+loop: beq x11 x0 done
+lw x12 0(x10)
+add x13 x13 x12
+slt x14 x12 x11
+add x15 x15 x14
+addi x10 x10 4
+addi x11 x11 -1
+j loop
+done: lw x16 -2000(x10)
+lw x5 -20(x10)
+add x6 x5 x5
+sub x20 x6 x5
+sub x20 x20 x5
+ecall x6
+"""
+
+
+def print_registers():
+    sim = simulate(PROGRAM)
+    print(json.dumps([core.registers for core in sim.cores]))
+
+
+def registers(output):
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("forwarding", ["full", "mem_ex"])
+@pytest.mark.parametrize("stages", [["IF", "ID", "EX", "MEM1", "MEM2", "WB"],
+                                    ["IF", "ID", "EX", "MEM1", "MEM2", "MEM3", "WB"]])
+def test_split_mem_forwards_loaded_values(isolated, stages, forwarding):
+    expected = registers(isolated("test_split_mem", "print_registers"))
+    assert [core[5:7] + core[13:14] + core[20:21] for core in expected] == [[27, 54, 54, 0]] * len(expected)
+    # the checker stops the run at the first register that differs from its reference model
+    split = registers(isolated("test_split_mem", "print_registers", config={
+        "pipeline_config": {"stages": stages, "forwarding": forwarding}, "checker_config": {"enabled": True}}))
+    assert split == expected
@@ -0,0 +1,66 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from Cache import CacheWithLRU
+from Memory import Memory
+from StackDistance import stack_distances, set_distances, miss_ratio_curve
+
+
+def lru_stack_distances(blocks):
+    """Distances read off an explicit LRU stack, most recent block first."""
+    stack, distances = [], []
+    for block in blocks:
+        if block in stack:
+            distances.append(stack.index(block))
+            stack.remove(block)
+        else:
+            distances.append(-1)
+        stack.insert(0, block)
+    return distances
+
+
+def cache_miss_ratio(addresses, cache_size, block_size, associativity):
+    cache = CacheWithLRU(cache_size, block_size, associativity)
+    memory = Memory()
+    misses = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for address in addresses:
+            if cache.getFromCache(address) is None:
+                misses += 1
+                cache.getToCache(address, memory)
+    return misses / len(addresses)
+
+
+def random_trace(seed, size=3000):
+    """Word addresses with some locality: a hot region and a wide one."""
+    rng = np.random.default_rng(seed)
+    hot = rng.integers(0, 64, size) * 4
+    wide = rng.integers(0, 1000, size) * 4
+    return np.where(rng.random(size) < 0.6, hot, wide)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_stack_distances_match_lru_stack(seed):
+    blocks = random_trace(seed) // 16
+    assert stack_distances(blocks).tolist() == lru_stack_distances(blocks.tolist())
+
+
+def test_set_distances_match_lru_stack_per_set():
+    addresses = random_trace(4)
+    distances = set_distances(addresses, 16, 8)
+    indices = addresses // 16 % 8
+    for index in range(8):
+        blocks = (addresses[indices == index] // 16).tolist()
+        assert distances[indices == index].tolist() == lru_stack_distances(blocks)
+
+
+@pytest.mark.parametrize("cache_size, block_size, associativity", [(512, 16, 2), (256, 8, 4)])
+def test_miss_ratios_match_cache(cache_size, block_size, associativity):
+    addresses = random_trace(5)
+    profile = miss_ratio_curve(addresses, block_size)
+    capacity = profile["capacities"].index(cache_size // block_size)
+    expected = cache_miss_ratio(addresses.tolist(), cache_size, block_size, associativity)
+    assert profile["curves"][associativity][capacity] == pytest.approx(expected)